@@ -1,10 +1,21 @@
+import asyncio
 from datetime import datetime
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi.responses import PlainTextResponse
 from sqlmodel import Session, select
 
 from app.core.deps import get_db, require_role
+from app.core.metrics import registry
+from app.db.base import pool_stats as db_pool_stats
+from app.llm.cache import get_llm_cache
+from app.llm.clients import pool_stats
+from app.llm.rate_limit import limiter_stats
+from app.llm.telemetry import llm_summary, plan_metrics
+from app.schemas.batch import BatchGenerateRequest
+from app.services.batch import get_batch, list_batches, select_plan_ids, start_batch
 from app.services.finance.models import AuditLog
+from app.utils.pagination import PageParams, get_page_params, paginate
 
 router = APIRouter()
 
@@ -12,20 +23,44 @@ router = APIRouter()
 @router.get("/metrics")
 def metrics():
     # Basique, compatible supervision
+    cache = get_llm_cache()
     return {
         "status": "ok",
-        "timestamp": datetime.utcnow().isoformat()
+        "timestamp": datetime.utcnow().isoformat(),
+        "db_pool": db_pool_stats(),
+        "llm_pool": pool_stats(),
+        "llm_cache": cache.stats() if cache else None,
+        "llm_rate_limits": limiter_stats(),
+        "llm_calls": llm_summary(),
     }
 
 
+@router.get("/metrics/prometheus", response_class=PlainTextResponse)
+def metrics_prometheus():
+    # format texte Prometheus : compteurs et histogrammes LLM / HTTP
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
+@router.get("/metrics/plans/{plan_id}")
+def metrics_plan(plan_id: int, _: str = Depends(require_role("admin"))):
+    """Agrégats LLM d'un plan (appels, cache, latence, tokens, coût), total et par prompt."""
+    data = plan_metrics(plan_id)
+    if data is None:
+        raise HTTPException(status_code=404, detail="Aucun appel LLM enregistré pour ce plan")
+    return {"plan_id": plan_id, **data}
+
+
 @router.get("/audit")
 def get_audit_logs(
+    response: Response,
+    page: PageParams = Depends(get_page_params),
     db: Session = Depends(get_db),
     _: str = Depends(require_role("admin"))
 ):
-    return db.exec(
-        select(AuditLog).order_by(AuditLog.at.desc()).limit(100)
-    ).all()
+    # du plus récent au plus ancien
+    return paginate(
+        db, select(AuditLog), [AuditLog.at, AuditLog.id], page, response, key="audit", descending=True
+    )
 
 
 @router.get("/config")
@@ -36,3 +71,31 @@ def get_config(_: str = Depends(require_role("admin"))):
         "ENABLE_REDIS": settings.ENABLE_REDIS,
         "ENABLE_SSE": settings.ENABLE_SSE
     }
+
+
+@router.post("/batch/generate", status_code=202)
+async def batch_generate(
+    payload: BatchGenerateRequest,
+    db: Session = Depends(get_db),
+    _: str = Depends(require_role("admin"))
+):
+    """(Re)génère en tâche de fond les plans listés et/ou filtrés (secteur, ville, statut)."""
+    if not (payload.plan_ids or payload.sector or payload.city or payload.status):
+        raise HTTPException(status_code=400, detail="Indiquez des plan_ids ou un filtre (sector, city, status)")
+    plan_ids = await asyncio.to_thread(select_plan_ids, db, payload.plan_ids, payload.sector, payload.city, payload.status)
+    if not plan_ids:
+        raise HTTPException(status_code=404, detail="Aucun plan ne correspond")
+    return start_batch(plan_ids, use_cache=not payload.no_cache).as_dict()
+
+
+@router.get("/batch")
+def get_batches(_: str = Depends(require_role("admin"))):
+    return [report.as_dict() for report in list_batches()]
+
+
+@router.get("/batch/{batch_id}")
+def get_batch_report(batch_id: str, _: str = Depends(require_role("admin"))):
+    report = get_batch(batch_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Lot non trouvé")
+    return report.as_dict()
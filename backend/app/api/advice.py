@@ -1,5 +1,5 @@
 # app/api/advice.py
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlmodel import Session, select
 
 from app.core.deps import get_db, get_current_user
@@ -7,6 +7,7 @@ from app.db.models import BusinessPlan
 from app.services.finance.models import FinancialAssumptions, Advice
 from app.schemas.advice import AdviceOut
 from app.services.advice import generate_advice
+from app.utils.pagination import PageParams, get_page_params, paginate
 
 router = APIRouter()
 
@@ -28,8 +29,17 @@ def generate(plan_id: int, db: Session = Depends(get_db), user=Depends(get_curre
 
 
 @router.get("/{plan_id}", response_model=list[AdviceOut])
-def list_advice(plan_id: int, db: Session = Depends(get_db), user=Depends(get_current_user)):
+def list_advice(
+    plan_id: int,
+    response: Response,
+    page: PageParams = Depends(get_page_params),
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user)
+):
     plan = db.get(BusinessPlan, plan_id)
     if not plan or plan.owner_id != user.id:
         raise HTTPException(status_code=404, detail="Plan non trouvé")
-    return db.exec(select(Advice).where(Advice.plan_id == plan_id)).all()
+    return paginate(
+        db, select(Advice).where(Advice.plan_id == plan_id),
+        [Advice.priority, Advice.id], page, response, key=f"advice:{plan_id}",
+    )
@@ -1,10 +1,11 @@
 # app/api/export.py
 from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session, select
+from sqlmodel import Session
 from app.core.deps import get_db, get_current_user
-from app.db.models import BusinessPlan, PlanSection, ExportJob
+from app.db.models import BusinessPlan, ExportJob
 from app.services.export.pdf import generate_pdf
 from app.services.export.pptx import generate_pptx
+from app.services.section_versions import current_sections
 from app.services.finance.models import AuditLog
 from app.schemas.export import ExportJobStatus
 from datetime import datetime
@@ -18,7 +19,7 @@ def export_pdf(plan_id: int, db: Session = Depends(get_db), user=Depends(get_cur
     if not plan or plan.owner_id != user.id:
         raise HTTPException(status_code=404, detail="Plan non trouvé")
 
-    sections = db.exec(select(PlanSection).where(PlanSection.plan_id == plan_id)).all()
+    sections = current_sections(db, plan_id)
     texts = [s.content_md for s in sections]
     filename = f"{plan_id}_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.pdf"
     path = generate_pdf(plan.title, texts, filename)
@@ -35,7 +36,7 @@ def export_pptx(plan_id: int, db: Session = Depends(get_db), user=Depends(get_cu
     if not plan or plan.owner_id != user.id:
         raise HTTPException(status_code=404, detail="Plan non trouvé")
 
-    sections = db.exec(select(PlanSection).where(PlanSection.plan_id == plan_id)).all()
+    sections = current_sections(db, plan_id)
     texts = [s.content_md for s in sections]
     filename = f"{plan_id}_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.pptx"
     path = generate_pptx(plan.title, texts, filename)
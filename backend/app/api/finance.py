@@ -1,15 +1,19 @@
-from datetime import datetime
+from datetime import date
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
 from sqlmodel import Session, select
 
 from app.core.deps import get_db, get_current_user
 from app.db.models import BusinessPlan
-from app.services.finance.models import FinancialAssumptions, FinancialForecast
-from app.schemas.finance import FinancialAssumptionsIn, FinancialKPI
-from app.services.finance.calculators import (
-    break_even_units, break_even_revenue,
-    gross_margin_pct, opex_to_revenue, dscr, npv, irr
+from app.services.finance.models import (
+    FinancialAssumptions, FinancialForecast, ForecastGranularity, GraceType, RepaymentType,
+)
+from app.schemas.finance import AmortizationRow, FinancialAssumptionsIn, FinancialForecastRow, FinancialKPI
+from app.services.finance.amortization import loan_schedule
+from app.services.finance.forecast import ForecastDrivers, check_horizon, period_labels, project, write_forecast
+from app.services.finance.kpi_cache import (
+    cached_kpis, ensure_current, etag_matches, kpi_etag, make_etag, refresh_hash,
 )
 
 router = APIRouter()
@@ -31,21 +35,92 @@ def save_assumptions(
     ).first()
 
     payload = data.dict()
+    payload["repayment_type"] = RepaymentType(payload["repayment_type"])
+    payload["grace_type"] = GraceType(payload["grace_type"])
+    if payload["grace_months"] >= payload["loan_duration"]:
+        raise HTTPException(status_code=400, detail="Le différé doit être inférieur à la durée du prêt")
+    if payload["loan_amount"] is None:
+        # montant emprunté par défaut : montant demandé dans le plan (sinon le CAPEX)
+        payload["loan_amount"] = plan.requested_amount_fcfa or None
     if existing:
         for key, value in payload.items():
             setattr(existing, key, value)
-        db.add(existing)
+        assumptions = existing
     else:
-        new = FinancialAssumptions(plan_id=plan_id, **payload)
-        db.add(new)
+        assumptions = FinancialAssumptions(plan_id=plan_id, **payload)
+    if assumptions.start_date is None:
+        assumptions.start_date = date.today()
+    db.add(assumptions)
+
+    # prévision recalculée à chaque édition, dans la même transaction ;
+    # nouvelle empreinte -> les KPI en cache et les ETag des versions précédentes sont caducs
+    write_forecast(db, plan_id, assumptions)
+    refresh_hash(db, assumptions)
     db.commit()
     return {"detail": "Hypothèses enregistrées"}
 
 
+# le client revalide à chaque fois (If-None-Match) mais peut réutiliser sa copie sur 304
+_CACHE_CONTROL = "private, no-cache"
+
+
+def _not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": _CACHE_CONTROL})
+
+
+def _assumptions_or_400(db: Session, plan_id: int) -> FinancialAssumptions:
+    assumptions = db.exec(
+        select(FinancialAssumptions).where(FinancialAssumptions.plan_id == plan_id)
+    ).first()
+    if not assumptions:
+        raise HTTPException(status_code=400, detail="Aucune hypothèse trouvée")
+    return assumptions
+
+
+@router.get("/{plan_id}/forecast", response_model=List[FinancialForecastRow])
+def get_forecast(
+    plan_id: int,
+    response: Response,
+    granularity: ForecastGranularity = Query(default=ForecastGranularity.monthly),
+    horizon: int = Query(default=12, description="Horizon en mois : 12, 36 ou 60"),
+    if_none_match: Optional[str] = Header(default=None),
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user)
+):
+    plan = db.get(BusinessPlan, plan_id)
+    if not plan or plan.owner_id != user.id:
+        raise HTTPException(status_code=404, detail="Plan non trouvé")
+    horizon = check_horizon(horizon)
+
+    # la prévision stockée est réécrite avec les hypothèses : même empreinte, mêmes lignes
+    digest = ensure_current(db, _assumptions_or_400(db, plan_id))
+    etag = make_etag("forecast", digest, horizon, granularity.value)
+    if etag_matches(if_none_match, etag):
+        return _not_modified(etag)
+
+    rows = db.exec(
+        select(FinancialForecast)
+        .where(
+            FinancialForecast.plan_id == plan_id,
+            FinancialForecast.horizon == horizon,
+            FinancialForecast.granularity == granularity,
+        )
+        .order_by(FinancialForecast.period_index)
+    ).all()
+    if not rows:
+        raise HTTPException(status_code=400, detail="Aucune prévision : enregistrez d'abord les hypothèses")
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = _CACHE_CONTROL
+    return rows
+
+
 @router.get("/{plan_id}/kpi", response_model=FinancialKPI)
 def compute_kpis(
     plan_id: int,
+    response: Response,
     rate: float = Query(default=0.1),  # taux d'actualisation annuel pour NPV
+    horizon: int = Query(default=12, description="Horizon de calcul en mois : 12, 36 ou 60"),
+    if_none_match: Optional[str] = Header(default=None),
     db: Session = Depends(get_db),
     user=Depends(get_current_user)
 ):
@@ -53,48 +128,59 @@ def compute_kpis(
     if not plan or plan.owner_id != user.id:
         raise HTTPException(status_code=404, detail="Plan non trouvé")
 
-    assumptions = db.exec(
-        select(FinancialAssumptions).where(FinancialAssumptions.plan_id == plan_id)
-    ).first()
-    if not assumptions:
-        raise HTTPException(status_code=400, detail="Aucune hypothèse trouvée")
+    assumptions = _assumptions_or_400(db, plan_id)
+    horizon = check_horizon(horizon)
 
-    prix = assumptions.pricing
-    cv = assumptions.variable_costs
-    cf = assumptions.fixed_costs + assumptions.salaries + assumptions.taxes
-    capex = assumptions.capex
-
-    # Projection simple: 100 unités / mois
-    monthly_units = 100.0
-    monthly_revenue = prix * monthly_units
-    monthly_cogs = cv * monthly_units
-    monthly_opex = cf
-    monthly_ebitda = monthly_revenue - monthly_cogs - monthly_opex
-
-    # DSCR avec service de la dette mensuel
-    r_annual = float(assumptions.loan_rate or 0.0)
-    n_months = max(int(assumptions.loan_duration or 0), 1)
-    r_month = r_annual / 12.0
-
-    if r_month > 0:
-        # Annuité (PMT)
-        debt_service = capex * (r_month * (1 + r_month) ** n_months) / ((1 + r_month) ** n_months - 1)
-    else:
-        debt_service = capex / n_months
-
-    dscr_value = dscr(monthly_ebitda, debt_service)
-
-    # Flux mensuels après service de la dette pour NPV/IRR (sur 12 mois)
-    duration = 12
-    monthly_cashflow_after_debt = monthly_ebitda - debt_service
-    flows = [-capex] + [monthly_cashflow_after_debt] * duration
-
-    return FinancialKPI(
-        break_even_units=break_even_units(prix, cv, cf),
-        break_even_revenue=break_even_revenue(prix, cv, cf),
-        gross_margin_pct=gross_margin_pct(monthly_revenue, monthly_cogs),
-        opex_to_revenue=opex_to_revenue(monthly_opex, monthly_revenue),
-        dscr=dscr_value,
-        npv=npv(rate, flows),
-        irr=irr(flows),
-    )
+    # ETag dérivé de l'empreinte des hypothèses : 304 sans lire ni recalculer les KPI
+    digest = ensure_current(db, assumptions)
+    etag = kpi_etag(digest, rate, horizon)
+    if etag_matches(if_none_match, etag):
+        return _not_modified(etag)
+
+    kpis, etag = cached_kpis(db, assumptions, digest, rate, horizon)
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = _CACHE_CONTROL
+    return FinancialKPI(**kpis)
+
+
+@router.get("/{plan_id}/amortization", response_model=List[AmortizationRow])
+def get_amortization(
+    plan_id: int,
+    response: Response,
+    horizon: Optional[int] = Query(default=None, gt=0, le=600, description="Mois affichés (défaut : durée du prêt)"),
+    if_none_match: Optional[str] = Header(default=None),
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user)
+):
+    """Tableau d'amortissement mensuel du prêt et DSCR de chaque échéance face à la prévision."""
+    plan = db.get(BusinessPlan, plan_id)
+    if not plan or plan.owner_id != user.id:
+        raise HTTPException(status_code=404, detail="Plan non trouvé")
+
+    assumptions = _assumptions_or_400(db, plan_id)
+    horizon = horizon or max(int(assumptions.loan_duration or 0), 1)
+    digest = ensure_current(db, assumptions)
+    etag = make_etag("amortization", digest, horizon)
+    if etag_matches(if_none_match, etag):
+        return _not_modified(etag)
+
+    loan = {name: values[0] for name, values in loan_schedule(assumptions, horizon).items()}
+    ebitda = project(ForecastDrivers.from_assumptions(assumptions), horizon)["ebitda"][0]
+    labels, _ = period_labels(assumptions.start_date or date.today(), horizon, ForecastGranularity.monthly)
+
+    rows = [
+        AmortizationRow(
+            month=i + 1,
+            period=labels[i],
+            interest=round(float(loan["interest"][i]), 2),
+            principal=round(float(loan["principal"][i]), 2),
+            payment=round(float(loan["payment"][i]), 2),
+            balance=round(float(loan["balance"][i]), 2),
+            ebitda=round(float(ebitda[i]), 2),
+            dscr=round(float(ebitda[i] / loan["payment"][i]), 4) if loan["payment"][i] > 0 else None,
+        )
+        for i in range(horizon)
+    ]
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = _CACHE_CONTROL
+    return rows
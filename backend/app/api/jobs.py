@@ -0,0 +1,82 @@
+# app/api/jobs.py
+import asyncio
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlmodel import Session, select
+
+from app.core.deps import get_db, get_current_user
+from app.db.models import BusinessPlan, GenerationJob
+from app.schemas.jobs import GenerationJobRead
+from app.services.jobs import enqueue_job, job_event_stream, job_progress, resume_job
+from app.utils.sse import sse_events
+
+router = APIRouter()
+
+
+def _job_read(job: GenerationJob) -> GenerationJobRead:
+    return GenerationJobRead(
+        id=job.id,
+        plan_id=job.plan_id,
+        status=getattr(job.status, "value", job.status),
+        use_cache=job.use_cache,
+        attempts=job.attempts,
+        section_ids=job.section_ids or {},
+        errors=job.errors or {},
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+        **job_progress(job),
+    )
+
+
+def _get_owned_job(db: Session, job_id: int, user) -> GenerationJob:
+    job = db.get(GenerationJob, job_id)
+    if not job or job.owner_id != user.id:
+        raise HTTPException(status_code=404, detail="Job non trouvé")
+    return job
+
+
+@router.post("/plan/{plan_id}", response_model=GenerationJobRead, status_code=202)
+def create_generation_job(
+    plan_id: int,
+    no_cache: bool = Query(False, description="Ignore le cache des réponses LLM"),
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user),
+):
+    """Met en file la génération complète du plan (renvoie le job actif s'il existe déjà)."""
+    plan = db.get(BusinessPlan, plan_id)
+    if not plan or plan.owner_id != user.id:
+        raise HTTPException(status_code=404, detail="Plan non trouvé")
+    return _job_read(enqueue_job(db, plan, user.id, use_cache=not no_cache))
+
+
+@router.get("/plan/{plan_id}", response_model=List[GenerationJobRead])
+def list_plan_jobs(plan_id: int, db: Session = Depends(get_db), user=Depends(get_current_user)):
+    jobs = db.exec(
+        select(GenerationJob)
+        .where(GenerationJob.plan_id == plan_id, GenerationJob.owner_id == user.id)
+        .order_by(GenerationJob.id.desc())
+    ).all()
+    return [_job_read(j) for j in jobs]
+
+
+@router.get("/{job_id}", response_model=GenerationJobRead)
+def get_generation_job(job_id: int, db: Session = Depends(get_db), user=Depends(get_current_user)):
+    return _job_read(_get_owned_job(db, job_id, user))
+
+
+@router.post("/{job_id}/resume", response_model=GenerationJobRead)
+def resume_generation_job(job_id: int, db: Session = Depends(get_db), user=Depends(get_current_user)):
+    """Relance un job échoué : seules les sections manquantes sont générées."""
+    return _job_read(resume_job(db, _get_owned_job(db, job_id, user)))
+
+
+@router.get("/{job_id}/events")
+async def stream_generation_job(job_id: int, db: Session = Depends(get_db), user=Depends(get_current_user)):
+    """
+    SSE du job : event: job_status (état courant), puis section_start | token | section_done | error
+    tant que le job tourne ; on peut se reconnecter à tout moment sans interrompre la génération.
+    """
+    await asyncio.to_thread(_get_owned_job, db, job_id, user)
+    return sse_events(job_event_stream(job_id))
@@ -1,11 +1,12 @@
 # app/api/market.py
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlmodel import Session, select
 from app.core.deps import get_db, get_current_user
 from app.db.models import BusinessPlan
 from app.services.finance.models import MarketData
 from app.services.market_scraper.aggregator import collect_all_sources
 from app.schemas.market import MarketDataOut
+from app.utils.pagination import PageParams, get_page_params, paginate
 from datetime import date
 
 router = APIRouter()
@@ -39,8 +40,17 @@ def collect_market(
 
 
 @router.get("/{plan_id}/data", response_model=list[MarketDataOut])
-def get_market_data(plan_id: int, db: Session = Depends(get_db), user=Depends(get_current_user)):
+def get_market_data(
+    plan_id: int,
+    response: Response,
+    page: PageParams = Depends(get_page_params),
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user)
+):
     plan = db.get(BusinessPlan, plan_id)
     if not plan or plan.owner_id != user.id:
         raise HTTPException(status_code=404, detail="Plan non trouvé")
-    return db.exec(select(MarketData).where(MarketData.plan_id == plan_id)).all()
+    return paginate(
+        db, select(MarketData).where(MarketData.plan_id == plan_id),
+        [MarketData.as_of, MarketData.id], page, response, key=f"market:{plan_id}",
+    )
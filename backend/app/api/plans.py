@@ -1,9 +1,13 @@
 # app/api/plans.py
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlmodel import Session, select
-from app.db.models import BusinessPlan, User
+from app.core.config import settings
+from app.db.models import BusinessPlan, PlanSectionType, User
 from app.core.deps import get_db, get_current_user
-from app.schemas.plans import BusinessPlanCreate, BusinessPlanOut
+from app.schemas.plans import BusinessPlanCreate, BusinessPlanOut, PlanSearchHit, PlanSectionOut
+from app.services.search import index_plan, matching_plan_ids, remove_plan, search_plans
+from app.services.section_versions import compact_sections, current_sections, section_history
+from app.utils.pagination import PageParams, get_page_params, paginate
 from typing import List
 
 router = APIRouter()
@@ -13,6 +17,8 @@ router = APIRouter()
 def create_plan(data: BusinessPlanCreate, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
     plan = BusinessPlan(**data.dict(), owner_id=user.id)
     db.add(plan)
+    db.flush()
+    index_plan(db, plan)
     db.commit()
     db.refresh(plan)
     return plan
@@ -20,17 +26,34 @@ def create_plan(data: BusinessPlanCreate, db: Session = Depends(get_db), user: U
 
 @router.get("/", response_model=List[BusinessPlanOut])
 def list_plans(
+    response: Response,
     query: str = Query(default=""),
     status: str = Query(default=""),
+    page: PageParams = Depends(get_page_params),
     db: Session = Depends(get_db),
     user: User = Depends(get_current_user)
 ):
     stmt = select(BusinessPlan).where(BusinessPlan.owner_id == user.id)
     if query:
-        stmt = stmt.where(BusinessPlan.title.contains(query))
+        # titre, secteur, ville et contenu des sections (index plein texte)
+        matches = matching_plan_ids(db, query)
+        if matches is not None:
+            stmt = stmt.where(BusinessPlan.id.in_(matches))
     if status:
         stmt = stmt.where(BusinessPlan.status == status)
-    return db.exec(stmt).all()
+    return paginate(db, stmt, [BusinessPlan.id], page, response, key="plans")
+
+
+@router.get("/search", response_model=List[PlanSearchHit])
+def search(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(default=20, ge=1, le=100),
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user)
+):
+    """Recherche classée dans les plans et leurs sections (analystes et admins : tous les plans)."""
+    owner_id = None if user.role in ("analyst", "admin") else user.id
+    return search_plans(db, q, owner_id=owner_id, limit=limit)
 
 
 @router.get("/{id}", response_model=BusinessPlanOut)
@@ -49,6 +72,7 @@ def update_plan(id: int, data: BusinessPlanCreate, db: Session = Depends(get_db)
     for key, value in data.dict(exclude_unset=True).items():
         setattr(plan, key, value)
     db.add(plan)
+    index_plan(db, plan)
     db.commit()
     return plan
 
@@ -58,6 +82,44 @@ def delete_plan(id: int, db: Session = Depends(get_db), user: User = Depends(get
     plan = db.get(BusinessPlan, id)
     if not plan or plan.owner_id != user.id:
         raise HTTPException(status_code=404, detail="Plan non trouvé")
+    remove_plan(db, plan.id)
     db.delete(plan)
     db.commit()
     return {"detail": "Supprimé"}
+
+
+def _get_owned_plan(db: Session, id: int, user: User) -> BusinessPlan:
+    plan = db.get(BusinessPlan, id)
+    if not plan or plan.owner_id != user.id:
+        raise HTTPException(status_code=404, detail="Plan non trouvé")
+    return plan
+
+
+@router.get("/{id}/sections", response_model=List[PlanSectionOut])
+def get_sections(id: int, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
+    """Version courante de chaque section, dans l'ordre du plan."""
+    return current_sections(db, _get_owned_plan(db, id, user).id)
+
+
+@router.get("/{id}/sections/{section_type}/history", response_model=List[PlanSectionOut])
+def get_section_history(
+    id: int,
+    section_type: PlanSectionType,
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user)
+):
+    """Versions conservées d'une section, de la plus récente à la plus ancienne."""
+    return section_history(db, _get_owned_plan(db, id, user).id, section_type)
+
+
+@router.post("/{id}/sections/compact")
+def compact_plan_sections(
+    id: int,
+    keep: int = Query(default=settings.SECTION_HISTORY_KEEP, ge=1, description="Versions conservées par section"),
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user)
+):
+    """Supprime les anciennes versions des sections (les `keep` plus récentes sont conservées)."""
+    deleted = compact_sections(db, keep, plan_id=_get_owned_plan(db, id, user).id)
+    db.commit()
+    return {"detail": "Historique compacté", "deleted": deleted}
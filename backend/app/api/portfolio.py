@@ -0,0 +1,82 @@
+# app/api/portfolio.py
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlmodel import Session
+
+from app.core.deps import get_db, require_role
+from app.db.base import engine
+from app.services.finance.forecast import check_horizon
+from app.services.finance.portfolio import (
+    GROUP_BY, PLAN_COLUMNS, PORTFOLIO_KPIS,
+    csv_lines, flatten_summary, ndjson_lines, plan_records, portfolio_summary, summary_fieldnames,
+)
+
+router = APIRouter()
+
+Format = Literal["json", "csv", "ndjson"]
+_MEDIA_TYPES = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+
+
+def _check(horizon: int, group_by: Optional[str] = None) -> None:
+    check_horizon(horizon)
+    if group_by is not None and group_by not in GROUP_BY:
+        raise HTTPException(status_code=400, detail=f"Regroupement invalide (valeurs possibles: {', '.join(GROUP_BY)})")
+
+
+def _stream(lines, fmt: str, filename: str) -> StreamingResponse:
+    return StreamingResponse(
+        lines,
+        media_type=_MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'},
+    )
+
+
+@router.get("/summary")
+def get_summary(
+    group_by: str = Query(default="sector", description="sector, city ou status"),
+    horizon: int = Query(default=12, description="Horizon des KPI en mois : 12, 36 ou 60"),
+    rate: float = Query(default=0.1),  # taux d'actualisation annuel pour NPV
+    sector: Optional[str] = None,
+    city: Optional[str] = None,
+    status: Optional[str] = None,
+    format: Format = Query(default="json"),
+    db: Session = Depends(get_db),
+    _: str = Depends(require_role("analyst", "admin"))
+):
+    """
+    Distribution des KPI (moyenne, percentiles) par secteur, ville ou statut, avec les
+    agrégats SQL du groupe (nombre de plans, montants demandés, moyennes des hypothèses).
+    """
+    _check(horizon, group_by)
+    summary = portfolio_summary(db, group_by, horizon, rate, sector=sector, city=city, status=status)
+    if format == "json":
+        return {"group_by": group_by, "horizon": horizon, "rate": rate, "groups": summary}
+    if format == "csv":
+        return _stream(csv_lines(flatten_summary(summary), summary_fieldnames(group_by)), format, f"portfolio-{group_by}")
+    return _stream(ndjson_lines(iter(summary)), format, f"portfolio-{group_by}")
+
+
+@router.get("/plans")
+def export_plans(
+    horizon: int = Query(default=12, description="Horizon des KPI en mois : 12, 36 ou 60"),
+    rate: float = Query(default=0.1),
+    sector: Optional[str] = None,
+    city: Optional[str] = None,
+    status: Optional[str] = None,
+    format: Literal["csv", "ndjson"] = Query(default="ndjson"),
+    _: str = Depends(require_role("analyst", "admin"))
+):
+    """KPI de chaque plan du portefeuille, calculés et diffusés bloc par bloc."""
+    _check(horizon)
+
+    def iter_records():
+        # session propre au flux : elle vit le temps de la diffusion, pas de la requête
+        with Session(engine) as stream_db:
+            yield from plan_records(stream_db, horizon, rate, sector=sector, city=city, status=status)
+
+    records = iter_records()
+    if format == "csv":
+        return _stream(csv_lines(records, list(PLAN_COLUMNS) + list(PORTFOLIO_KPIS)), format, "portfolio-plans")
+    return _stream(ndjson_lines(records), format, "portfolio-plans")
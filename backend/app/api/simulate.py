@@ -1,13 +1,19 @@
 # app/api/simulate.py
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
 from sqlmodel import Session, select
 from datetime import datetime
 from app.core.deps import get_db, get_current_user
 from app.db.models import BusinessPlan
-from app.services.finance.models import FinancialAssumptions, Scenario
-from app.schemas.simulate import SimulationRequest
-from app.services.finance.simulator import simulate_financials
-from uuid import uuid4
+from app.services.finance.models import FinancialAssumptions, ForecastGranularity, Scenario
+from app.core.config import settings
+from app.schemas.simulate import GoalSeekRequest, MonteCarloRequest, SensitivityRequest, SimulationRequest
+from app.services.finance.forecast import check_horizon
+from app.services.finance.goal_seek import GoalTarget, goal_seek
+from app.services.finance.kpi_cache import ensure_current, etag_matches, make_etag
+from app.services.finance.scenarios import comparison, current_scenarios, store_snapshots
+from app.services.finance.montecarlo import Volatility, run_montecarlo
+from app.services.finance.simulator import sensitivity_grid, simulate_financials
 
 router = APIRouter()
 
@@ -27,19 +33,190 @@ def create_scenario(
     if not base:
         raise HTTPException(status_code=400, detail="Aucune hypothèse existante")
 
+    check_horizon(body.horizon)
+
     simulated = simulate_financials(base, body.delta)
 
     name = f"Scénario {datetime.utcnow().strftime('%Y%m%d-%H%M%S')}"
-    scenario = Scenario(plan_id=plan.id, name=name, deltas_json=body.delta)
+    scenario = Scenario(plan_id=plan.id, name=name, deltas_json=body.delta, horizon=body.horizon, rate=body.rate)
+    # KPI et séries calculés une fois, à la création (lus ensuite par liste / comparaison)
+    store_snapshots(base, ensure_current(db, base), [scenario])
     db.add(scenario)
     db.commit()
+    db.refresh(scenario)
 
     return {
         "detail": "Scénario enregistré",
+        "id": scenario.id,
         "name": name,
+        "kpis": scenario.kpis,
         "modified_pricing": simulated.pricing,
         "modified_costs": {
             "variable": simulated.variable_costs,
             "fixed": simulated.fixed_costs + simulated.salaries + simulated.taxes
         }
     }
+
+
+@router.get("/{plan_id}/scenarios")
+def list_scenarios(
+    plan_id: int,
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user)
+):
+    """Scénarios enregistrés du plan et leurs KPI (snapshots, recalculés seulement si périmés)."""
+    plan = db.get(BusinessPlan, plan_id)
+    if not plan or plan.owner_id != user.id:
+        raise HTTPException(status_code=404, detail="Plan non trouvé")
+
+    base = db.exec(select(FinancialAssumptions).where(FinancialAssumptions.plan_id == plan_id)).first()
+    if not base:
+        raise HTTPException(status_code=400, detail="Aucune hypothèse existante")
+
+    scenarios = current_scenarios(db, base, ensure_current(db, base))
+    return [
+        {
+            "id": s.id,
+            "name": s.name,
+            "deltas": s.deltas_json,
+            "horizon": s.horizon,
+            "rate": s.rate,
+            "kpis": s.kpis,
+            "created_at": s.created_at,
+            "computed_at": s.computed_at,
+        }
+        for s in scenarios
+    ]
+
+
+@router.get("/{plan_id}/scenarios/compare")
+def compare_scenarios(
+    plan_id: int,
+    response: Response,
+    ids: Optional[str] = Query(default=None, description="Identifiants séparés par des virgules (défaut : tous)"),
+    granularity: ForecastGranularity = Query(default=ForecastGranularity.yearly),
+    if_none_match: Optional[str] = Header(default=None),
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user)
+):
+    """
+    Comparaison côte à côte : KPI et séries (mensuelles, trimestrielles ou annuelles)
+    de chaque scénario, lus dans les snapshots enregistrés.
+    """
+    plan = db.get(BusinessPlan, plan_id)
+    if not plan or plan.owner_id != user.id:
+        raise HTTPException(status_code=404, detail="Plan non trouvé")
+
+    base = db.exec(select(FinancialAssumptions).where(FinancialAssumptions.plan_id == plan_id)).first()
+    if not base:
+        raise HTTPException(status_code=400, detail="Aucune hypothèse existante")
+
+    try:
+        wanted = list(dict.fromkeys(int(i) for i in ids.split(",") if i.strip())) if ids else []
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Identifiants de scénarios invalides")
+
+    digest = ensure_current(db, base)
+    scenarios = current_scenarios(db, base, digest, wanted)
+    if len(scenarios) != len(wanted) and wanted:
+        raise HTTPException(status_code=404, detail="Scénario non trouvé")
+
+    # les snapshots ne dépendent que des hypothèses de base et des scénarios choisis
+    etag = make_etag("scenarios", digest, granularity.value, *[s.id for s in scenarios])
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "private, no-cache"})
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "private, no-cache"
+    return {"plan_id": plan_id, "granularity": granularity.value, **comparison(scenarios, granularity)}
+
+
+@router.post("/{plan_id}/montecarlo")
+def simulate_montecarlo(
+    plan_id: int,
+    body: MonteCarloRequest,
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user)
+):
+    """
+    Risque de défaut : percentiles du DSCR et de la trésorerie, probabilité de DSCR < 1
+    et de trésorerie négative, sur `draws` scénarios tirés autour des hypothèses.
+    """
+    plan = db.get(BusinessPlan, plan_id)
+    if not plan or plan.owner_id != user.id:
+        raise HTTPException(status_code=404, detail="Plan non trouvé")
+
+    base = db.exec(select(FinancialAssumptions).where(FinancialAssumptions.plan_id == plan_id)).first()
+    if not base:
+        raise HTTPException(status_code=400, detail="Aucune hypothèse existante")
+    check_horizon(body.horizon)
+    if body.draws > settings.MONTECARLO_MAX_DRAWS:
+        raise HTTPException(status_code=400, detail=f"Maximum {settings.MONTECARLO_MAX_DRAWS} tirages par simulation")
+
+    volatility = Volatility(
+        price=body.price_sd,
+        volume=body.volume_sd,
+        volume_monthly=body.volume_monthly_sd,
+        variable_costs=body.variable_costs_sd,
+        fixed_costs=body.fixed_costs_sd,
+    )
+    # pool de process : MONTECARLO_WORKERS (réglage de l'opérateur, pas de la requête)
+    return run_montecarlo(base, draws=body.draws, horizon=body.horizon, seed=body.seed, volatility=volatility)
+
+
+@router.post("/{plan_id}/sensitivity")
+def simulate_sensitivity(
+    plan_id: int,
+    body: SensitivityRequest,
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user)
+):
+    """
+    Grille de sensibilité : KPI (CA, marges, DSCR, NPV, mois de BEP) pour chaque
+    combinaison de deltas, et classement tornado des drivers sur `tornado_kpi`.
+    """
+    plan = db.get(BusinessPlan, plan_id)
+    if not plan or plan.owner_id != user.id:
+        raise HTTPException(status_code=404, detail="Plan non trouvé")
+
+    base = db.exec(select(FinancialAssumptions).where(FinancialAssumptions.plan_id == plan_id)).first()
+    if not base:
+        raise HTTPException(status_code=400, detail="Aucune hypothèse existante")
+    check_horizon(body.horizon)
+
+    try:
+        return sensitivity_grid(
+            base, body.grid, horizon=body.horizon, rate=body.rate, tornado_kpi=body.tornado_kpi,
+            max_combinations=settings.SENSITIVITY_MAX_COMBINATIONS,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+
+@router.post("/{plan_id}/goal-seek")
+def simulate_goal_seek(
+    plan_id: int,
+    body: GoalSeekRequest,
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user)
+):
+    """
+    Recherche d'objectif : pour chaque cible (ex : DSCR >= 1.3), valeur du driver
+    (prix, coûts, volume, taux ou durée du prêt) qui l'atteint, les autres hypothèses
+    restant inchangées. Toutes les cibles sont résolues en un seul appel.
+    """
+    plan = db.get(BusinessPlan, plan_id)
+    if not plan or plan.owner_id != user.id:
+        raise HTTPException(status_code=404, detail="Plan non trouvé")
+
+    base = db.exec(select(FinancialAssumptions).where(FinancialAssumptions.plan_id == plan_id)).first()
+    if not base:
+        raise HTTPException(status_code=400, detail="Aucune hypothèse existante")
+    check_horizon(body.horizon)
+
+    targets = [GoalTarget(t.driver, t.metric, t.target, t.min, t.max) for t in body.targets]
+    try:
+        results = goal_seek(base, targets, horizon=body.horizon, rate=body.rate)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"horizon": body.horizon, "rate": body.rate, "results": results}
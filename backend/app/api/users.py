@@ -1,14 +1,20 @@
 # app/api/users.py
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlmodel import Session, select
 from app.db.models import User
 from app.core.deps import get_db, require_role
 from app.schemas.users import UserOut
+from app.utils.pagination import PageParams, get_page_params, paginate
 from typing import List
 
 router = APIRouter()
 
 
 @router.get("/", response_model=List[UserOut])
-def list_users(db: Session = Depends(get_db), _: User = Depends(require_role("admin"))):
-    return db.exec(select(User)).all()
+def list_users(
+    response: Response,
+    page: PageParams = Depends(get_page_params),
+    db: Session = Depends(get_db),
+    _: User = Depends(require_role("admin"))
+):
+    return paginate(db, select(User), [User.id], page, response, key="users")
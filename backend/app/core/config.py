@@ -8,6 +8,25 @@ class Settings(BaseSettings):
     # —–– Base de données
     DATABASE_URL: str = Field(..., env="DATABASE_URL")
     POSTGRES_URL: str = Field(..., env="POSTGRES_URL")
+    # moteur async (asyncpg / aiosqlite) : dérivé de DATABASE_URL si non renseigné
+    DATABASE_ASYNC_URL: Optional[str] = Field(None, env="DATABASE_ASYNC_URL")
+
+    # Pool de connexions (sync et async) : taille, débordement, attente max (s),
+    # recyclage (s) et vérification de la connexion avant usage
+    DB_POOL_SIZE: int = Field(10, env="DB_POOL_SIZE")
+    DB_MAX_OVERFLOW: int = Field(20, env="DB_MAX_OVERFLOW")
+    DB_POOL_TIMEOUT: float = Field(30.0, env="DB_POOL_TIMEOUT")
+    DB_POOL_RECYCLE: int = Field(1800, env="DB_POOL_RECYCLE")
+    DB_POOL_PRE_PING: bool = Field(True, env="DB_POOL_PRE_PING")
+    # Postgres : durée max d'une requête (ms, 0 = illimitée)
+    DB_STATEMENT_TIMEOUT_MS: int = Field(30_000, env="DB_STATEMENT_TIMEOUT_MS")
+    # SQLite : journal WAL (lectures concurrentes d'une écriture), synchronous, attente d'un verrou (ms)
+    SQLITE_JOURNAL_MODE: str = Field("WAL", env="SQLITE_JOURNAL_MODE")
+    SQLITE_SYNCHRONOUS: str = Field("NORMAL", env="SQLITE_SYNCHRONOUS")
+    SQLITE_BUSY_TIMEOUT_MS: int = Field(5000, env="SQLITE_BUSY_TIMEOUT_MS")
+    # Pagination par curseur des listes : taille de page par défaut et maximale (?limit=)
+    PAGE_SIZE_DEFAULT: int = Field(50, env="PAGE_SIZE_DEFAULT")
+    PAGE_SIZE_MAX: int = Field(200, env="PAGE_SIZE_MAX")
 
     # —–– Authentification
     JWT_SECRET_KEY: str = Field(..., env="JWT_SECRET_KEY")
@@ -38,6 +57,65 @@ class Settings(BaseSettings):
     LLM_MAX_TOKENS: int = Field(800, env="LLM_MAX_TOKENS")
     LLM_STREAMING: bool = Field(False, env="LLM_STREAMING")
 
+    # Prompts : intervalle min. (s) entre deux vérifications du mtime d'un fichier
+    PROMPT_RELOAD_INTERVAL: float = Field(2.0, env="PROMPT_RELOAD_INTERVAL")
+
+    # Pool HTTP partagé par les clients LLM (keep-alive)
+    LLM_POOL_MAX_CONNECTIONS: int = Field(20, env="LLM_POOL_MAX_CONNECTIONS")
+    LLM_POOL_MAX_KEEPALIVE: int = Field(10, env="LLM_POOL_MAX_KEEPALIVE")
+    LLM_POOL_KEEPALIVE_EXPIRY: float = Field(60.0, env="LLM_POOL_KEEPALIVE_EXPIRY")
+    LLM_HTTP_TIMEOUT: float = Field(120.0, env="LLM_HTTP_TIMEOUT")
+
+    # Cache des réponses LLM (mémoire LRU + SQLite, ou Redis si ENABLE_REDIS)
+    LLM_CACHE_ENABLED: bool = Field(True, env="LLM_CACHE_ENABLED")
+    LLM_CACHE_TTL_SECONDS: int = Field(7 * 24 * 3600, env="LLM_CACHE_TTL_SECONDS")
+    LLM_CACHE_MAX_ITEMS: int = Field(512, env="LLM_CACHE_MAX_ITEMS")
+    LLM_CACHE_MAX_ROWS: int = Field(20000, env="LLM_CACHE_MAX_ROWS")
+    LLM_CACHE_PATH: Optional[str] = Field("data/llm_cache.sqlite3", env="LLM_CACHE_PATH")
+
+    # Limites de débit par provider (process entier) et rejeu des erreurs transitoires
+    OPENAI_RPM: int = Field(500, env="OPENAI_RPM")
+    OPENAI_TPM: int = Field(200000, env="OPENAI_TPM")
+    OLLAMA_CONCURRENCY: int = Field(2, env="OLLAMA_CONCURRENCY")
+    LLM_MAX_RETRIES: int = Field(4, env="LLM_MAX_RETRIES")
+    LLM_RETRY_BASE_DELAY: float = Field(1.0, env="LLM_RETRY_BASE_DELAY")
+    LLM_RETRY_MAX_DELAY: float = Field(30.0, env="LLM_RETRY_MAX_DELAY")
+
+    # Prix (USD / million de tokens) du modèle configuré ; remplace la table de app/llm/telemetry.py
+    LLM_PRICE_INPUT_PER_1M: Optional[float] = Field(None, env="LLM_PRICE_INPUT_PER_1M")
+    LLM_PRICE_OUTPUT_PER_1M: Optional[float] = Field(None, env="LLM_PRICE_OUTPUT_PER_1M")
+
+    # Génération : nombre max de sections générées en parallèle pour un plan
+    GENERATION_CONCURRENCY: int = Field(4, env="GENERATION_CONCURRENCY")
+    # Génération par lots : appels LLM simultanés (tous plans confondus) et plans en cours
+    BATCH_SECTION_CONCURRENCY: int = Field(16, env="BATCH_SECTION_CONCURRENCY")
+    BATCH_PLAN_CONCURRENCY: int = Field(8, env="BATCH_PLAN_CONCURRENCY")
+    # rapports de lots conservés en mémoire (les plus anciens lots terminés sont oubliés)
+    BATCH_HISTORY_SIZE: int = Field(50, env="BATCH_HISTORY_SIZE")
+
+    # Jobs de génération en tâche de fond (file en base, réveil Redis optionnel)
+    JOB_WORKERS: int = Field(2, env="JOB_WORKERS")
+    JOB_POLL_INTERVAL: float = Field(2.0, env="JOB_POLL_INTERVAL")
+    # un job `running` sans battement de cœur depuis ce délai (s) est remis en file
+    JOB_STALE_AFTER: int = Field(900, env="JOB_STALE_AFTER")
+    # battement de cœur d'un job en cours (s), indépendant de la durée des sections
+    JOB_HEARTBEAT_INTERVAL: float = Field(30.0, env="JOB_HEARTBEAT_INTERVAL")
+    # Compaction de l'historique des sections : versions conservées par section (courante incluse)
+    SECTION_HISTORY_KEEP: int = Field(5, env="SECTION_HISTORY_KEEP")
+
+    # Simulation Monte Carlo : tirages max par requête, taille des blocs, process du pool
+    MONTECARLO_MAX_DRAWS: int = Field(500_000, env="MONTECARLO_MAX_DRAWS")
+    MONTECARLO_CHUNK_SIZE: int = Field(10_000, env="MONTECARLO_CHUNK_SIZE")
+    MONTECARLO_WORKERS: int = Field(1, env="MONTECARLO_WORKERS")
+    # en dessous, le coût de démarrage du pool dépasse le gain
+    MONTECARLO_POOL_MIN_DRAWS: int = Field(200_000, env="MONTECARLO_POOL_MIN_DRAWS")
+
+    # Analyse de sensibilité : combinaisons max d'une grille (produit cartésien des deltas)
+    SENSITIVITY_MAX_COMBINATIONS: int = Field(200_000, env="SENSITIVITY_MAX_COMBINATIONS")
+
+    # Portefeuille : plans lus et évalués par bloc (mémoire bornée)
+    PORTFOLIO_CHUNK_SIZE: int = Field(5000, env="PORTFOLIO_CHUNK_SIZE")
+
     # —–– Vectorstore (ChromaDB)
     CHROMA_PERSIST_DIR: str = Field("data/chroma", env="CHROMA_PERSIST_DIR")
 
@@ -52,6 +130,8 @@ class Settings(BaseSettings):
 
     # —–– SSE
     ENABLE_SSE: bool = Field(True, env="ENABLE_SSE")
+    # événements en attente max. par flux : au-delà, la génération attend le client
+    SSE_QUEUE_SIZE: int = Field(64, env="SSE_QUEUE_SIZE")
 
     # —–– Whisper
     WHISPER_MODEL: str = Field("openai/whisper-base", env="WHISPER_MODEL")
@@ -4,7 +4,7 @@ from fastapi.security import OAuth2PasswordBearer
 from sqlmodel import Session
 from app.core.config import settings
 from app.core.security import decode_token
-from app.db.base import get_session
+from app.db.base import get_async_session, get_session
 from app.db.models import User
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
@@ -12,7 +12,14 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 def get_db():
     yield from get_session()
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
+async def get_async_db():
+    # session async (routes async) : les requêtes ne bloquent pas la boucle
+    async for session in get_async_session():
+        yield session
+
+# dépendance sync (exécutée dans le threadpool) : la lecture de l'utilisateur
+# par la session sync ne bloque pas la boucle des routes async
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
     payload = decode_token(token)
     if not payload or "sub" not in payload:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token invalide")
@@ -21,9 +28,9 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
         raise HTTPException(status_code=404, detail="Utilisateur non trouvé")
     return user
 
-def require_role(role: str):
+def require_role(*roles: str):
     def wrapper(user: User = Depends(get_current_user)):
-        if user.role != role:
+        if user.role not in roles:
             raise HTTPException(status_code=403, detail="Accès refusé")
         return user
     return wrapper
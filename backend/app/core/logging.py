@@ -2,10 +2,13 @@
 import structlog
 import logging
 import sys
+import time
 from uuid import uuid4
 from fastapi import Request
 from starlette.middleware.base import BaseHTTPMiddleware
 
+from app.core.metrics import http_request_seconds
+
 def setup_logging():
     logging.basicConfig(
         format="%(message)s",
@@ -24,11 +27,27 @@ def setup_logging():
 
 logger = structlog.get_logger()
 
+def _route_template(request: Request) -> str:
+    """Chemin avec les paramètres remis en gabarit (/generate/{plan_id}/all) : cardinalité bornée."""
+    if "route" not in request.scope:
+        return "unmatched"
+    params = {str(v): k for k, v in request.scope.get("path_params", {}).items()}
+    return "/".join(f"{{{params[seg]}}}" if seg in params else seg for seg in request.url.path.split("/"))
+
+
 class CorrelationIdMiddleware(BaseHTTPMiddleware):
     async def dispatch(self, request: Request, call_next):
         correlation_id = str(uuid4())
         request.state.correlation_id = correlation_id
         logger.info("HTTP Request", path=request.url.path, method=request.method, correlation_id=correlation_id)
+        started = time.perf_counter()
         response = await call_next(request)
+        elapsed = time.perf_counter() - started
+        route = _route_template(request)
+        http_request_seconds.observe(elapsed, method=request.method, route=route, status=response.status_code)
+        logger.info(
+            "HTTP Response", path=request.url.path, status=response.status_code,
+            duration_ms=round(elapsed * 1000, 1), correlation_id=correlation_id,
+        )
         response.headers["X-Correlation-ID"] = correlation_id
         return response
@@ -1,19 +1,232 @@
 # app/db/base.py
+"""
+Moteurs de base de données : sync (SQLModel, routes et services) et async, optionnel
+(créé au premier appel de get_async_db ; driver asyncpg / aiosqlite requis).
+
+- Pool : taille, débordement, attente max, recyclage et pre-ping configurables (DB_POOL_*).
+- Postgres : statement_timeout par connexion (DB_STATEMENT_TIMEOUT_MS).
+- SQLite (repli local) : journal WAL, synchronous et busy_timeout à chaque connexion,
+  pour éviter les "database is locked" entre lecteurs et rédacteur.
+- Le temps d'attente d'une connexion, les délais dépassés et l'occupation des pools
+  sont exposés en métriques (db_pool_*, /admin/metrics).
+"""
+import logging
+import threading
+import time
+from typing import AsyncIterator, Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import event, exc as sa_exc, inspect
+from sqlalchemy.engine import URL, Engine, make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from sqlmodel import SQLModel, create_engine, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+
 from app.core.config import settings
-import os
+from app.core.metrics import registry
+
+logger = logging.getLogger(__name__)
 
 # Fallback local SQLite si non-PostgreSQL
 DB_URL = settings.DATABASE_URL or settings.POSTGRES_URL
-connect_args = {"check_same_thread": False} if DB_URL.startswith("sqlite") else {}
 
-engine = create_engine(DB_URL, echo=False, connect_args=connect_args)
+# attente d'une connexion du pool : de quelques µs (connexion libre) au timeout
+POOL_WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+db_pool_checkout_seconds = registry.histogram(
+    "db_pool_checkout_seconds", "Attente d'une connexion du pool (s)", POOL_WAIT_BUCKETS
+)
+db_pool_timeouts = registry.counter(
+    "db_pool_timeouts_total", "Connexions non obtenues dans le délai DB_POOL_TIMEOUT"
+)
+
+
+class _TimedPoolMixin:
+    """Mesure l'attente de chaque checkout (connexion libre, nouvelle ou attendue)."""
+    label = "sync"
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except sa_exc.TimeoutError:
+            db_pool_timeouts.inc(engine=self.label)
+            raise
+        finally:
+            db_pool_checkout_seconds.observe(time.perf_counter() - started, engine=self.label)
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    label = "sync"
+
+
+class TimedAsyncQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    label = "async"
+
+
+def _is_sqlite(url: URL) -> bool:
+    return url.get_backend_name() == "sqlite"
+
+
+def _is_memory(url: URL) -> bool:
+    return _is_sqlite(url) and url.database in (None, "", ":memory:")
+
+
+def async_url(url: str) -> URL:
+    """URL du moteur async : DATABASE_ASYNC_URL, sinon DATABASE_URL avec le driver async."""
+    if settings.DATABASE_ASYNC_URL:
+        return make_url(settings.DATABASE_ASYNC_URL)
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend == "sqlite":
+        return parsed.set(drivername="sqlite+aiosqlite")
+    if backend == "postgresql":
+        return parsed.set(drivername="postgresql+asyncpg")
+    return parsed
+
+
+def _engine_options(url: URL, asynchronous: bool) -> Dict[str, object]:
+    options: Dict[str, object] = {"echo": False, "pool_pre_ping": settings.DB_POOL_PRE_PING}
+    connect_args: Dict[str, object] = {}
+    if _is_sqlite(url):
+        connect_args["check_same_thread"] = False
+        connect_args["timeout"] = settings.SQLITE_BUSY_TIMEOUT_MS / 1000.0
+    elif url.get_backend_name() == "postgresql" and settings.DB_STATEMENT_TIMEOUT_MS:
+        if asynchronous:
+            connect_args["server_settings"] = {"statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS)}
+        else:
+            connect_args["options"] = f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"
+    options["connect_args"] = connect_args
+
+    # base SQLite en mémoire : pool par défaut (une connexion partagée)
+    if not _is_memory(url):
+        options.update(
+            poolclass=TimedAsyncQueuePool if asynchronous else TimedQueuePool,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+        )
+    return options
+
+
+def _sqlite_pragmas(sync_engine: Engine) -> None:
+    @event.listens_for(sync_engine, "connect")
+    def set_pragmas(dbapi_connection, _record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+        cursor.execute(f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+        cursor.close()
+
+
+def _make_engine(url: str) -> Engine:
+    parsed = make_url(url)
+    sync_engine = create_engine(parsed, **_engine_options(parsed, asynchronous=False))
+    if _is_sqlite(parsed) and not _is_memory(parsed):
+        _sqlite_pragmas(sync_engine)
+    return sync_engine
+
+
+engine = _make_engine(DB_URL)
+
+_async_engine = None
+_async_lock = threading.Lock()
+
+
+def get_async_engine():
+    """Moteur async, créé au premier usage (driver asyncpg / aiosqlite requis)."""
+    global _async_engine
+    if _async_engine is None:
+        with _async_lock:
+            if _async_engine is None:
+                from sqlalchemy.ext.asyncio import create_async_engine
+
+                url = async_url(DB_URL)
+                try:
+                    async_engine = create_async_engine(url, **_engine_options(url, asynchronous=True))
+                except ImportError as e:
+                    raise RuntimeError(
+                        f"Driver async non installé pour {url.drivername} (pip install asyncpg / aiosqlite)"
+                    ) from e
+                if _is_sqlite(url) and not _is_memory(url):
+                    _sqlite_pragmas(async_engine.sync_engine)
+                _async_engine = async_engine
+    return _async_engine
+
+
+async def dispose_async_engine() -> None:
+    global _async_engine
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
+
 
 def get_session():
     with Session(engine) as session:
         yield session
 
+
+async def get_async_session() -> AsyncIterator[AsyncSession]:
+    async with AsyncSession(get_async_engine(), expire_on_commit=False) as session:
+        yield session
+
+
+def _pool_state(pool) -> Optional[Dict[str, float]]:
+    if not isinstance(pool, QueuePool):
+        return None
+    size, overflow_max = pool.size(), max(pool._max_overflow, 0)
+    checked_out = pool.checkedout()
+    return {
+        "size": size,
+        "max_overflow": overflow_max,
+        "checked_out": checked_out,
+        "idle": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        # part des connexions possibles en usage : 1 -> les checkouts suivants attendent
+        "saturation": round(checked_out / (size + overflow_max), 4) if size + overflow_max else 0.0,
+    }
+
+
+def pool_stats() -> Dict[str, Optional[Dict[str, float]]]:
+    """État des pools sync et async (None : pool non mesuré ou moteur async non créé)."""
+    return {
+        "sync": _pool_state(engine.pool),
+        "async": _pool_state(_async_engine.sync_engine.pool) if _async_engine is not None else None,
+    }
+
+
+def _collect(field: str) -> Iterable[Tuple[Dict[str, object], float]]:
+    for label, state in pool_stats().items():
+        if state is not None:
+            yield {"engine": label}, state[field]
+
+
+db_pool_checked_out = registry.gauge(
+    "db_pool_checked_out", "Connexions du pool en usage", lambda: _collect("checked_out")
+)
+db_pool_saturation = registry.gauge(
+    "db_pool_saturation", "Connexions en usage / (pool_size + max_overflow)", lambda: _collect("saturation")
+)
+
+
 def init_db():
     import app.db.models  # Important : importe tous les modèles
     import app.services.finance.models
+    from app.db.upgrade import upgrade_schema
+    from app.services.search import init_search_index
     SQLModel.metadata.create_all(engine)
+    # create_all n'ajoute ni colonnes ni index aux tables existantes (pas de migrations)
+    with engine.begin() as conn:
+        upgrade_schema(conn)
+        inspector = inspect(conn)
+        for table in SQLModel.metadata.sorted_tables:
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            for index in table.indexes:
+                missing = [c.name for c in index.columns if c.name not in existing]
+                if missing:
+                    # colonne non déclarée dans app/db/upgrade.py : l'index attend la mise à niveau
+                    logger.warning("Index %s non créé : colonne(s) absente(s) %s", index.name, ", ".join(missing))
+                    continue
+                index.create(conn, checkfirst=True)
+    # index plein texte (FTS5 / tsvector), hors métadonnées SQLModel
+    init_search_index(engine)
@@ -1,7 +1,7 @@
 # app/db/models.py
 from sqlmodel import SQLModel, Field, Relationship, JSON
-from sqlalchemy import Column
-from typing import Optional, List
+from sqlalchemy import Column, Index
+from typing import Optional, List, Dict
 from datetime import datetime, timezone
 from enum import Enum
 
@@ -25,6 +25,12 @@ class User(SQLModel, table=True):
 
 
 class BusinessPlan(SQLModel, table=True):
+    # plans d'un propriétaire (filtre de toutes les routes), par statut, triés par id
+    __table_args__ = (
+        Index("ix_businessplan_owner", "owner_id", "id"),
+        Index("ix_businessplan_owner_status", "owner_id", "status", "id"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     owner_id: int = Field(foreign_key="user.id")
     title: str
@@ -52,8 +58,19 @@ class PlanSectionType(str, Enum):
     finance      = "finance"
 
 class PlanSection(SQLModel, table=True):
+    """
+    Une version d'une section : chaque génération ajoute une version, la précédente
+    reste en historique (is_current = False) jusqu'à compaction.
+    """
+    __table_args__ = (
+        # versions courantes d'un plan : lectures, exports, contexte de génération
+        Index("ix_plansection_current", "plan_id", "is_current", "section_type"),
+        # historique d'une section ; deux écritures concurrentes prennent le même numéro -> conflit
+        Index("ux_plansection_version", "plan_id", "section_type", "version", unique=True),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
-    plan_id: int      = Field(foreign_key="businessplan.id", index=True)
+    plan_id: int      = Field(foreign_key="businessplan.id")
 
     # Renommé pour plus de clarté
     section_type: PlanSectionType
@@ -70,6 +87,9 @@ class PlanSection(SQLModel, table=True):
 
     generated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
+    version: int = 1
+    is_current: bool = True
+
     plan: BusinessPlan = Relationship(back_populates="sections")
 
 
@@ -83,3 +103,45 @@ class ExportJob(SQLModel, table=True):
 
     # Relation inverse vers BusinessPlan
     plan: BusinessPlan = Relationship(back_populates="export_jobs")
+
+
+class GenerationJobStatus(str, Enum):
+    queued    = "queued"
+    running   = "running"
+    done      = "done"
+    failed    = "failed"
+
+
+class GenerationJob(SQLModel, table=True):
+    """Génération complète d'un plan exécutée en tâche de fond (reprenable)."""
+    # jobs d'un plan (historique, job actif) ; file d'attente (jobs en file, du plus ancien au plus récent)
+    __table_args__ = (
+        Index("ix_generationjob_plan", "plan_id", "id"),
+        Index("ix_generationjob_status_id", "status", "id"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    plan_id: int = Field(foreign_key="businessplan.id")
+    owner_id: int = Field(foreign_key="user.id")
+    status: GenerationJobStatus = Field(default=GenerationJobStatus.queued)
+    use_cache: bool = True
+
+    # section_type -> PlanSection.id déjà écrite par ce job (sautée à la reprise)
+    section_ids: Dict[str, int] = Field(
+        default_factory=dict,
+        sa_column=Column(JSON, nullable=False),
+        description="Sections enregistrées par ce job"
+    )
+    # section_type -> dernière erreur rencontrée
+    errors: Dict[str, str] = Field(
+        default_factory=dict,
+        sa_column=Column(JSON, nullable=False),
+        description="Erreurs par section"
+    )
+    attempts: int = 0
+    worker_id: Optional[str] = None
+
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    started_at: Optional[datetime] = None
+    heartbeat_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
@@ -3,6 +3,7 @@ from app.db.base import engine
 from app.db.models import User, BusinessPlan
 from sqlmodel import Session, select
 from app.core.security import hash_password
+from app.services.search import index_plan
 from datetime import datetime
 
 def seed_initial_data():
@@ -42,5 +43,8 @@ def seed_initial_data():
             ]
 
             session.add_all(plans)
+            session.flush()
+            for plan in plans:
+                index_plan(session, plan)
             session.commit()
             print("✅ Admin et 3 plans préconfigurés ajoutés")
@@ -0,0 +1,78 @@
+# app/db/upgrade.py
+"""
+Mise à niveau d'une base existante (pas de migrations) : create_all crée les tables
+manquantes mais n'ajoute aucune colonne aux tables existantes.
+
+Chaque colonne ajoutée à un modèle après la création de la base est déclarée dans
+ADDED_COLUMNS avec sa valeur SQL par défaut (None : colonne nullable, sans défaut).
+upgrade_schema() ajoute celles qui manquent (idempotent) puis numérote les versions
+de sections ; init_db l'appelle avant de créer les index.
+"""
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import inspect
+from sqlalchemy.engine import Connection
+from sqlalchemy.sql.type_api import TypeEngine
+from sqlalchemy.types import SchemaType
+from sqlmodel import SQLModel
+
+# table -> ((colonne, défaut SQL), ...)
+ADDED_COLUMNS: Dict[str, Tuple[Tuple[str, Optional[str]], ...]] = {
+    "financialassumptions": (
+        ("loan_amount", None),
+        ("repayment_type", "'annuity'"),
+        ("grace_months", "0"),
+        ("grace_type", "'partial'"),
+        ("monthly_units", "100.0"),
+        ("assumptions_hash", None),
+    ),
+    "financialforecast": (
+        ("horizon", "12"),
+        ("granularity", "'monthly'"),
+        ("period_index", "0"),
+        ("debt_service", "0.0"),
+    ),
+    "scenario": (
+        ("horizon", "36"),
+        ("rate", "0.1"),
+        ("assumptions_hash", None),
+        ("kpis", None),
+        ("forecast", None),
+        ("computed_at", None),
+    ),
+}
+
+
+def _column_type(conn: Connection, column_type: TypeEngine) -> str:
+    if isinstance(column_type, SchemaType):
+        # Enum Postgres : le type nommé doit exister avant la colonne
+        column_type.create(conn, checkfirst=True)
+    return column_type.compile(dialect=conn.dialect)
+
+
+def add_missing_columns(conn: Connection) -> None:
+    import app.db.models  # noqa: F401 (tables déclarées dans les métadonnées)
+    import app.services.finance.models  # noqa: F401
+    tables = set(inspect(conn).get_table_names())
+    preparer = conn.dialect.identifier_preparer
+    for table_name, columns in ADDED_COLUMNS.items():
+        if table_name not in tables:
+            continue  # table créée à l'instant par create_all, déjà complète
+        table = SQLModel.metadata.tables[table_name]
+        existing = {c["name"] for c in inspect(conn).get_columns(table_name)}
+        for name, default in columns:
+            if name in existing:
+                continue
+            ddl = (
+                f"ALTER TABLE {preparer.quote(table_name)} ADD COLUMN {preparer.quote(name)} "
+                f"{_column_type(conn, table.c[name].type)}"
+            )
+            if default is not None:
+                ddl += f" NOT NULL DEFAULT {default}"
+            conn.exec_driver_sql(ddl)
+
+
+def upgrade_schema(conn: Connection) -> None:
+    from app.services.section_versions import upgrade_section_versions
+    add_missing_columns(conn)
+    upgrade_section_versions(conn)
@@ -0,0 +1,262 @@
+# app/llm/cache.py
+"""
+Cache des réponses LLM, adressé par contenu.
+
+Clé = sha256(texte du prompt, modèle, température, variables hydratées).
+Deux niveaux :
+- mémoire : LRU borné (LLM_CACHE_MAX_ITEMS) avec TTL ;
+- persistant : fichier SQLite (LLM_CACHE_PATH) ou Redis si ENABLE_REDIS.
+Un appel identique (même section, mêmes hypothèses) ne coûte alors plus aucun token.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from app.core.config import settings
+
+try:
+    import redis  # optionnel : uniquement si ENABLE_REDIS
+except Exception:
+    redis = None
+
+
+def prompt_hash(template_text: str) -> str:
+    return hashlib.sha256(template_text.encode("utf-8")).hexdigest()
+
+
+def cache_key(
+    template_text: str,
+    model: str,
+    temperature: Optional[float],
+    inputs: Mapping[str, Any],
+) -> str:
+    payload = json.dumps(
+        {
+            "prompt": prompt_hash(template_text),
+            "model": model,
+            "temperature": temperature,
+            "inputs": {k: str(v) for k, v in inputs.items()},
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class MemoryLRU:
+    """LRU thread-safe avec expiration."""
+
+    def __init__(self, max_items: int, ttl: float):
+        self.max_items = max_items
+        self.ttl = ttl
+        self._data: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str) -> None:
+        with self._lock:
+            self._data[key] = (time.time() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_items:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SQLiteStore:
+    """Niveau persistant local : une table (clé, valeur, expiration)."""
+
+    # on ne purge pas à chaque écriture : la taille est vérifiée toutes les N insertions
+    PRUNE_EVERY = 50
+
+    def __init__(self, path: str, max_rows: int, ttl: float):
+        self.path = path
+        self.max_rows = max_rows
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.evictions = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+            " created_at REAL NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_llm_cache_created ON llm_cache (created_at)")
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] < time.time():
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                return None
+            return row[0]
+
+    def set(self, key: str, value: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, created_at, expires_at) VALUES (?, ?, ?, ?)",
+                (key, value, now, now + self.ttl),
+            )
+            self._writes += 1
+            if self._writes % self.PRUNE_EVERY == 0:
+                self._prune(now)
+
+    def _prune(self, now: float) -> None:
+        expired = self._conn.execute("DELETE FROM llm_cache WHERE expires_at < ?", (now,)).rowcount
+        overflow = self._conn.execute(
+            "DELETE FROM llm_cache WHERE key IN ("
+            " SELECT key FROM llm_cache ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_rows,),
+        ).rowcount
+        self.evictions += max(expired, 0) + max(overflow, 0)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+
+
+class RedisStore:
+    """Niveau persistant partagé : TTL natif Redis, taille bornée par la politique maxmemory."""
+
+    PREFIX = "llmcache:"
+
+    def __init__(self, url: str, ttl: float):
+        self.ttl = int(ttl)
+        self.evictions = 0
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, key: str) -> Optional[str]:
+        value = self._client.get(self.PREFIX + key)
+        return value.decode("utf-8") if value is not None else None
+
+    def set(self, key: str, value: str) -> None:
+        self._client.set(self.PREFIX + key, value.encode("utf-8"), ex=self.ttl)
+
+    def clear(self) -> None:
+        for key in self._client.scan_iter(f"{self.PREFIX}*"):
+            self._client.delete(key)
+
+
+class LLMResponseCache:
+    def __init__(self, memory: MemoryLRU, store: Optional[Any] = None):
+        self.memory = memory
+        self.store = store
+        self._lock = threading.Lock()
+        self.counters: Dict[str, int] = {
+            "memory_hits": 0,
+            "persistent_hits": 0,
+            "misses": 0,
+            "writes": 0,
+            "bypassed": 0,
+            "errors": 0,
+        }
+
+    def _incr(self, name: str) -> None:
+        with self._lock:
+            self.counters[name] += 1
+
+    def get(self, key: str) -> Optional[str]:
+        value = self.memory.get(key)
+        if value is not None:
+            self._incr("memory_hits")
+            return value
+        if self.store is not None:
+            try:
+                value = self.store.get(key)
+            except Exception:
+                # le cache ne doit jamais faire échouer une génération
+                self._incr("errors")
+                value = None
+            if value is not None:
+                self.memory.set(key, value)
+                self._incr("persistent_hits")
+                return value
+        self._incr("misses")
+        return None
+
+    def set(self, key: str, value: str) -> None:
+        self.memory.set(key, value)
+        if self.store is not None:
+            try:
+                self.store.set(key, value)
+            except Exception:
+                self._incr("errors")
+        self._incr("writes")
+
+    def record_bypass(self) -> None:
+        self._incr("bypassed")
+
+    def clear(self) -> None:
+        self.memory.clear()
+        if self.store is not None:
+            self.store.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self.counters)
+        lookups = counters["memory_hits"] + counters["persistent_hits"] + counters["misses"]
+        hits = counters["memory_hits"] + counters["persistent_hits"]
+        return {
+            **counters,
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+            "memory_items": len(self.memory),
+            "evictions": self.memory.evictions + getattr(self.store, "evictions", 0),
+            "backend": type(self.store).__name__ if self.store is not None else None,
+        }
+
+
+_cache: Optional[LLMResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def _build_store(ttl: float) -> Optional[Any]:
+    if settings.ENABLE_REDIS and settings.REDIS_URL and redis is not None:
+        return RedisStore(settings.REDIS_URL, ttl)
+    if settings.LLM_CACHE_PATH:
+        return SQLiteStore(settings.LLM_CACHE_PATH, settings.LLM_CACHE_MAX_ROWS, ttl)
+    return None
+
+
+def get_llm_cache() -> Optional[LLMResponseCache]:
+    """Cache partagé du process (None si LLM_CACHE_ENABLED=false)."""
+    global _cache
+    if not settings.LLM_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            ttl = float(settings.LLM_CACHE_TTL_SECONDS)
+            _cache = LLMResponseCache(MemoryLRU(settings.LLM_CACHE_MAX_ITEMS, ttl), _build_store(ttl))
+        return _cache
@@ -1,28 +1,11 @@
 # app/llm/chains.py
-import os
-import re
-from pathlib import Path
-from functools import lru_cache
-from typing import List
-
 from fastapi import HTTPException
 from langchain.prompts import PromptTemplate
 from langchain.chains import LLMChain
 
-from app.core.config import settings
 from app.db.models import PlanSectionType
-
-# — Backend LLM
-try:
-    from langchain_openai import ChatOpenAI  # recommandé
-except Exception:
-    ChatOpenAI = None
-
-try:
-    from langchain_ollama import Ollama
-    OLLAMA_AVAILABLE = True
-except Exception:
-    OLLAMA_AVAILABLE = False
+from app.llm.clients import get_default_chat_model
+from app.llm.prompt_registry import prompt_registry
 
 try:
     from langchain_core.output_parsers import StrOutputParser
@@ -31,33 +14,13 @@ except Exception:
     from langchain.output_parsers import StrOutputParser  # fallback
 
 
-PROMPTS_DIR = Path(__file__).with_name("prompts")
-
-
-def _extract_vars(template_text: str) -> List[str]:
-    """Récupère les variables {var} présentes dans un fichier de prompt."""
-    return sorted(set(re.findall(r"{([a-zA-Z_][a-zA-Z0-9_]*)}", template_text)))
-
-
-@lru_cache(maxsize=64)
-def _read_prompt_file(filename: str) -> str:
-    path = PROMPTS_DIR / filename
-    if not path.exists():
-        raise HTTPException(
-            status_code=404,
-            detail=f"Prompt introuvable: {filename}. Disponibles: "
-                   f"{', '.join(sorted(p.name for p in PROMPTS_DIR.glob('*.txt')))}"
-        )
-    return path.read_text(encoding="utf-8")
-
-
 def load_prompt(section: PlanSectionType) -> PromptTemplate:
     """
-    Mappe une section métier vers le bon fichier .txt et construit le PromptTemplate.
+    Mappe une section métier vers le bon fichier .txt et renvoie son PromptTemplate.
     """
     # Sélection du prompt finance (préférence pour le structuré s'il existe)
     finance_file = "financial_structured.txt"
-    if not (PROMPTS_DIR / finance_file).exists():
+    if not prompt_registry.exists(finance_file):
         finance_file = "finance.txt"
 
     mapping = {
@@ -77,39 +40,13 @@ def load_prompt(section: PlanSectionType) -> PromptTemplate:
             detail=f"Aucun prompt mappé pour la section: {getattr(section, 'value', str(section))}"
         )
 
-    text = _read_prompt_file(filename)
-    vars_ = _extract_vars(text)
-    return PromptTemplate(template=text, input_variables=vars_)
-
-
-def _get_openai_chat():
-    if ChatOpenAI is None:
-        raise HTTPException(status_code=500, detail="langchain_openai non disponible")
-    if not settings.OPENAI_API_KEY:
-        raise HTTPException(status_code=400, detail="OPENAI_API_KEY manquant")
-
-    # ✅ Sécurise les modèles chat (évite d'appeler un modèle *instruct* sur /chat/completions)
-    model = settings.OPENAI_MODEL
-    if model.endswith("-instruct"):
-        # bascule auto vers un modèle chat compatible
-        model = "gpt-4o-mini"
+    # Template précompilé par le registre (relu uniquement si le fichier change)
+    return prompt_registry.get_template(filename)
 
-    return ChatOpenAI(
-        model=model,
-        temperature=settings.LLM_TEMPERATURE,
-        max_tokens=settings.LLM_MAX_TOKENS,
-        streaming=getattr(settings, "LLM_STREAMING", False),
-        api_key=settings.OPENAI_API_KEY,
-    )
 
 def get_llm():
-    use_ollama = str(getattr(settings, "USE_OLLAMA", "false")).lower() == "true"
-    use_openai = str(getattr(settings, "USE_OPENAI", "false")).lower() == "true"
-    if use_ollama:
-        return _get_ollama()
-    if use_openai:
-        return _get_openai_chat()
-    raise HTTPException(status_code=400, detail="LLM désactivé. Activez USE_OPENAI ou USE_OLLAMA.")
+    """Client LLM partagé du provider configuré (voir app.llm.clients)."""
+    return get_default_chat_model()
 
 # ✅ Nouveau : runnable sans LLMChain (supprime l’avertissement deprecation)
 def get_llm_runnable(section: PlanSectionType):
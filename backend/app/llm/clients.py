@@ -0,0 +1,228 @@
+# app/llm/clients.py
+"""
+Registre process-wide des clients LLM.
+
+Un client (ChatOpenAI / ChatOllama) est construit une seule fois par
+(provider, modèle, température, max_tokens) puis réutilisé : les appels
+partagent le même pool HTTP keep-alive au lieu de refaire un handshake TLS
+à chaque section.
+
+- Le pool synchrone (httpx.Client) est unique pour le process.
+- Un pool asynchrone (httpx.AsyncClient) est lié à une boucle asyncio : on en
+  garde un par boucle, libéré automatiquement quand la boucle disparaît.
+"""
+import asyncio
+import threading
+import weakref
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+from fastapi import HTTPException
+
+from app.core.config import settings
+
+try:
+    from langchain_openai import ChatOpenAI
+except Exception:
+    ChatOpenAI = None
+
+try:
+    from langchain_ollama import ChatOllama
+    OLLAMA_AVAILABLE = True
+except Exception:
+    ChatOllama = None
+    OLLAMA_AVAILABLE = False
+
+ClientKey = Tuple[str, str, float, Optional[int]]
+
+_lock = threading.RLock()
+_sync_http: Optional[httpx.Client] = None
+# boucle asyncio -> pool HTTP async / clients LLM construits pour cette boucle
+_async_http: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+_loop_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[ClientKey, Any]]" = weakref.WeakKeyDictionary()
+# clients demandés hors boucle (scripts, routes sync)
+_clients: Dict[ClientKey, Any] = {}
+_stats = {"hits": 0, "misses": 0}
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=settings.LLM_POOL_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.LLM_POOL_MAX_KEEPALIVE,
+        keepalive_expiry=settings.LLM_POOL_KEEPALIVE_EXPIRY,
+    )
+
+
+def _timeout() -> httpx.Timeout:
+    return httpx.Timeout(settings.LLM_HTTP_TIMEOUT, connect=10.0)
+
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+def _get_sync_http() -> httpx.Client:
+    global _sync_http
+    with _lock:
+        if _sync_http is None or _sync_http.is_closed:
+            _sync_http = httpx.Client(limits=_limits(), timeout=_timeout())
+        return _sync_http
+
+
+def _get_async_http(loop: Optional[asyncio.AbstractEventLoop]) -> Optional[httpx.AsyncClient]:
+    """Pool async de la boucle courante (None hors boucle : le SDK créera le sien à la demande)."""
+    if loop is None:
+        return None
+    with _lock:
+        client = _async_http.get(loop)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(limits=_limits(), timeout=_timeout())
+            _async_http[loop] = client
+        return client
+
+
+def openai_chat_model() -> str:
+    # ✅ Sécurise les modèles chat (évite d'appeler un modèle *instruct* sur /chat/completions)
+    model = settings.OPENAI_MODEL
+    if model.endswith("-instruct"):
+        # bascule auto vers un modèle chat compatible
+        model = "gpt-4o-mini"
+    return model
+
+
+def _build_openai(model: str, temperature: float, max_tokens: Optional[int], loop) -> Any:
+    if ChatOpenAI is None:
+        raise HTTPException(status_code=500, detail="langchain_openai non disponible")
+    if not settings.OPENAI_API_KEY:
+        raise HTTPException(status_code=400, detail="OPENAI_API_KEY manquant")
+    kwargs: Dict[str, Any] = dict(
+        model=model,
+        temperature=temperature,
+        streaming=getattr(settings, "LLM_STREAMING", False),
+        # usage (tokens) renvoyé aussi en streaming, pour l'instrumentation
+        stream_usage=True,
+        api_key=settings.OPENAI_API_KEY,
+        base_url=getattr(settings, "OPENAI_BASE_URL", None),
+        http_client=_get_sync_http(),
+        # pas de rejeu dans le SDK : acall_limited / call_limited gèrent tous les rejeux
+        # (backoff, penalize() des buckets partagés sur 429)
+        max_retries=0,
+    )
+    if max_tokens is not None:
+        kwargs["max_tokens"] = max_tokens
+    async_http = _get_async_http(loop)
+    if async_http is not None:
+        kwargs["http_async_client"] = async_http
+    return ChatOpenAI(**kwargs)
+
+
+def _build_ollama(model: str, temperature: float, max_tokens: Optional[int]) -> Any:
+    if not OLLAMA_AVAILABLE:
+        raise HTTPException(status_code=500, detail="langchain_ollama non disponible")
+    kwargs: Dict[str, Any] = dict(model=model, temperature=temperature)
+    if settings.OLLAMA_API_BASE:
+        kwargs["base_url"] = settings.OLLAMA_API_BASE
+    if max_tokens is not None:
+        kwargs["num_predict"] = max_tokens
+    return ChatOllama(**kwargs)
+
+
+def get_chat_model(
+    provider: str,
+    model: str,
+    temperature: float,
+    max_tokens: Optional[int] = None,
+) -> Any:
+    """
+    Retourne le client LLM partagé pour cette configuration (construit au premier appel).
+    Appelé depuis une coroutine, le client est rattaché au pool async de la boucle courante.
+    """
+    key: ClientKey = (provider, model, float(temperature), max_tokens)
+    loop = _running_loop()
+    with _lock:
+        bucket = _clients if loop is None else _loop_clients.setdefault(loop, {})
+        client = bucket.get(key)
+        if client is not None:
+            _stats["hits"] += 1
+            return client
+
+        if provider == "openai":
+            client = _build_openai(model, temperature, max_tokens, loop)
+        elif provider == "ollama":
+            client = _build_ollama(model, temperature, max_tokens)
+        else:
+            raise HTTPException(status_code=400, detail=f"Provider LLM inconnu: {provider}")
+        bucket[key] = client
+        _stats["misses"] += 1
+        return client
+
+
+def default_provider() -> str:
+    use_ollama = str(getattr(settings, "USE_OLLAMA", "false")).lower() == "true"
+    use_openai = str(getattr(settings, "USE_OPENAI", "false")).lower() == "true"
+    if use_ollama:
+        return "ollama"
+    if use_openai:
+        return "openai"
+    raise HTTPException(status_code=400, detail="LLM désactivé. Activez USE_OPENAI ou USE_OLLAMA.")
+
+
+def get_default_chat_model(
+    temperature: Optional[float] = None,
+    max_tokens: Optional[int] = None,
+) -> Any:
+    """Client du provider configuré (USE_OLLAMA prioritaire sur USE_OPENAI)."""
+    provider = default_provider()
+    model = settings.OLLAMA_MODEL if provider == "ollama" else openai_chat_model()
+    return get_chat_model(
+        provider,
+        model,
+        settings.LLM_TEMPERATURE if temperature is None else temperature,
+        settings.LLM_MAX_TOKENS if max_tokens is None else max_tokens,
+    )
+
+
+def _pool_connections(client: Optional[Any]) -> Dict[str, int]:
+    """Compte les connexions du pool httpx (attributs internes, best effort)."""
+    pool = getattr(getattr(client, "_transport", None), "_pool", None)
+    connections = list(getattr(pool, "connections", None) or [])
+    idle = sum(1 for c in connections if getattr(c, "is_idle", lambda: False)())
+    return {"open": len(connections), "idle": idle, "active": len(connections) - idle}
+
+
+def pool_stats() -> Dict[str, Any]:
+    """Statistiques du registre et des pools HTTP (exposées par /admin/metrics)."""
+    with _lock:
+        loop_clients = sum(len(c) for c in _loop_clients.values())
+        async_pools = [c for c in _async_http.values() if not c.is_closed]
+        async_conns = [_pool_connections(c) for c in async_pools]
+        return {
+            "clients": len(_clients) + loop_clients,
+            "hits": _stats["hits"],
+            "misses": _stats["misses"],
+            "event_loops": len(async_pools),
+            "limits": {
+                "max_connections": settings.LLM_POOL_MAX_CONNECTIONS,
+                "max_keepalive_connections": settings.LLM_POOL_MAX_KEEPALIVE,
+                "keepalive_expiry": settings.LLM_POOL_KEEPALIVE_EXPIRY,
+            },
+            "sync_pool": _pool_connections(_sync_http) if _sync_http and not _sync_http.is_closed else None,
+            "async_pools": {
+                key: sum(c[key] for c in async_conns) for key in ("open", "idle", "active")
+            },
+        }
+
+
+def close_clients() -> None:
+    """Ferme le pool synchrone et oublie les clients (arrêt de l'application)."""
+    global _sync_http
+    with _lock:
+        if _sync_http is not None:
+            _sync_http.close()
+            _sync_http = None
+        _clients.clear()
+        _loop_clients.clear()
+        _async_http.clear()
@@ -0,0 +1,144 @@
+# app/llm/prompt_registry.py
+"""
+Registre des prompts de app/llm/prompts/.
+
+Chaque fichier .txt est lu et compilé (PromptTemplate + variables) une seule
+fois, puis partagé par chains.py, prompt_loader.py et generator_extras.py.
+Un fichier n'est relu que si son mtime change : l'édition d'un prompt est
+prise en compte sans redémarrer, sans I/O disque à chaque requête.
+"""
+import hashlib
+import re
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from langchain.prompts import PromptTemplate
+
+from app.core.config import settings
+
+PROMPTS_DIR = Path(__file__).with_name("prompts")
+
+_VAR_RE = re.compile(r"{([a-zA-Z_][a-zA-Z0-9_]*)}")
+
+
+def _extract_vars(template_text: str) -> List[str]:
+    """Récupère les variables {var} présentes dans un fichier de prompt."""
+    return sorted(set(_VAR_RE.findall(template_text)))
+
+
+def _filename(name: str) -> str:
+    return name if name.endswith(".txt") else f"{name}.txt"
+
+
+@dataclass(frozen=True)
+class CompiledPrompt:
+    filename: str
+    mtime: float
+    text: str
+    digest: str
+    input_variables: Tuple[str, ...]
+    template: Optional[PromptTemplate]
+    error: Optional[Exception] = None
+
+    def get_template(self) -> PromptTemplate:
+        if self.template is None:
+            # prompt présent mais invalide (ex. accolades JSON non échappées)
+            raise self.error
+        return self.template
+
+
+class PromptRegistry:
+    def __init__(self, directory: Path, check_interval: float = 2.0):
+        self.directory = directory
+        self.check_interval = check_interval
+        self._prompts: Dict[str, CompiledPrompt] = {}
+        self._checked_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.reloads = 0
+
+    def _compile(self, path: Path, mtime: float) -> CompiledPrompt:
+        text = path.read_text(encoding="utf-8")
+        vars_ = _extract_vars(text)
+        try:
+            template, error = PromptTemplate(template=text, input_variables=vars_), None
+        except Exception as e:
+            template, error = None, e
+        return CompiledPrompt(
+            filename=path.name,
+            mtime=mtime,
+            text=text,
+            digest=hashlib.sha256(text.encode("utf-8")).hexdigest(),
+            input_variables=tuple(vars_),
+            template=template,
+            error=error,
+        )
+
+    def load_all(self) -> int:
+        """Charge et compile tous les prompts (appelé au démarrage)."""
+        with self._lock:
+            now = time.monotonic()
+            for path in sorted(self.directory.glob("*.txt")):
+                self._prompts[path.name] = self._compile(path, path.stat().st_mtime)
+                self._checked_at[path.name] = now
+            return len(self._prompts)
+
+    def _not_found(self, filename: str) -> HTTPException:
+        return HTTPException(
+            status_code=404,
+            detail=f"Prompt introuvable: {filename}. Disponibles: {', '.join(self.names())}"
+        )
+
+    def get(self, name: str) -> CompiledPrompt:
+        """Prompt compilé ; relu depuis le disque seulement si le fichier a changé."""
+        filename = _filename(name)
+        if "/" in filename or "\\" in filename or filename.startswith("."):
+            raise self._not_found(filename)
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._prompts.get(filename)
+            if entry is not None and now - self._checked_at.get(filename, 0.0) < self.check_interval:
+                return entry
+
+            path = self.directory / filename
+            try:
+                mtime = path.stat().st_mtime
+            except FileNotFoundError:
+                self._prompts.pop(filename, None)
+                self._checked_at.pop(filename, None)
+                raise self._not_found(filename)
+
+            self._checked_at[filename] = now
+            if entry is None or entry.mtime != mtime:
+                entry = self._compile(path, mtime)
+                self._prompts[filename] = entry
+                self.reloads += 1
+            return entry
+
+    def get_template(self, name: str) -> PromptTemplate:
+        return self.get(name).get_template()
+
+    def exists(self, name: str) -> bool:
+        try:
+            self.get(name)
+        except HTTPException:
+            return False
+        return True
+
+    def name_of(self, template: PromptTemplate) -> Optional[str]:
+        """Nom du fichier d'un template servi par le registre (None pour un template construit ailleurs)."""
+        with self._lock:
+            for filename, entry in self._prompts.items():
+                if entry.template is template:
+                    return filename[:-4]
+        return None
+
+    def names(self) -> List[str]:
+        return sorted(p.name for p in self.directory.glob("*.txt"))
+
+
+prompt_registry = PromptRegistry(PROMPTS_DIR, settings.PROMPT_RELOAD_INTERVAL)
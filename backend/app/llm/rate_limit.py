@@ -0,0 +1,306 @@
+# app/llm/rate_limit.py
+"""
+Limitation de débit des appels LLM, par provider et pour tout le process.
+
+- OpenAI : deux seaux à jetons, requêtes/minute (OPENAI_RPM) et tokens/minute
+  (OPENAI_TPM, estimés à partir du prompt et de max_tokens) ;
+- Ollama : nombre d'appels simultanés (OLLAMA_CONCURRENCY), le serveur local
+  étant limité par le GPU et non par un quota.
+
+Les erreurs transitoires (429, 5xx, timeouts) sont rejouées avec un backoff
+exponentiel à gigue complète ; un 429 vide aussi le seau du provider pour que
+tous les appelants marquent la pause ensemble, au lieu d'une avalanche de 429.
+
+Les seaux utilisent un verrou de thread : ils sont partagés entre la boucle
+asyncio des routes/workers et les appels synchrones faits dans des threads.
+"""
+import asyncio
+import logging
+import random
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# estimation grossière sans tokenizer : ~4 caractères par token
+CHARS_PER_TOKEN = 4
+_POLL = 0.05
+
+
+class TokenBucket:
+    """Seau à jetons : `capacity` jetons, rechargés de `capacity` par `period` secondes."""
+
+    def __init__(self, capacity: float, period: float = 60.0):
+        self.capacity = float(capacity)
+        self.rate = self.capacity / period
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, amount: float) -> float:
+        """Prend `amount` jetons si possible (renvoie 0), sinon le délai d'attente estimé."""
+        # une demande plus grosse que le seau passe quand il est plein, sinon elle attendrait toujours
+        amount = min(float(amount), self.capacity)
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if self._tokens >= amount:
+                self._tokens -= amount
+                return 0.0
+            return (amount - self._tokens) / self.rate
+
+    def refund(self, amount: float) -> None:
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + min(float(amount), self.capacity))
+
+    def drain(self) -> None:
+        with self._lock:
+            self._tokens = 0.0
+            self._updated = time.monotonic()
+
+    @property
+    def available(self) -> float:
+        with self._lock:
+            self._refill(time.monotonic())
+            return self._tokens
+
+
+class ConcurrencyGate:
+    """Sémaphore utilisable depuis n'importe quelle boucle asyncio ou thread."""
+
+    def __init__(self, limit: int):
+        self.limit = max(1, int(limit))
+        self.in_use = 0
+        self._lock = threading.Lock()
+
+    def try_enter(self) -> bool:
+        with self._lock:
+            if self.in_use < self.limit:
+                self.in_use += 1
+                return True
+            return False
+
+    def leave(self) -> None:
+        with self._lock:
+            self.in_use -= 1
+
+
+class ProviderLimiter:
+    def __init__(
+        self,
+        provider: str,
+        rpm: Optional[int] = None,
+        tpm: Optional[int] = None,
+        concurrency: Optional[int] = None,
+    ):
+        self.provider = provider
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.gate = ConcurrencyGate(concurrency) if concurrency else None
+        self._lock = threading.Lock()
+        self.counters: Dict[str, float] = {
+            "calls": 0, "retries": 0, "rate_limited": 0, "failures": 0,
+            "tokens_estimated": 0, "wait_seconds": 0.0,
+        }
+
+    def incr(self, name: str, value: float = 1) -> None:
+        with self._lock:
+            self.counters[name] += value
+
+    def _try(self, tokens: int) -> float:
+        if self.requests is not None:
+            delay = self.requests.try_acquire(1)
+            if delay:
+                return delay
+        if self.tokens is not None:
+            delay = self.tokens.try_acquire(tokens)
+            if delay:
+                # la requête n'est pas partie : on rend son jeton de requête
+                if self.requests is not None:
+                    self.requests.refund(1)
+                return delay
+        if self.gate is not None and not self.gate.try_enter():
+            if self.requests is not None:
+                self.requests.refund(1)
+            if self.tokens is not None:
+                self.tokens.refund(tokens)
+            return _POLL
+        return 0.0
+
+    def _release(self) -> None:
+        if self.gate is not None:
+            self.gate.leave()
+
+    @asynccontextmanager
+    async def slot(self, tokens: int):
+        """Attend la disponibilité du provider (sans bloquer la boucle) pour un appel."""
+        started = time.monotonic()
+        while True:
+            delay = self._try(tokens)
+            if not delay:
+                break
+            await asyncio.sleep(min(delay, 1.0) + random.uniform(0, _POLL))
+        self.incr("wait_seconds", time.monotonic() - started)
+        self.incr("calls")
+        self.incr("tokens_estimated", tokens)
+        try:
+            yield
+        finally:
+            self._release()
+
+    @contextmanager
+    def slot_sync(self, tokens: int):
+        started = time.monotonic()
+        while True:
+            delay = self._try(tokens)
+            if not delay:
+                break
+            time.sleep(min(delay, 1.0) + random.uniform(0, _POLL))
+        self.incr("wait_seconds", time.monotonic() - started)
+        self.incr("calls")
+        self.incr("tokens_estimated", tokens)
+        try:
+            yield
+        finally:
+            self._release()
+
+    def penalize(self) -> None:
+        """429 reçu : le quota réel est épuisé, tous les appelants attendent la recharge."""
+        self.incr("rate_limited")
+        for bucket in (self.requests, self.tokens):
+            if bucket is not None:
+                bucket.drain()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self.counters)
+        counters["wait_seconds"] = round(counters["wait_seconds"], 3)
+        return {
+            "provider": self.provider,
+            **counters,
+            "requests_available": round(self.requests.available, 1) if self.requests else None,
+            "tokens_available": round(self.tokens.available, 1) if self.tokens else None,
+            "in_flight": self.gate.in_use if self.gate else None,
+        }
+
+
+_limiters: Dict[str, ProviderLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(provider: str) -> ProviderLimiter:
+    with _limiters_lock:
+        limiter = _limiters.get(provider)
+        if limiter is None:
+            if provider == "ollama":
+                limiter = ProviderLimiter(provider, concurrency=settings.OLLAMA_CONCURRENCY)
+            else:
+                limiter = ProviderLimiter(provider, rpm=settings.OPENAI_RPM, tpm=settings.OPENAI_TPM)
+            _limiters[provider] = limiter
+        return limiter
+
+
+def provider_of(llm: Any) -> Optional[str]:
+    """Provider d'un client LLM (None pour un modèle local de test : pas de limite)."""
+    name = type(llm).__name__
+    if "Ollama" in name:
+        return "ollama"
+    if "OpenAI" in name:
+        return "openai"
+    return None
+
+
+def estimate_tokens(prompt_chars: int, max_tokens: Optional[int]) -> int:
+    """Tokens consommés par un appel : prompt estimé + réponse au plus max_tokens."""
+    return prompt_chars // CHARS_PER_TOKEN + int(max_tokens or settings.LLM_MAX_TOKENS)
+
+
+def _status_code(exc: BaseException) -> Optional[int]:
+    code = getattr(exc, "status_code", None)
+    if code is None:
+        code = getattr(getattr(exc, "response", None), "status_code", None)
+    return code if isinstance(code, int) else None
+
+
+def is_rate_limited(exc: BaseException) -> bool:
+    return _status_code(exc) == 429 or type(exc).__name__ == "RateLimitError"
+
+
+def is_retryable(exc: BaseException) -> bool:
+    if isinstance(exc, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return True
+    code = _status_code(exc)
+    if code is not None:
+        return code == 429 or code >= 500
+    return type(exc).__name__ in (
+        "RateLimitError", "APITimeoutError", "APIConnectionError", "InternalServerError",
+        "ConnectTimeout", "ReadTimeout", "ConnectError", "RemoteProtocolError",
+    )
+
+
+def backoff_delay(attempt: int) -> float:
+    """Backoff exponentiel à gigue complète : uniforme dans [0, min(max, base * 2^attempt)]."""
+    return random.uniform(0, min(settings.LLM_RETRY_MAX_DELAY, settings.LLM_RETRY_BASE_DELAY * 2 ** attempt))
+
+
+async def acall_limited(
+    provider: Optional[str], tokens: int, call: Callable[[], Awaitable[T]]
+) -> T:
+    """Exécute `call` dans un créneau du provider, avec rejeu des erreurs transitoires."""
+    if provider is None:
+        return await call()
+    limiter = get_limiter(provider)
+    attempt = 0
+    while True:
+        try:
+            async with limiter.slot(tokens):
+                return await call()
+        except Exception as e:
+            if is_rate_limited(e):
+                limiter.penalize()
+            if attempt >= settings.LLM_MAX_RETRIES or not is_retryable(e):
+                limiter.incr("failures")
+                raise
+            delay = backoff_delay(attempt)
+            attempt += 1
+            limiter.incr("retries")
+            logger.warning(f"LLM {provider}: {type(e).__name__}, nouvel essai {attempt} dans {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+
+def call_limited(provider: Optional[str], tokens: int, call: Callable[[], T]) -> T:
+    """Variante synchrone de acall_limited (routes sync, scripts)."""
+    if provider is None:
+        return call()
+    limiter = get_limiter(provider)
+    attempt = 0
+    while True:
+        try:
+            with limiter.slot_sync(tokens):
+                return call()
+        except Exception as e:
+            if is_rate_limited(e):
+                limiter.penalize()
+            if attempt >= settings.LLM_MAX_RETRIES or not is_retryable(e):
+                limiter.incr("failures")
+                raise
+            delay = backoff_delay(attempt)
+            attempt += 1
+            limiter.incr("retries")
+            logger.warning(f"LLM {provider}: {type(e).__name__}, nouvel essai {attempt} dans {delay:.1f}s")
+            time.sleep(delay)
+
+
+def limiter_stats() -> Dict[str, Any]:
+    with _limiters_lock:
+        return {name: limiter.stats() for name, limiter in _limiters.items()}
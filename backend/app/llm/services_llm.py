@@ -1,53 +1,200 @@
+import asyncio
+import contextlib
 import logging
-from typing import Callable
-import backoff
-from fastapi import HTTPException
-from langchain.callbacks.base import AsyncCallbackHandler
-from app.llm.chains import get_llm_chain
-from app.db.models import PlanSectionType
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+from app.core.config import settings
+from app.llm.cache import cache_key, get_llm_cache
+from app.llm.chains import StrOutputParser
+from app.llm.prompt_registry import prompt_registry
+from app.llm.rate_limit import (
+    acall_limited,
+    backoff_delay,
+    call_limited,
+    estimate_tokens,
+    get_limiter,
+    is_rate_limited,
+    is_retryable,
+    provider_of,
+)
+from app.llm.telemetry import LLMCallTracker, record_cache_hit
 
 logger = logging.getLogger(__name__)
 
-class SSEStreamer(AsyncCallbackHandler):
-    async def on_llm_new_token(self, token: str, **kwargs):
-        # Envoie chaque token vers le client SSE
-        await kwargs["send_event"](data=token)
 
-@backoff.on_exception(
-    backoff.expo,
-    Exception,
-    max_time=30,
-    on_backoff=lambda details: logger.warning(f"Retrying LLM call: {details}")
-)
-async def _call_chain(chain, inputs: dict, send_event: Callable):
+def _result_text(result: Any) -> str:
+    # LLMChain.invoke renvoie souvent {"text": "..."} ; fallback str sinon
+    return result.get("text", "").strip() if isinstance(result, dict) else str(result).strip()
+
+
+def chain_prompt(chain):
+    """PromptTemplate d'une LLMChain ou d'un runnable `prompt | llm | parser` (get_llm_runnable)."""
+    return chain.prompt if hasattr(chain, "prompt") else chain.first
+
+
+def _chain_llm(chain):
+    return chain.llm if hasattr(chain, "llm") else chain.steps[1]
+
+
+def _chain_cache_key(chain, inputs: Dict[str, str]) -> str:
+    llm = _chain_llm(chain)
+    model = getattr(llm, "model_name", None) or getattr(llm, "model", "")
+    return cache_key(chain_prompt(chain).template, str(model), getattr(llm, "temperature", None), inputs)
+
+
+def _prompt_chars(chain, inputs: Dict[str, str]) -> int:
+    return len(chain_prompt(chain).template) + sum(len(str(v)) for v in inputs.values())
+
+
+def _call_budget(chain, inputs: Dict[str, str]):
+    """(provider, tokens estimés) de l'appel, pour le limiteur de débit du provider."""
+    llm = _chain_llm(chain)
+    max_tokens = getattr(llm, "max_tokens", None) or getattr(llm, "num_predict", None)
+    return provider_of(llm), estimate_tokens(_prompt_chars(chain, inputs), max_tokens)
+
+
+def _tracker(chain, inputs: Dict[str, str]) -> LLMCallTracker:
+    return LLMCallTracker(
+        _chain_llm(chain), _prompt_chars(chain, inputs), prompt_registry.name_of(chain_prompt(chain))
+    )
+
+
+def _cache_hit(chain, started_at: float) -> None:
+    record_cache_hit(_chain_llm(chain), started_at, prompt_registry.name_of(chain_prompt(chain)))
+
+
+def _invoke(chain, inputs: Dict[str, str]) -> str:
+    provider, tokens = _call_budget(chain, inputs)
+    tracker = _tracker(chain, inputs)
+    config = {"callbacks": [tracker]}
+    try:
+        text = _result_text(call_limited(provider, tokens, lambda: chain.invoke(inputs, config=config)))
+    except Exception as e:
+        tracker.finish("", error=e)
+        raise
+    tracker.finish(text)
+    return text
+
+
+async def _ainvoke(chain, inputs: Dict[str, str]) -> str:
+    provider, tokens = _call_budget(chain, inputs)
+    tracker = _tracker(chain, inputs)
+    config = {"callbacks": [tracker]}
+    try:
+        text = _result_text(await acall_limited(provider, tokens, lambda: chain.ainvoke(inputs, config=config)))
+    except Exception as e:
+        tracker.finish("", error=e)
+        raise
+    tracker.finish(text)
+    return text
+
+
+def _stream_slot(provider, tokens: int):
+    return get_limiter(provider).slot(tokens) if provider else contextlib.nullcontext()
+
+
+def invoke_chain(chain, inputs: Dict[str, str], use_cache: bool = True) -> str:
     """
-    Tente une génération en streaming (SSE), ou retourne en fallback.
+    Exécute une LLMChain (ou un runnable) et renvoie le texte généré, via le cache de réponses.
+    use_cache=False force un appel au provider (la réponse rafraîchit le cache).
     """
-    try:
-        return await chain.apredict_and_stream(
-            callbacks=[SSEStreamer()],
-            send_event=send_event,
-            **inputs
-        )
-    except AttributeError:
-        # Fallback sans streaming natif
-        result = await chain.apredict(**inputs)
-        await send_event(data=result)
-        return result
-
-async def generate_plan_sse(
-    plan_id: str,
-    inputs: dict,
-    send_event: Callable
-) -> None:
+    cache = get_llm_cache()
+    if cache is None:
+        return _invoke(chain, inputs)
+
+    started_at = time.monotonic()
+    key = _chain_cache_key(chain, inputs)
+    if use_cache:
+        cached = cache.get(key)
+        if cached is not None:
+            _cache_hit(chain, started_at)
+            return cached
+    else:
+        cache.record_bypass()
+
+    text = _invoke(chain, inputs)
+    if text:
+        cache.set(key, text)
+    return text
+
+
+async def ainvoke_chain(chain, inputs: Dict[str, str], use_cache: bool = True) -> str:
+    """Variante async de invoke_chain (le niveau persistant du cache est lu hors de la boucle)."""
+    cache = get_llm_cache()
+    if cache is None:
+        return await _ainvoke(chain, inputs)
+
+    started_at = time.monotonic()
+    key = _chain_cache_key(chain, inputs)
+    if use_cache:
+        cached = await asyncio.to_thread(cache.get, key)
+        if cached is not None:
+            _cache_hit(chain, started_at)
+            return cached
+    else:
+        cache.record_bypass()
+
+    text = await _ainvoke(chain, inputs)
+    if text:
+        await asyncio.to_thread(cache.set, key, text)
+    return text
+
+async def astream_chain(chain, inputs: Dict[str, str], use_cache: bool = True) -> AsyncIterator[str]:
     """
-    Génère toutes les sections en SSE pour un plan donné.  
-    send_event: coroutine pour pousser les événements SSE.
+    Stream les tokens générés par le provider (astream sur prompt | llm).
+    Une réponse en cache est renvoyée en un seul morceau ; le texte complet est mis en cache en fin de stream.
     """
+    started_at = time.monotonic()
+    cache = get_llm_cache()
+    key = _chain_cache_key(chain, inputs) if cache is not None else None
+    if cache is not None:
+        if use_cache:
+            cached = await asyncio.to_thread(cache.get, key)
+            if cached is not None:
+                _cache_hit(chain, started_at)
+                yield cached
+                return
+        else:
+            cache.record_bypass()
+
+    runnable = chain
+    if hasattr(chain, "prompt"):
+        # LLMChain ne streame pas token par token : on repasse par le runnable équivalent
+        runnable = chain.prompt | chain.llm | StrOutputParser()
+
+    provider, tokens = _call_budget(chain, inputs)
+    tracker = _tracker(chain, inputs)
+    config = {"callbacks": [tracker]}
+    parts: List[str] = []
+    attempt = 0
+    error: Optional[BaseException] = None
     try:
-        for section in PlanSectionType:
-            chain = get_llm_chain(section)
-            await _call_chain(chain, inputs, send_event)
-    except Exception as e:
-        logger.error(f"Erreur génération SSE plan {plan_id}: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail="Erreur interne LLM")
+        while True:
+            try:
+                async with _stream_slot(provider, tokens):
+                    async for token in runnable.astream(inputs, config=config):
+                        text = token if isinstance(token, str) else getattr(token, "content", str(token))
+                        if text:
+                            parts.append(text)
+                            yield text
+                break
+            except Exception as e:
+                limiter = get_limiter(provider) if provider else None
+                if limiter is not None and is_rate_limited(e):
+                    limiter.penalize()
+                # une fois des tokens émis, rejouer dupliquerait le texte côté client
+                if parts or limiter is None or attempt >= settings.LLM_MAX_RETRIES or not is_retryable(e):
+                    if limiter is not None:
+                        limiter.incr("failures")
+                    error = e
+                    raise
+                limiter.incr("retries")
+                await asyncio.sleep(backoff_delay(attempt))
+                attempt += 1
+    finally:
+        # enregistré aussi quand le consommateur ferme le stream avant la fin (déconnexion SSE)
+        tracker.finish("".join(parts).strip(), error=error)
+
+    content = "".join(parts).strip()
+    if cache is not None and content:
+        await asyncio.to_thread(cache.set, key, content)
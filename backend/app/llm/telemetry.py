@@ -0,0 +1,275 @@
+# app/llm/telemetry.py
+"""
+Instrumentation des appels LLM : provider, modèle, prompt, plan, attente en file,
+temps jusqu'au premier token, latence, tokens prompt/réponse, coût estimé, cache.
+
+- Les appels passent par services_llm, qui attache un LLMCallTracker (callback
+  langchain) : les timings et l'usage viennent directement du provider.
+- Le prompt et le plan sont fournis par l'appelant via `llm_scope(...)` (contextvar,
+  propagée aux tâches asyncio et à asyncio.to_thread).
+- Les mesures alimentent les métriques Prometheus (app/core/metrics.py) et des
+  agrégats par plan, consultables dans /admin/metrics.
+"""
+import contextvars
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Tuple
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from app.core.config import settings
+from app.core.metrics import registry
+from app.llm.rate_limit import CHARS_PER_TOKEN, provider_of
+
+# USD par million de tokens (entrée, sortie) ; préfixe de modèle le plus long retenu
+LLM_PRICES: Dict[str, Tuple[float, float]] = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-nano": (0.10, 0.40),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-3.5-turbo": (0.50, 1.50),
+}
+
+# agrégats gardés pour les N derniers plans actifs
+PLAN_METRICS_MAX = 1000
+
+llm_calls = registry.counter("llm_calls_total", "Appels LLM (cache=hit|miss, status=ok|error)")
+llm_latency = registry.histogram("llm_latency_seconds", "Latence d'un appel LLM, file d'attente exclue")
+llm_ttft = registry.histogram("llm_time_to_first_token_seconds", "Temps jusqu'au premier token (streaming)")
+llm_queue_wait = registry.histogram("llm_queue_wait_seconds", "Attente avant l'envoi au provider (sémaphores, quotas, rejeux)")
+llm_tokens = registry.counter("llm_tokens_total", "Tokens consommés (kind=prompt|completion)")
+llm_cost = registry.counter("llm_cost_usd_total", "Coût estimé des appels LLM en USD")
+
+
+@dataclass
+class LLMScope:
+    prompt: Optional[str] = None
+    plan_id: Optional[int] = None
+    queued_at: float = field(default_factory=time.monotonic)
+
+
+_scope: contextvars.ContextVar[Optional[LLMScope]] = contextvars.ContextVar("llm_scope", default=None)
+
+
+@contextmanager
+def llm_scope(prompt: Optional[str] = None, plan_id: Optional[int] = None):
+    """
+    Étiquette les appels LLM du bloc (nom du prompt, plan). L'attente en file est
+    comptée à partir de l'entrée dans le bloc.
+    """
+    token = _scope.set(LLMScope(prompt=prompt, plan_id=plan_id))
+    try:
+        yield
+    finally:
+        _scope.reset(token)
+
+
+def current_scope() -> LLMScope:
+    return _scope.get() or LLMScope()
+
+
+def model_of(llm: Any) -> str:
+    return str(getattr(llm, "model_name", None) or getattr(llm, "model", None) or type(llm).__name__)
+
+
+def estimate_cost(provider: str, model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    if provider == "ollama":
+        return 0.0
+    if settings.LLM_PRICE_INPUT_PER_1M is not None and settings.LLM_PRICE_OUTPUT_PER_1M is not None:
+        prices = (settings.LLM_PRICE_INPUT_PER_1M, settings.LLM_PRICE_OUTPUT_PER_1M)
+    else:
+        match = max((p for p in LLM_PRICES if model.startswith(p)), key=len, default=None)
+        if match is None:
+            return 0.0
+        prices = LLM_PRICES[match]
+    return (prompt_tokens * prices[0] + completion_tokens * prices[1]) / 1_000_000
+
+
+@dataclass
+class LLMCallRecord:
+    provider: str
+    model: str
+    prompt: Optional[str]
+    plan_id: Optional[int]
+    cache_hit: bool
+    queue_wait: float = 0.0
+    ttft: Optional[float] = None
+    latency: float = 0.0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    tokens_estimated: bool = False
+    cost_usd: float = 0.0
+    error: Optional[str] = None
+
+
+class LLMCallTracker(BaseCallbackHandler):
+    """Callback langchain : timings (début, premier token, fin) et usage d'un appel."""
+
+    def __init__(self, llm: Any, prompt_chars: int, prompt_name: Optional[str] = None):
+        self.provider = provider_of(llm) or "local"
+        self.model = model_of(llm)
+        self.prompt_chars = prompt_chars
+        self.scope = current_scope()
+        self.prompt_name = self.scope.prompt or prompt_name
+        self.started_at: Optional[float] = None
+        self.first_token_at: Optional[float] = None
+        self.ended_at: Optional[float] = None
+        self.usage: Optional[Tuple[int, int]] = None
+        self.errors = 0
+
+    def _start(self) -> None:
+        # un rejeu (429, timeout) relance le chrono : l'attente de backoff compte comme file
+        self.started_at = time.monotonic()
+        self.first_token_at = None
+
+    def on_llm_start(self, serialized, prompts, **kwargs) -> None:
+        self._start()
+
+    def on_chat_model_start(self, serialized, messages, **kwargs) -> None:
+        self._start()
+
+    def on_llm_new_token(self, token: str, **kwargs) -> None:
+        if self.first_token_at is None and token:
+            self.first_token_at = time.monotonic()
+
+    def on_llm_error(self, error: BaseException, **kwargs) -> None:
+        self.errors += 1
+
+    def on_llm_end(self, response, **kwargs) -> None:
+        self.ended_at = time.monotonic()
+        token_usage = (response.llm_output or {}).get("token_usage") or {}
+        if token_usage.get("prompt_tokens") is not None:
+            self.usage = (int(token_usage["prompt_tokens"]), int(token_usage.get("completion_tokens") or 0))
+            return
+        for generations in response.generations or []:
+            for generation in generations:
+                meta = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if meta:
+                    self.usage = (int(meta.get("input_tokens", 0)), int(meta.get("output_tokens", 0)))
+                    return
+
+    def finish(self, text: str, error: Optional[BaseException] = None) -> LLMCallRecord:
+        now = time.monotonic()
+        started = self.started_at or now
+        ended = self.ended_at or now
+        if self.usage is not None:
+            prompt_tokens, completion_tokens = self.usage
+            estimated = False
+        else:
+            prompt_tokens = self.prompt_chars // CHARS_PER_TOKEN
+            completion_tokens = len(text or "") // CHARS_PER_TOKEN
+            estimated = True
+        record = LLMCallRecord(
+            provider=self.provider,
+            model=self.model,
+            prompt=self.prompt_name,
+            plan_id=self.scope.plan_id,
+            cache_hit=False,
+            queue_wait=max(0.0, started - self.scope.queued_at),
+            ttft=(self.first_token_at - started) if self.first_token_at else None,
+            latency=max(0.0, ended - started),
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            tokens_estimated=estimated,
+            cost_usd=estimate_cost(self.provider, self.model, prompt_tokens, completion_tokens),
+            error=type(error).__name__ if error is not None else None,
+        )
+        record_call(record)
+        return record
+
+
+def record_cache_hit(llm: Any, started_at: float, prompt_name: Optional[str] = None) -> LLMCallRecord:
+    scope = current_scope()
+    record = LLMCallRecord(
+        provider=provider_of(llm) or "local",
+        model=model_of(llm),
+        prompt=scope.prompt or prompt_name,
+        plan_id=scope.plan_id,
+        cache_hit=True,
+        queue_wait=max(0.0, started_at - scope.queued_at),
+        latency=time.monotonic() - started_at,
+    )
+    record_call(record)
+    return record
+
+
+_plans: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+_plans_lock = threading.Lock()
+
+
+def _empty_aggregate() -> Dict[str, Any]:
+    return {
+        "calls": 0, "cache_hits": 0, "errors": 0, "latency_seconds": 0.0, "queue_wait_seconds": 0.0,
+        "prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0,
+    }
+
+
+def _accumulate(agg: Dict[str, Any], record: LLMCallRecord) -> None:
+    agg["calls"] += 1
+    agg["cache_hits"] += int(record.cache_hit)
+    agg["errors"] += int(record.error is not None)
+    agg["latency_seconds"] += record.latency
+    agg["queue_wait_seconds"] += record.queue_wait
+    agg["prompt_tokens"] += record.prompt_tokens
+    agg["completion_tokens"] += record.completion_tokens
+    agg["cost_usd"] += record.cost_usd
+
+
+def record_call(record: LLMCallRecord) -> None:
+    labels = {"provider": record.provider, "model": record.model, "prompt": record.prompt or "unknown"}
+    llm_calls.inc(
+        cache="hit" if record.cache_hit else "miss",
+        status="error" if record.error else "ok",
+        **labels,
+    )
+    if not record.cache_hit:
+        llm_latency.observe(record.latency, **labels)
+        llm_queue_wait.observe(record.queue_wait, **labels)
+        if record.ttft is not None:
+            llm_ttft.observe(record.ttft, **labels)
+        llm_tokens.inc(record.prompt_tokens, kind="prompt", **labels)
+        llm_tokens.inc(record.completion_tokens, kind="completion", **labels)
+        llm_cost.inc(record.cost_usd, provider=record.provider, model=record.model)
+
+    if record.plan_id is None:
+        return
+    with _plans_lock:
+        plan = _plans.get(record.plan_id)
+        if plan is None:
+            plan = {**_empty_aggregate(), "by_prompt": {}}
+            _plans[record.plan_id] = plan
+            while len(_plans) > PLAN_METRICS_MAX:
+                _plans.popitem(last=False)
+        _plans.move_to_end(record.plan_id)
+        _accumulate(plan, record)
+        _accumulate(plan["by_prompt"].setdefault(record.prompt or "unknown", _empty_aggregate()), record)
+
+
+def _rounded(agg: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: round(v, 6) if isinstance(v, float) else v for k, v in agg.items()}
+
+
+def plan_metrics(plan_id: int) -> Optional[Dict[str, Any]]:
+    with _plans_lock:
+        plan = _plans.get(plan_id)
+        if plan is None:
+            return None
+        return {
+            **_rounded({k: v for k, v in plan.items() if k != "by_prompt"}),
+            "by_prompt": {name: _rounded(agg) for name, agg in plan["by_prompt"].items()},
+        }
+
+
+def llm_summary() -> Dict[str, Any]:
+    """Vue JSON condensée (latences moyennes par prompt, tokens, coût) pour /admin/metrics."""
+    return {
+        "latency_seconds": llm_latency.summary(),
+        "time_to_first_token_seconds": llm_ttft.summary(),
+        "queue_wait_seconds": llm_queue_wait.summary(),
+        "plans_tracked": len(_plans),
+    }
+
@@ -0,0 +1,11 @@
+# app/schemas/batch.py
+from pydantic import BaseModel
+from typing import List, Optional
+
+
+class BatchGenerateRequest(BaseModel):
+    plan_ids: Optional[List[int]] = None
+    sector: Optional[str] = None
+    city: Optional[str] = None
+    status: Optional[str] = None
+    no_cache: bool = False
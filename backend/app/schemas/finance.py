@@ -1,5 +1,5 @@
 from datetime import date
-from typing import List, Optional
+from typing import List, Literal, Optional
 
 from pydantic import BaseModel, Field
 
@@ -12,7 +12,12 @@ class FinancialAssumptionsIn(BaseModel):
     taxes: float
     capex: float
     loan_rate: float = Field(ge=0, le=1)
-    loan_duration: int = Field(gt=0)
+    loan_duration: int = Field(gt=0)                    # mois, différé compris
+    loan_amount: Optional[float] = Field(default=None, ge=0)  # défaut : montant demandé du plan
+    repayment_type: Literal["annuity", "constant_principal", "in_fine"] = "annuity"
+    grace_months: int = Field(default=0, ge=0)
+    grace_type: Literal["partial", "total"] = "partial"   # différé partiel (intérêts payés) ou total
+    monthly_units: float = Field(default=100.0, gt=0)  # volume mensuel de base
     seasonality: list[float] = Field(min_items=12, max_items=12)
     growth_rates: list[float] = Field(min_items=12, max_items=12)
     
@@ -27,3 +32,26 @@ class FinancialKPI(BaseModel):
     dscr: Optional[float]
     npv: Optional[float]
     irr: Optional[float]
+
+
+class FinancialForecastRow(BaseModel):
+    period: str
+    revenue: float
+    cogs: float
+    gross_margin: float
+    opex: float
+    ebitda: float
+    debt_service: float
+    cashflow: float
+    cum_cashflow: float
+
+
+class AmortizationRow(BaseModel):
+    month: int                  # rang de l'échéance (1 = premier mois)
+    period: str                 # YYYY-MM
+    interest: float             # intérêts courus (capitalisés pendant un différé total)
+    principal: float            # capital remboursé
+    payment: float              # échéance décaissée
+    balance: float              # capital restant dû en fin de mois
+    ebitda: float
+    dscr: Optional[float]       # EBITDA / échéance (None sans échéance ce mois-là)
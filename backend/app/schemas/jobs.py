@@ -0,0 +1,20 @@
+# app/schemas/jobs.py
+from pydantic import BaseModel
+from typing import Dict, List, Optional
+from datetime import datetime
+
+
+class GenerationJobRead(BaseModel):
+    id: int
+    plan_id: int
+    status: str
+    use_cache: bool
+    attempts: int
+    sections_done: List[str]
+    sections_total: int
+    progress: float
+    section_ids: Dict[str, int]
+    errors: Dict[str, str]
+    created_at: datetime
+    started_at: Optional[datetime]
+    finished_at: Optional[datetime]
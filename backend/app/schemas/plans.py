@@ -1,6 +1,6 @@
 # app/schemas/plans.py
 from pydantic import BaseModel
-from typing import Optional, Literal
+from typing import List, Optional, Literal
 from datetime import datetime
 
 
@@ -21,3 +21,28 @@ class BusinessPlanOut(BusinessPlanCreate):
 
     class Config:
         from_attributes = True
+
+
+class PlanSectionOut(BaseModel):
+    id: int
+    section_type: str
+    version: int
+    is_current: bool
+    content_md: str
+    score_quality: Optional[float] = None
+    sources: List[str] = []
+    generated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class PlanSearchHit(BaseModel):
+    plan_id: int
+    title: str
+    sector: str
+    city: str
+    status: str
+    section_type: Optional[str]   # None : correspondance sur le titre, le secteur ou la ville
+    snippet: str                  # extrait, termes trouvés entre <mark></mark>
+    score: float
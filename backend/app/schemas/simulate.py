@@ -1,9 +1,12 @@
-from pydantic import BaseModel
-from typing import Dict, Any
+from pydantic import BaseModel, Field
+from typing import Dict, Any, List, Literal, Optional
 
 
 class SimulationRequest(BaseModel):
     delta: Dict[str, str]  # exemple : { "sales": "+10%" }
+    # horizon et taux du snapshot de résultats enregistré avec le scénario
+    horizon: int = Field(default=36, description="Horizon en mois : 12, 36 ou 60")
+    rate: float = Field(default=0.1, ge=0, le=1)
 
 
 class SimulationResponse(BaseModel):
@@ -11,3 +14,39 @@ class SimulationResponse(BaseModel):
     simulated_values: Dict[str, float]   # valeurs calculées après application des deltas
     deltas_applied: Dict[str, str]       # mêmes deltas reçus dans la requête
     summary: Dict[str, Any] = {}         # résumé ou indicateurs clés de la simulation (optionnel)
+
+
+class MonteCarloRequest(BaseModel):
+    draws: int = Field(default=10_000, gt=0)
+    horizon: int = Field(default=36, description="Horizon en mois : 12, 36 ou 60")
+    seed: Optional[int] = Field(default=None, ge=0)  # même graine -> mêmes résultats
+    # écarts-types relatifs des facteurs tirés autour des hypothèses
+    price_sd: float = Field(default=0.10, ge=0, le=2)
+    volume_sd: float = Field(default=0.20, ge=0, le=2)
+    volume_monthly_sd: float = Field(default=0.10, ge=0, le=2)
+    variable_costs_sd: float = Field(default=0.10, ge=0, le=2)
+    fixed_costs_sd: float = Field(default=0.05, ge=0, le=2)
+
+
+class SensitivityRequest(BaseModel):
+    # deltas par driver, ex : { "pricing": ["-10%", "0%", "+10%"], "loan_rate": ["+0.02"] }
+    # vide : tornado sur tous les drivers à ±10 %
+    grid: Dict[str, List[str]] = {}
+    horizon: int = Field(default=12, description="Horizon en mois : 12, 36 ou 60")
+    rate: float = Field(default=0.1, ge=0, le=1)  # taux d'actualisation annuel (NPV)
+    tornado_kpi: str = "npv"
+
+
+class GoalSeekTarget(BaseModel):
+    # driver à ajuster pour que la métrique atteigne la cible
+    driver: Literal["pricing", "variable_costs", "fixed_costs", "monthly_units", "loan_rate", "loan_duration"]
+    metric: Literal["dscr", "dscr_min", "npv", "irr", "breakeven_month"]
+    target: float                       # DSCR, NPV, IRR : >= cible ; mois de point mort : <= cible
+    min: Optional[float] = None         # bornes de recherche du driver (optionnelles)
+    max: Optional[float] = None
+
+
+class GoalSeekRequest(BaseModel):
+    targets: List[GoalSeekTarget] = Field(min_length=1, max_length=20)
+    horizon: int = Field(default=36, description="Horizon en mois : 12, 36 ou 60")
+    rate: float = Field(default=0.1, ge=0, le=1)  # taux d'actualisation annuel (NPV)
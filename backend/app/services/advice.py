@@ -15,11 +15,10 @@ from app.services.finance.models import FinancialAssumptions, Advice  # SQLModel
 # Si ton Advice est dans app.db.models, remplace l'import ci-dessus par:
 # from app.db.models import Advice
 
-# LLM (chat) – on passe par la même lib que dans chains.py
-try:
-    from langchain_openai import ChatOpenAI
-except ImportError:
-    ChatOpenAI = None  # géré plus bas
+# LLM (chat) – même registre de clients que chains.py
+from app.llm.clients import ChatOpenAI, get_chat_model
+from app.llm.services_llm import invoke_chain
+from app.llm.telemetry import llm_scope
 
 
 @dataclass(frozen=True)
@@ -98,7 +97,7 @@ Instructions :
 """
 
 def _build_llm():
-    """Construit un client ChatOpenAI si activé, sinon None."""
+    """Retourne le client ChatOpenAI partagé si activé, sinon None."""
     if not settings.USE_OPENAI:
         return None
     if not settings.OPENAI_API_KEY:
@@ -106,12 +105,7 @@ def _build_llm():
         raise ValueError("OPENAI_API_KEY manquant pour la génération de conseils LLM.")
     if ChatOpenAI is None:
         raise ValueError("Le paquet 'langchain-openai' est requis. Installez-le avec: pip install -U langchain-openai")
-    return ChatOpenAI(
-        model=settings.OPENAI_MODEL,
-        temperature=0.3,
-        api_key=settings.OPENAI_API_KEY,
-        base_url=getattr(settings, "OPENAI_BASE_URL", None),
-    )
+    return get_chat_model("openai", settings.OPENAI_MODEL, temperature=0.3)
 
 
 def generate_advice(db: Session, plan, assumptions: FinancialAssumptions):
@@ -163,8 +157,8 @@ def generate_advice(db: Session, plan, assumptions: FinancialAssumptions):
         # Utiliser directement le LLM via prompt.format
         from langchain.chains import LLMChain
         chain = LLMChain(llm=llm, prompt=prompt)
-        result = chain.invoke(input_vars)  # -> dict {"text": "..."} en général
-        text = result.get("text", "").strip() if isinstance(result, dict) else str(result).strip()
+        with llm_scope(prompt="advice", plan_id=plan.id):
+            text = invoke_chain(chain, input_vars)  # mêmes hypothèses -> réponse servie par le cache
 
         # Enregistrer chaque ligne non vide comme un conseil
         for line in text.split("\n"):
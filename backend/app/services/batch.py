@@ -0,0 +1,173 @@
+# app/services/batch.py
+"""
+Génération par lots (ex. régénérer des centaines de plans après une mise à jour de prompt).
+
+Tous les plans du lot passent par un même ordonnanceur :
+- au plus BATCH_PLAN_CONCURRENCY plans en cours ;
+- au plus BATCH_SECTION_CONCURRENCY appels LLM simultanés, tous plans confondus ;
+- chaque appel respecte en plus les limites du provider (app/llm/rate_limit.py),
+  avec rejeu des 429/5xx : le quota est saturé sans avalanche de 429.
+Un rapport de débit est produit à la fin (et consultable pendant l'exécution).
+"""
+import asyncio
+import logging
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+from uuid import uuid4
+
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.db.base import engine
+from app.db.models import BusinessPlan
+from app.llm.rate_limit import limiter_stats
+from app.services.generator import stream_plan_events
+
+logger = logging.getLogger(__name__)
+
+
+def select_plan_ids(
+    db: Session,
+    plan_ids: Optional[List[int]] = None,
+    sector: Optional[str] = None,
+    city: Optional[str] = None,
+    status: Optional[str] = None,
+) -> List[int]:
+    """Plans du lot : liste explicite et/ou filtre (secteur, ville, statut)."""
+    query = select(BusinessPlan.id)
+    if plan_ids:
+        query = query.where(BusinessPlan.id.in_(plan_ids))
+    if sector:
+        query = query.where(BusinessPlan.sector == sector)
+    if city:
+        query = query.where(BusinessPlan.city == city)
+    if status:
+        query = query.where(BusinessPlan.status == status)
+    return list(db.exec(query.order_by(BusinessPlan.id)).all())
+
+
+@dataclass
+class BatchReport:
+    id: str
+    plans_total: int
+    use_cache: bool = True
+    status: str = "running"
+    plans_done: int = 0
+    plans_failed: int = 0
+    sections_done: int = 0
+    sections_skipped: int = 0
+    sections_failed: int = 0
+    chars: int = 0
+    started_at: str = field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
+    elapsed_seconds: float = 0.0
+    errors: Dict[int, Dict[str, str]] = field(default_factory=dict)
+    _t0: float = field(default_factory=time.monotonic, repr=False)
+
+    def tick(self) -> None:
+        self.elapsed_seconds = round(time.monotonic() - self._t0, 3)
+
+    def as_dict(self) -> Dict[str, Any]:
+        self.tick()
+        data = {k: v for k, v in asdict(self).items() if not k.startswith("_")}
+        minutes = self.elapsed_seconds / 60 or 1e-9
+        data["throughput"] = {
+            "plans_per_minute": round((self.plans_done + self.plans_failed) / minutes, 2),
+            "sections_per_minute": round(self.sections_done / minutes, 2),
+            "chars_per_second": round(self.chars / (self.elapsed_seconds or 1e-9), 1),
+        }
+        data["providers"] = limiter_stats()
+        return data
+
+
+async def _generate_plan(
+    plan_id: int, report: BatchReport, limiter: asyncio.Semaphore, use_cache: bool
+) -> None:
+    errors: Dict[str, str] = {}
+    with Session(engine) as db:
+        plan = await asyncio.to_thread(db.get, BusinessPlan, plan_id)
+        if plan is None:
+            errors["plan"] = "Plan non trouvé"
+        else:
+            async for event in stream_plan_events(
+                db, plan, use_cache=use_cache, stream_tokens=False, limiter=limiter
+            ):
+                if event["type"] == "section_done":
+                    if event.get("skipped"):
+                        report.sections_skipped += 1
+                    else:
+                        report.sections_done += 1
+                        report.chars += event.get("chars", 0)
+                elif event["type"] == "error":
+                    report.sections_failed += 1
+                    errors[event.get("section") or "plan"] = event.get("detail", "")
+    if errors:
+        report.plans_failed += 1
+        report.errors[plan_id] = errors
+    else:
+        report.plans_done += 1
+
+
+async def run_batch(
+    plan_ids: List[int],
+    use_cache: bool = True,
+    plan_concurrency: Optional[int] = None,
+    section_concurrency: Optional[int] = None,
+    report: Optional[BatchReport] = None,
+) -> BatchReport:
+    """Génère toutes les sections des plans donnés et renvoie le rapport de débit."""
+    report = report or BatchReport(id=uuid4().hex[:12], plans_total=len(plan_ids), use_cache=use_cache)
+    limiter = asyncio.Semaphore(max(1, section_concurrency or settings.BATCH_SECTION_CONCURRENCY))
+    plan_slots = asyncio.Semaphore(max(1, plan_concurrency or settings.BATCH_PLAN_CONCURRENCY))
+
+    async def _one(plan_id: int) -> None:
+        async with plan_slots:
+            try:
+                await _generate_plan(plan_id, report, limiter, use_cache)
+            except Exception as e:
+                logger.error(f"Lot {report.id}: plan {plan_id} en échec: {e}", exc_info=True)
+                report.plans_failed += 1
+                report.errors[plan_id] = {"plan": str(e)}
+
+    try:
+        await asyncio.gather(*(_one(pid) for pid in plan_ids))
+        report.status = "done"
+    except asyncio.CancelledError:
+        report.status = "cancelled"
+        raise
+    finally:
+        report.tick()
+        logger.info(f"Lot {report.id} terminé: {report.as_dict()['throughput']}")
+    return report
+
+
+# lots lancés depuis l'API admin (en mémoire, BATCH_HISTORY_SIZE rapports au plus)
+_batches: Dict[str, BatchReport] = {}
+_batch_tasks: Dict[str, asyncio.Task] = {}
+
+
+def _prune_batches() -> None:
+    # lots en cours toujours conservés ; au-delà de la limite, les plus anciens terminés sont oubliés
+    excess = len(_batches) + 1 - max(1, settings.BATCH_HISTORY_SIZE)  # place du nouveau lot
+    for batch_id in [b for b in _batches if b not in _batch_tasks][:max(0, excess)]:
+        del _batches[batch_id]
+
+
+def start_batch(plan_ids: List[int], use_cache: bool = True) -> BatchReport:
+    """Lance un lot en tâche de fond dans la boucle courante."""
+    report = BatchReport(id=uuid4().hex[:12], plans_total=len(plan_ids), use_cache=use_cache)
+    _prune_batches()
+    _batches[report.id] = report
+    task = asyncio.create_task(run_batch(plan_ids, use_cache=use_cache, report=report))
+    _batch_tasks[report.id] = task
+    task.add_done_callback(lambda _t: _batch_tasks.pop(report.id, None))
+    return report
+
+
+def get_batch(batch_id: str) -> Optional[BatchReport]:
+    return _batches.get(batch_id)
+
+
+def list_batches() -> List[BatchReport]:
+    return list(_batches.values())
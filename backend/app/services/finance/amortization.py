@@ -0,0 +1,127 @@
+# app/services/finance/amortization.py
+"""
+Tableaux d'amortissement mensuels (intérêts, capital, échéance, capital restant dû),
+en forme fermée avec NumPy, pour un ou plusieurs prêts à la fois.
+
+Modes de remboursement (RepaymentType) :
+- annuity            : échéances constantes (PMT) ;
+- constant_principal : amortissement constant du capital, intérêts dégressifs ;
+- in_fine            : intérêts seuls, capital remboursé à la dernière échéance.
+
+Différé (grace_months, compris dans la durée du prêt) :
+- partial : différé partiel, seuls les intérêts sont payés ;
+- total   : différé total, rien n'est payé et les intérêts sont capitalisés.
+
+Conventions : taux annuel / 12, échéance en fin de mois t (t = 0 pour le 1er mois),
+amortissement sur loan_duration - grace_months mois.
+"""
+from typing import Dict
+
+import numpy as np
+
+from app.services.finance.models import FinancialAssumptions, GraceType, RepaymentType
+
+SCHEDULE_COLUMNS = ("interest", "principal", "payment", "balance")
+
+# codes numériques des modes (tableaux NumPy)
+REPAYMENT_CODES = {RepaymentType.annuity: 0, RepaymentType.constant_principal: 1, RepaymentType.in_fine: 2}
+GRACE_CODES = {GraceType.partial: 0, GraceType.total: 1}
+
+
+def _vec(value, n: int, dtype=float) -> np.ndarray:
+    return np.broadcast_to(np.asarray(value, dtype=dtype), (n,))
+
+
+def schedule(
+    principal,
+    annual_rate,
+    duration,
+    horizon: int,
+    grace_months=0,
+    repayment=0,
+    grace_type=0,
+) -> Dict[str, np.ndarray]:
+    """
+    Échéancier de n prêts sur `horizon` mois : dictionnaire de matrices (n, horizon).
+    Les paramètres sont des scalaires ou des vecteurs (n,) ; repayment et grace_type
+    sont des codes (REPAYMENT_CODES, GRACE_CODES).
+
+    - interest  : intérêts courus sur le mois (capitalisés pendant un différé total) ;
+    - principal : capital remboursé ;
+    - payment   : échéance décaissée (intérêts payés + capital) ;
+    - balance   : capital restant dû en fin de mois.
+    """
+    n = max(np.size(v) for v in (principal, annual_rate, duration, grace_months, repayment, grace_type))
+    P = _vec(principal, n)
+    r = _vec(annual_rate, n) / 12.0
+    grace = np.clip(_vec(grace_months, n, int), 0, None)
+    D = np.maximum(_vec(duration, n, int) - grace, 1)                 # mois d'amortissement
+    mode = _vec(repayment, n, int)
+    capitalized = _vec(grace_type, n, int) == GRACE_CODES[GraceType.total]
+
+    t = np.arange(horizon)[None, :]
+    g, d, rr = grace[:, None], D[:, None], r[:, None]
+    growth = 1.0 + rr
+
+    # --- différé : capital constant (partiel) ou capitalisé (total)
+    in_grace = t < g
+    grace_open = np.where(capitalized[:, None], P[:, None] * growth ** t, P[:, None])
+    # capital à amortir après le différé
+    P1 = np.where(capitalized, P * (1.0 + r) ** grace, P)[:, None]
+
+    # --- amortissement : k = rang de l'échéance (0..D-1)
+    k = t - g
+    active = (k >= 0) & (k < d)
+    kc = np.clip(k, 0, None)
+
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        # annuité : capital restant dû avant l'échéance k (forme fermée)
+        pmt = np.where(rr > 0, P1 * rr / (1.0 - growth ** -d), P1 / d)
+        annuity_open = np.where(
+            rr > 0, P1 * growth ** kc - pmt * (growth ** kc - 1.0) / np.where(rr > 0, rr, 1.0), P1 - pmt * kc
+        )
+    constant_open = P1 * (1.0 - kc / d)
+    opening_amort = np.select(
+        [mode[:, None] == 0, mode[:, None] == 1], [annuity_open, constant_open], default=np.broadcast_to(P1, kc.shape)
+    )
+
+    opening = np.where(in_grace, grace_open, np.where(active, opening_amort, 0.0))
+    interest = opening * rr
+
+    principal_paid = np.select(
+        [mode[:, None] == 0, mode[:, None] == 1],
+        [pmt - interest, np.broadcast_to(P1 / d, kc.shape)],
+        default=np.where(k == d - 1, P1, 0.0),
+    )
+    principal_paid = np.where(active, principal_paid, 0.0)
+
+    interest_paid = np.where(in_grace & capitalized[:, None], 0.0, interest)
+    payment = interest_paid + principal_paid
+    balance = np.where(
+        in_grace,
+        np.where(capitalized[:, None], grace_open * growth, grace_open),
+        np.where(active, opening - principal_paid, 0.0),
+    )
+    # arrondis flottants : le capital restant dû ne descend pas sous zéro
+    balance = np.where(np.abs(balance) < 1e-6 * np.maximum(P[:, None], 1.0), 0.0, balance)
+
+    return {"interest": interest, "principal": principal_paid, "payment": payment, "balance": balance}
+
+
+def loan_schedule(assumptions: FinancialAssumptions, horizon: int) -> Dict[str, np.ndarray]:
+    """Échéancier (1, horizon) du prêt décrit par les hypothèses d'un plan."""
+    return schedule(
+        principal=loan_principal(assumptions),
+        annual_rate=float(assumptions.loan_rate or 0.0),
+        duration=max(int(assumptions.loan_duration or 0), 1),
+        horizon=horizon,
+        grace_months=int(getattr(assumptions, "grace_months", 0) or 0),
+        repayment=REPAYMENT_CODES[RepaymentType(getattr(assumptions, "repayment_type", None) or RepaymentType.annuity)],
+        grace_type=GRACE_CODES[GraceType(getattr(assumptions, "grace_type", None) or GraceType.partial)],
+    )
+
+
+def loan_principal(assumptions: FinancialAssumptions) -> float:
+    """Montant emprunté : loan_amount s'il est renseigné, sinon le CAPEX (ancien calcul)."""
+    amount = getattr(assumptions, "loan_amount", None)
+    return float(amount if amount is not None else (assumptions.capex or 0.0))
@@ -1,7 +1,9 @@
 # app/services/finance/calculators.py
-from typing import Iterable, Optional, List
+from typing import Iterable, Optional, List, Tuple, Union
 import math
 
+import numpy as np
+
 # Tente d'utiliser numpy-financial (npv/irr), sinon fallback pur Python
 try:
     import numpy_financial as npf  # pip install numpy-financial
@@ -62,10 +64,13 @@ def irr(cashflows: Iterable[float], guess: float = 0.1) -> Optional[float]:
         if abs(1.0 + r) < 1e-12:
             r += 1e-3
 
-        # f(r) = NPV(r)
-        f = sum(cf / ((1.0 + r) ** t) for t, cf in enumerate(cfs))
-        # f'(r) = dérivée de la NPV par rapport à r
-        df = sum(-t * cf / ((1.0 + r) ** (t + 1)) for t, cf in enumerate(cfs) if t > 0)
+        try:
+            # f(r) = NPV(r)
+            f = sum(cf / ((1.0 + r) ** t) for t, cf in enumerate(cfs))
+            # f'(r) = dérivée de la NPV par rapport à r
+            df = sum(-t * cf / ((1.0 + r) ** (t + 1)) for t, cf in enumerate(cfs) if t > 0)
+        except (OverflowError, ZeroDivisionError):
+            return None  # divergence (r proche de -1)
 
         if abs(f) < 1e-7:
             return r
@@ -83,6 +88,192 @@ def irr(cashflows: Iterable[float], guess: float = 0.1) -> Optional[float]:
     return None  # non convergence
 
 
+def _as_matrix(cashflows) -> np.ndarray:
+    cfs = np.asarray(cashflows, dtype=float)
+    if cfs.ndim != 2:
+        raise ValueError("cashflows doit être un tableau 2-D (une ligne par vecteur de flux)")
+    return cfs
+
+
+def npv_batch(rate: Union[float, np.ndarray], cashflows) -> np.ndarray:
+    """
+    NPV de chaque ligne d'une matrice de flux (n, T) ; `rate` scalaire ou (n,).
+    Même convention que npv() : le flux t est actualisé par (1 + rate)^t.
+    """
+    cfs = _as_matrix(cashflows)
+    t = np.arange(cfs.shape[1])
+    rate = np.asarray(rate, dtype=float)
+    if rate.ndim == 0:
+        return cfs @ (1.0 + rate) ** -t
+    return (cfs * (1.0 + rate[:, None]) ** -t).sum(axis=1)
+
+
+def _sign_changes(cfs: np.ndarray) -> np.ndarray:
+    """Nombre de changements de signe par ligne (flux nuls ignorés, comme une règle de Descartes)."""
+    signs = np.sign(cfs)
+    counts = np.zeros(cfs.shape[0], dtype=int)
+    last = np.zeros(cfs.shape[0])
+    for t in range(cfs.shape[1]):
+        s = signs[:, t]
+        counts += (s * last < 0)
+        last = np.where(s != 0, s, last)
+    return counts
+
+
+def _polyval(cfs: np.ndarray, x: np.ndarray) -> np.ndarray:
+    """Σ CF_t x^t par ligne (Horner), avec x = 1 / (1 + r)."""
+    p = np.zeros(cfs.shape[0])
+    for t in range(cfs.shape[1] - 1, -1, -1):
+        p = p * x + cfs[:, t]
+    return p
+
+
+def _refine(cfs: np.ndarray, lo: np.ndarray, hi: np.ndarray, iterations: int) -> np.ndarray:
+    """Dichotomie en x sur [lo, hi] (signes opposés aux bornes) ; renvoie x."""
+    sign_lo = np.sign(_polyval(cfs, lo))
+    for _ in range(iterations):
+        mid = 0.5 * (lo + hi)
+        same = np.sign(_polyval(cfs, mid)) == sign_lo
+        lo = np.where(same, mid, lo)
+        hi = np.where(same, hi, mid)
+    return 0.5 * (lo + hi)
+
+
+# flux longs ou non conventionnels : dépassements attendus (NaN / inf filtrés par l'appelant)
+@np.errstate(over="ignore", invalid="ignore", divide="ignore")
+def _bisect(cfs: np.ndarray, iterations: int = 200) -> np.ndarray:
+    """
+    Racine par dichotomie en x = 1 / (1 + r) > 0 (r > -1), pour des flux à un seul
+    changement de signe : racine positive unique, encadrée par [0, hi].
+    """
+    n = cfs.shape[0]
+    p0 = np.sign(cfs[:, 0])
+    hi = np.ones(n)
+    # élargit hi (r proche de -1) jusqu'à ce que le signe change
+    for _ in range(64):
+        open_ = np.sign(_polyval(cfs, hi)) == p0
+        if not open_.any():
+            break
+        hi = np.where(open_, hi * 2.0, hi)
+    bracketed = np.sign(_polyval(cfs, hi)) == -p0
+    x = _refine(cfs, np.zeros(n), hi, iterations)
+    return np.where(bracketed & (x > 0), 1.0 / x - 1.0, np.nan)
+
+
+# grille de balayage en r pour encadrer les racines (flux à plusieurs changements de signe)
+_SCAN_RATES = np.concatenate([-np.geomspace(0.9999, 1e-6, 80), [0.0], np.geomspace(1e-6, 1e4, 120)])
+
+
+@np.errstate(over="ignore", invalid="ignore", divide="ignore")
+def _closest_root(cfs: np.ndarray, iterations: int = 100) -> np.ndarray:
+    """
+    IRR la plus proche de 0 (choix de numpy_financial quand il y a plusieurs racines) :
+    balayage de la NPV sur _SCAN_RATES, puis dichotomie dans l'intervalle le plus proche
+    de 0 de chaque côté. NaN si aucun changement de signe n'est trouvé sur la grille.
+    """
+    n = cfs.shape[0]
+    x_grid = 1.0 / (1.0 + _SCAN_RATES)                                 # décroissant
+    values = np.zeros((n, x_grid.size))
+    for t in range(cfs.shape[1] - 1, -1, -1):
+        values = values * x_grid + cfs[:, t:t + 1]
+    crossing = np.sign(values[:, :-1]) * np.sign(values[:, 1:]) <= 0   # racine dans [g, g+1]
+    crossing &= (values[:, :-1] != 0) | (values[:, 1:] != 0)
+
+    zero = int(np.flatnonzero(_SCAN_RATES == 0.0)[0])
+    candidates = []
+    # côté r < 0 : dernier intervalle avant 0 ; côté r >= 0 : premier intervalle après 0
+    for side, pick in ((crossing[:, :zero], "last"), (crossing[:, zero:], "first")):
+        found = side.any(axis=1)
+        if pick == "last":
+            g = side.shape[1] - 1 - np.argmax(side[:, ::-1], axis=1)
+        else:
+            g = zero + np.argmax(side, axis=1)
+        x = _refine(cfs, x_grid[g], x_grid[g + 1], iterations)
+        candidates.append(np.where(found, 1.0 / x - 1.0, np.nan))
+
+    neg, pos = candidates
+    use_neg = np.isnan(pos) | (np.abs(neg) < np.abs(pos))
+    return np.where(use_neg, neg, pos)
+
+
+def irr_batch(
+    cashflows,
+    guess: float = 0.1,
+    tol: float = 1e-7,
+    maxiter: int = 100,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    IRR de chaque ligne d'une matrice de flux (n, T), en une passe vectorielle.
+    Renvoie (irr, converged) : irr vaut NaN là où il n'y a pas de solution.
+
+    - flux conventionnels (un seul changement de signe) : Newton vectorisé depuis `guess`,
+      repli par dichotomie encadrée pour les lignes qui divergent ou sortent de r > -1 ;
+    - plusieurs changements de signe (plusieurs IRR possibles) : racine la plus proche
+      de 0, comme numpy_financial (balayage encadré puis dichotomie) ; NaN si le
+      balayage ne trouve aucune racine (pas d'IRR réelle, ou hors de la grille) ;
+    - aucun changement de signe : pas d'IRR (NaN, converged = False), comme irr().
+    """
+    cfs = _as_matrix(cashflows)
+    n, T = cfs.shape
+    result = np.full(n, np.nan)
+    converged = np.zeros(n, dtype=bool)
+
+    changes = _sign_changes(cfs)
+    # même test d'existence que irr() : un changement de signe entre deux flux consécutifs
+    changes[~(cfs[:, :-1] * cfs[:, 1:] < 0).any(axis=1)] = 0
+    # flux initial nul : x = 0 est racine, cas laissé au calcul unitaire
+    per_row = (changes > 0) & (cfs[:, 0] == 0)
+    multiple = np.flatnonzero((changes > 1) & ~per_row)
+    if multiple.size:
+        roots = _closest_root(cfs[multiple])
+        result[multiple] = roots
+        converged[multiple] = np.isfinite(roots)
+    for i in np.flatnonzero(per_row):
+        value = irr(cfs[i].tolist(), guess)
+        if value is not None:
+            result[i], converged[i] = value, True
+
+    single = np.flatnonzero((changes == 1) & ~per_row)
+    if single.size == 0:
+        return result, converged
+
+    sub = cfs[single]
+    t = np.arange(T)
+    r = np.full(single.size, float(guess))
+    active = np.ones(single.size, dtype=bool)
+    done = np.zeros(single.size, dtype=bool)
+    with np.errstate(over="ignore", invalid="ignore", divide="ignore"):
+        for _ in range(maxiter):
+            if not active.any():
+                break
+            idx = np.flatnonzero(active)
+            rr = r[idx]
+            disc = (1.0 + rr[:, None]) ** -t
+            f = (sub[idx] * disc).sum(axis=1)
+            df = -(t * sub[idx] * disc).sum(axis=1) / (1.0 + rr)
+
+            hit = np.abs(f) < tol
+            step = np.where(df != 0, f / np.where(df != 0, df, 1.0), 0.0)
+            r_new = np.where(df != 0, rr - step, rr + 1e-3)
+            bad = ~np.isfinite(r_new) | (r_new <= -1.0)
+            small = (df != 0) & (np.abs(r_new - rr) < tol)
+
+            r[idx] = np.where(hit, rr, r_new)
+            done[idx[hit | (small & ~bad)]] = True
+            active[idx[hit | small | bad]] = False
+
+    # repli : dichotomie pour les lignes non convergées (ou racine hors de r > -1)
+    done &= r > -1.0
+    if (~done).any():
+        fallback = np.flatnonzero(~done)
+        r[fallback] = _bisect(sub[fallback])
+        done[fallback] = np.isfinite(r[fallback])
+
+    result[single] = np.where(done, r, np.nan)
+    converged[single] = done
+    return result, converged
+
+
 def gross_margin_pct(revenue: float, cogs: float) -> float:
     """
     Marge brute (%) = (CA - Coût des ventes) / CA * 100
@@ -0,0 +1,271 @@
+# app/services/finance/forecast.py
+"""
+Moteur de prévision financière vectorisé (NumPy).
+
+Une seule passe construit les séries mensuelles (revenue, COGS, marge brute, opex,
+EBITDA, service de la dette, cashflow, cashflow cumulé) pour n jeux d'hypothèses à
+la fois : chaque driver est un vecteur (n,), chaque série une matrice (n, H).
+n = 1 pour la prévision d'un plan ; n grand pour les simulations (Monte Carlo, sensibilité).
+
+Conventions (mêmes que le calcul historique des KPI) :
+- volume du mois t = unités de base x saisonnalité[t mod 12] x indice de croissance,
+  l'indice étant le produit des (1 + growth_rates[k mod 12]) pour k = 1..t ;
+- opex mensuel = charges fixes + salaires + taxes ;
+- service de la dette = échéances du prêt (amortization.schedule : annuité, amortissement
+  constant ou in fine, avec différé éventuel) ;
+- cashflow = EBITDA - service de la dette ; le cumul part de -CAPEX.
+"""
+from dataclasses import dataclass, fields, replace
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from fastapi import HTTPException
+from sqlalchemy import delete, insert
+
+from app.services.finance.amortization import GRACE_CODES, REPAYMENT_CODES, loan_principal, schedule
+from app.services.finance.models import (
+    FinancialAssumptions, FinancialForecast, ForecastGranularity, GraceType, RepaymentType,
+)
+
+HORIZONS = (12, 36, 60)
+MAX_HORIZON = max(HORIZONS)
+DEFAULT_MONTHLY_UNITS = 100.0
+
+
+def check_horizon(horizon: int) -> int:
+    """Horizon reçu par une route : 400 s'il n'est pas dans HORIZONS."""
+    if horizon not in HORIZONS:
+        raise HTTPException(status_code=400, detail=f"Horizon invalide (valeurs possibles: {', '.join(map(str, HORIZONS))})")
+    return horizon
+
+SERIES = (
+    "revenue", "cogs", "gross_margin", "opex", "ebitda", "debt_service", "cashflow", "cum_cashflow",
+)
+# séries de flux (sommées au regroupement) ; cum_cashflow prend la dernière valeur de la période
+FLOW_SERIES = SERIES[:-1]
+
+
+@dataclass(frozen=True)
+class ForecastDrivers:
+    """Hypothèses sous forme vectorielle : un élément par jeu d'hypothèses."""
+    pricing: np.ndarray
+    variable_costs: np.ndarray
+    fixed_costs: np.ndarray          # charges fixes + salaires + taxes (mensuel)
+    capex: np.ndarray
+    principal: np.ndarray            # montant emprunté
+    loan_rate: np.ndarray            # taux annuel
+    loan_duration: np.ndarray        # mois, différé compris
+    grace_months: np.ndarray
+    repayment_type: np.ndarray       # codes amortization.REPAYMENT_CODES
+    grace_type: np.ndarray           # codes amortization.GRACE_CODES
+    monthly_units: np.ndarray
+    seasonality: np.ndarray          # (12,) ou (n, 12)
+    growth_rates: np.ndarray         # (12,) ou (n, 12)
+
+    @property
+    def n(self) -> int:
+        return int(np.asarray(self.pricing).shape[0])
+
+    @classmethod
+    def from_assumptions(cls, a: FinancialAssumptions, n: int = 1) -> "ForecastDrivers":
+        def vec(value) -> np.ndarray:
+            return np.full(n, float(value or 0.0))
+
+        return cls(
+            pricing=vec(a.pricing),
+            variable_costs=vec(a.variable_costs),
+            fixed_costs=vec((a.fixed_costs or 0.0) + (a.salaries or 0.0) + (a.taxes or 0.0)),
+            capex=vec(a.capex),
+            principal=vec(loan_principal(a)),
+            loan_rate=vec(a.loan_rate),
+            loan_duration=np.full(n, max(int(a.loan_duration or 0), 1)),
+            grace_months=np.full(n, int(getattr(a, "grace_months", 0) or 0)),
+            repayment_type=np.full(n, REPAYMENT_CODES[RepaymentType(getattr(a, "repayment_type", None) or "annuity")]),
+            grace_type=np.full(n, GRACE_CODES[GraceType(getattr(a, "grace_type", None) or "partial")]),
+            monthly_units=vec(getattr(a, "monthly_units", None) or DEFAULT_MONTHLY_UNITS),
+            seasonality=_monthly_profile(a.seasonality, 1.0),
+            growth_rates=_monthly_profile(a.growth_rates, 0.0),
+        )
+
+    def with_values(self, **values) -> "ForecastDrivers":
+        """Copie avec certains drivers remplacés (scalaires diffusés sur les n jeux)."""
+        n = self.n
+        arrays = {}
+        for name, value in values.items():
+            value = np.asarray(value, dtype=float)
+            if name in ("seasonality", "growth_rates"):
+                arrays[name] = value
+            else:
+                arrays[name] = np.broadcast_to(value, (n,)).astype(float, copy=True)
+        return replace(self, **arrays)
+
+    def repeat(self, n: int) -> "ForecastDrivers":
+        """Duplique un jeu d'hypothèses (n = 1) en n jeux identiques."""
+        values = {}
+        for f in fields(self):
+            value = getattr(self, f.name)
+            if f.name in ("seasonality", "growth_rates"):
+                values[f.name] = value if value.ndim == 1 else np.repeat(value, n, axis=0)
+            else:
+                values[f.name] = np.repeat(value, n)
+        return ForecastDrivers(**values)
+
+
+def _monthly_profile(values, default: float) -> np.ndarray:
+    profile = np.asarray(values if values else [default] * 12, dtype=float)
+    if profile.shape[-1] != 12:
+        # profil incomplet : on complète avec la valeur neutre
+        profile = np.resize(np.append(profile, [default] * 12), 12)
+    return profile
+
+
+def project(
+    drivers: ForecastDrivers,
+    horizon: int = MAX_HORIZON,
+    volume_shocks: Optional[np.ndarray] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Séries mensuelles (n, horizon) pour tous les jeux d'hypothèses, en une passe.
+    volume_shocks (n, horizon) : facteurs multiplicatifs mois par mois (simulations).
+    """
+    t = np.arange(horizon)
+    month = t % 12
+
+    season = drivers.seasonality[..., month]                      # (H,) ou (n, H)
+    growth = 1.0 + drivers.growth_rates[..., month]
+    growth[..., 0] = 1.0                                          # le mois 0 est la base
+    index = np.cumprod(growth, axis=-1)
+
+    units = drivers.monthly_units[:, None] * np.atleast_2d(season * index)     # (n, H)
+    if volume_shocks is not None:
+        units *= volume_shocks
+    revenue = units * drivers.pricing[:, None]
+    cogs = units * drivers.variable_costs[:, None]
+    gross_margin = revenue - cogs
+    opex = np.broadcast_to(drivers.fixed_costs[:, None], revenue.shape)
+    ebitda = gross_margin - opex
+
+    debt_service = loan_payments(drivers, horizon)
+
+    cashflow = ebitda - debt_service
+    cum_cashflow = np.cumsum(cashflow, axis=1)
+    cum_cashflow -= drivers.capex[:, None]
+
+    return {
+        "revenue": revenue,
+        "cogs": cogs,
+        "gross_margin": gross_margin,
+        "opex": opex,
+        "ebitda": ebitda,
+        "debt_service": debt_service,
+        "cashflow": cashflow,
+        "cum_cashflow": cum_cashflow,
+    }
+
+
+def loan_payments(drivers: ForecastDrivers, horizon: int) -> np.ndarray:
+    """
+    Échéances décaissées (n, horizon) des prêts des jeux d'hypothèses.
+    L'échéancier est linéaire en capital : on le calcule pour 1 FCFA une seule fois par
+    jeu de conditions (taux, durée, différé, modes), puis on le met à l'échelle.
+    """
+    terms = np.column_stack([
+        drivers.loan_rate, drivers.loan_duration, drivers.grace_months, drivers.repayment_type, drivers.grace_type,
+    ])
+    if (terms == terms[0]).all():
+        # cas courant (simulations) : mêmes conditions pour tous les jeux
+        unique, inverse = terms[:1], np.zeros(len(terms), dtype=int)
+    else:
+        unique, inverse = np.unique(terms, axis=0, return_inverse=True)
+    unit = schedule(
+        1.0, unique[:, 0], unique[:, 1], horizon,
+        grace_months=unique[:, 2], repayment=unique[:, 3], grace_type=unique[:, 4],
+    )["payment"]
+    if len(unique) == 1:
+        return drivers.principal[:, None] * unit
+    return drivers.principal[:, None] * unit[inverse.ravel()]
+
+
+def period_labels(start: date, horizon: int, granularity: ForecastGranularity) -> Tuple[List[str], np.ndarray]:
+    """
+    Libellés de période (YYYY-MM, YYYY-Qn, YYYY) et indices de début de chaque période
+    dans la série mensuelle (périodes calendaires : la première peut être partielle).
+    """
+    absolute = start.year * 12 + (start.month - 1) + np.arange(horizon)
+    years, months = absolute // 12, absolute % 12
+    if granularity == ForecastGranularity.monthly:
+        keys = absolute
+        labels = [f"{y}-{m + 1:02d}" for y, m in zip(years, months)]
+    elif granularity == ForecastGranularity.quarterly:
+        keys = years * 4 + months // 3
+        labels = [f"{y}-Q{m // 3 + 1}" for y, m in zip(years, months)]
+    else:
+        keys = years
+        labels = [str(y) for y in years]
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    return [labels[i] for i in starts], starts
+
+
+def rollup(
+    series: Dict[str, np.ndarray], start: date, granularity: ForecastGranularity
+) -> Tuple[List[str], Dict[str, np.ndarray]]:
+    """Regroupe les séries mensuelles (n, H) par trimestre ou année (n, P)."""
+    horizon = series["revenue"].shape[1]
+    labels, starts = period_labels(start, horizon, granularity)
+    if granularity == ForecastGranularity.monthly:
+        return labels, series
+    ends = np.r_[starts[1:], horizon] - 1
+    grouped = {name: np.add.reduceat(series[name], starts, axis=1) for name in FLOW_SERIES}
+    grouped["cum_cashflow"] = series["cum_cashflow"][:, ends]
+    return labels, grouped
+
+
+def build_forecast_rows(plan_id: int, assumptions: FinancialAssumptions) -> List[dict]:
+    """
+    Lignes FinancialForecast d'un plan : pour chaque horizon (12/36/60 mois), la série
+    mensuelle et ses regroupements trimestriel et annuel. Une seule projection (60 mois).
+    """
+    series = project(ForecastDrivers.from_assumptions(assumptions), MAX_HORIZON)
+    start = assumptions.start_date or date.today()
+    rows: List[dict] = []
+    for horizon in HORIZONS:
+        window = {name: values[:, :horizon] for name, values in series.items()}
+        for granularity in ForecastGranularity:
+            labels, grouped = rollup(window, start, granularity)
+            # une seule conversion en listes Python par série (pas d'accès élément par élément)
+            columns = {name: grouped[name][0].round(2).tolist() for name in SERIES}
+            for i, label in enumerate(labels):
+                rows.append({
+                    "plan_id": plan_id,
+                    "horizon": horizon,
+                    "granularity": granularity,
+                    "period_index": i,
+                    "period": label,
+                    **{name: columns[name][i] for name in SERIES},
+                })
+    return rows
+
+
+def write_forecast(db, plan_id: int, assumptions: FinancialAssumptions) -> int:
+    """Remplace la prévision stockée du plan (insertion groupée, sans commit)."""
+    rows = build_forecast_rows(plan_id, assumptions)
+    db.exec(delete(FinancialForecast).where(FinancialForecast.plan_id == plan_id))
+    if rows:
+        db.exec(insert(FinancialForecast), params=rows)
+    return len(rows)
+
+
+def monthly_rate(annual_rate: float) -> float:
+    """Taux mensuel équivalent à un taux annuel (actualisation des flux mensuels)."""
+    return (1.0 + annual_rate) ** (1.0 / 12.0) - 1.0
+
+
+def kpi_inputs(series: Dict[str, np.ndarray], months: int = 12, row: int = 0) -> Dict[str, float]:
+    """Totaux sur les `months` premiers mois d'une série (base des KPI)."""
+    return {name: float(series[name][row, :months].sum()) for name in FLOW_SERIES}
+
+
+def cashflows_for_npv(drivers: ForecastDrivers, series: Dict[str, np.ndarray], months: int, row: int = 0) -> List[float]:
+    """Flux [-CAPEX, cashflow mois 1..months] d'un jeu d'hypothèses."""
+    return [-float(drivers.capex[row])] + series["cashflow"][row, :months].tolist()
@@ -0,0 +1,189 @@
+# app/services/finance/goal_seek.py
+"""
+Recherche d'objectif : quelle valeur d'un driver (prix, coûts, volume, taux ou durée
+du prêt) permet d'atteindre un DSCR, un mois de point mort, une NPV ou une IRR ?
+
+Chaque objectif est un prédicat : métrique >= cible (DSCR, NPV, IRR) ou <= cible
+(mois de point mort). La recherche est encadrée :
+1. balayage de l'intervalle du driver (SCAN_POINTS valeurs, une seule passe vectorielle
+   pour tous les objectifs) ; on retient le changement d'état le plus proche de la
+   valeur actuelle ;
+2. dichotomie dans cet intervalle, tous les objectifs avancés ensemble à chaque passe ;
+   la valeur renvoyée est la borne qui satisfait l'objectif (entière pour la durée).
+Les métriques sont celles de simulator.kpi_arrays, calculées sur la série prévisionnelle.
+"""
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.services.finance.forecast import ForecastDrivers
+from app.services.finance.models import FinancialAssumptions
+from app.services.finance.simulator import kpi_arrays
+
+SOLVABLE_DRIVERS = ("pricing", "variable_costs", "fixed_costs", "monthly_units", "loan_rate", "loan_duration")
+INTEGER_DRIVERS = ("loan_duration",)
+# sens de l'objectif : True -> métrique >= cible, False -> métrique <= cible
+GOAL_METRICS = {"dscr": True, "dscr_min": True, "npv": True, "irr": True, "breakeven_month": False}
+
+SCAN_POINTS = 65
+BISECT_ITERATIONS = 60
+MAX_LOAN_DURATION = 360
+
+
+@dataclass(frozen=True)
+class GoalTarget:
+    driver: str
+    metric: str
+    target: float
+    low: Optional[float] = None   # bornes de recherche (défaut : _default_bounds)
+    high: Optional[float] = None
+
+
+def _base_value(assumptions: FinancialAssumptions, driver: str) -> float:
+    if driver == "loan_duration":
+        return float(max(int(assumptions.loan_duration or 0), 1))
+    return float(getattr(assumptions, driver, 0.0) or 0.0)
+
+
+def _default_bounds(assumptions: FinancialAssumptions, driver: str) -> Tuple[float, float]:
+    if driver == "loan_rate":
+        return 0.0, 1.0
+    if driver == "loan_duration":
+        return 1.0, float(MAX_LOAN_DURATION)
+    base = _base_value(assumptions, driver)
+    if driver == "pricing":
+        # jusqu'à 10x le prix actuel (ou le coût variable si le prix est nul)
+        return 0.0, 10.0 * max(base, float(assumptions.variable_costs or 0.0), 1.0)
+    return 0.0, 10.0 * max(base, 1.0)
+
+
+def _evaluate(
+    base: ForecastDrivers, assumptions: FinancialAssumptions, drivers: List[str], values: np.ndarray,
+    metrics: List[str], horizon: int, rate: float,
+) -> np.ndarray:
+    """Métrique de chaque ligne : la ligne i remplace drivers[i] par values[i]."""
+    n = len(values)
+    drivers_arr = np.asarray(drivers)
+    overrides = {}
+    for name in set(drivers):
+        mask = drivers_arr == name
+        if name == "fixed_costs":
+            # le driver du moteur inclut salaires et taxes
+            column = base.fixed_costs[0] + np.where(mask, values - float(assumptions.fixed_costs or 0.0), 0.0)
+        else:
+            column = np.where(mask, values, getattr(base, name)[0])
+        overrides[name] = np.rint(column) if name in INTEGER_DRIVERS else column
+    kpis = kpi_arrays(base.repeat(n).with_values(**overrides), horizon, rate)
+    metric_arr = np.asarray(metrics)
+    result = np.full(n, np.nan)
+    for name in set(metrics):
+        mask = metric_arr == name
+        result[mask] = kpis[name][mask]
+    return result
+
+
+def _satisfied(metric_values: np.ndarray, targets: np.ndarray, higher: np.ndarray) -> np.ndarray:
+    with np.errstate(invalid="ignore"):
+        ok = np.where(higher, metric_values >= targets, metric_values <= targets)
+    return ok & np.isfinite(metric_values)
+
+
+def goal_seek(
+    assumptions: FinancialAssumptions,
+    targets: List[GoalTarget],
+    horizon: int = 36,
+    rate: float = 0.1,
+) -> List[Dict[str, object]]:
+    for t in targets:
+        if t.driver not in SOLVABLE_DRIVERS:
+            raise ValueError(f"Driver non résoluble: {t.driver}")
+        if t.metric not in GOAL_METRICS:
+            raise ValueError(f"Métrique inconnue: {t.metric}")
+
+    base = ForecastDrivers.from_assumptions(assumptions)
+    k = len(targets)
+    drivers = [t.driver for t in targets]
+    metrics = [t.metric for t in targets]
+    goal = np.array([t.target for t in targets], dtype=float)
+    higher = np.array([GOAL_METRICS[t.metric] for t in targets])
+    integer = np.array([t.driver in INTEGER_DRIVERS for t in targets])
+    base_values = np.array([_base_value(assumptions, t.driver) for t in targets])
+    bounds = np.array([
+        (t.low if t.low is not None else _default_bounds(assumptions, t.driver)[0],
+         t.high if t.high is not None else _default_bounds(assumptions, t.driver)[1])
+        for t in targets
+    ])
+    if (bounds[:, 0] >= bounds[:, 1]).any():
+        raise ValueError("Bornes de recherche invalides (min >= max)")
+
+    base_metric = _evaluate(base, assumptions, drivers, base_values, metrics, horizon, rate)
+    already_met = _satisfied(base_metric, goal, higher)
+
+    # 1. balayage : (k, SCAN_POINTS) évalués en une passe
+    steps = np.linspace(0.0, 1.0, SCAN_POINTS)
+    grid = bounds[:, :1] + (bounds[:, 1:] - bounds[:, :1]) * steps
+    grid = np.where(integer[:, None], np.rint(grid), grid)
+    scanned = _evaluate(
+        base, assumptions, np.repeat(drivers, SCAN_POINTS).tolist(), grid.ravel(),
+        np.repeat(metrics, SCAN_POINTS).tolist(), horizon, rate,
+    ).reshape(k, SCAN_POINTS)
+    ok = _satisfied(scanned, goal[:, None], higher[:, None])
+
+    # changement d'état le plus proche de la valeur actuelle
+    transitions = ok[:, 1:] != ok[:, :-1]
+    found = transitions.any(axis=1)
+    centers = 0.5 * (grid[:, 1:] + grid[:, :-1])
+    distance = np.where(transitions, np.abs(centers - base_values[:, None]), np.inf)
+    cell = distance.argmin(axis=1)
+    rows = np.arange(k)
+    lo, hi = grid[rows, cell], grid[rows, cell + 1]
+    ok_lo = ok[rows, cell]
+
+    # 2. dichotomie (tous les objectifs à la fois) ; invariant : état(lo) != état(hi)
+    active = found.copy()
+    for _ in range(BISECT_ITERATIONS):
+        active &= np.where(integer, hi - lo > 1, hi - lo > 1e-9 * np.maximum(np.abs(hi), 1.0))
+        if not active.any():
+            break
+        mid = 0.5 * (lo + hi)
+        mid = np.where(integer, np.floor(mid), mid)
+        ok_mid = _satisfied(_evaluate(base, assumptions, drivers, mid, metrics, horizon, rate), goal, higher)
+        move_lo = active & (ok_mid == ok_lo)
+        move_hi = active & ~move_lo
+        lo = np.where(move_lo, mid, lo)
+        hi = np.where(move_hi, mid, hi)
+
+    solution = np.where(ok_lo, lo, hi)
+    achieved = _evaluate(base, assumptions, drivers, solution, metrics, horizon, rate)
+
+    results = []
+    for i, t in enumerate(targets):
+        item = {
+            "driver": t.driver,
+            "metric": t.metric,
+            "target": t.target,
+            "goal": ">=" if higher[i] else "<=",
+            "bounds": [float(bounds[i, 0]), float(bounds[i, 1])],
+            "base_value": _round(base_values[i]),
+            "base_metric": _round(base_metric[i]),
+            "already_met": bool(already_met[i]),
+            "solved": bool(found[i]),
+        }
+        if found[i]:
+            item.update({
+                "value": int(solution[i]) if integer[i] else _round(solution[i]),
+                "achieved": _round(achieved[i]),
+                "change_pct": _round(100.0 * (solution[i] - base_values[i]) / base_values[i]) if base_values[i] else None,
+            })
+        else:
+            item["message"] = (
+                "Objectif atteint sur tout l'intervalle" if ok[i].all()
+                else "Objectif inatteignable dans l'intervalle"
+            )
+        results.append(item)
+    return results
+
+
+def _round(value: float) -> Optional[float]:
+    return round(float(value), 6) if np.isfinite(value) else None
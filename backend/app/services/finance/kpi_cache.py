@@ -0,0 +1,142 @@
+# app/services/finance/kpi_cache.py
+"""
+Cache des KPI financiers, indexé par l'empreinte des hypothèses.
+
+- `assumptions_hash` : SHA-256 des champs de FinancialAssumptions qui entrent dans les
+  calculs ; stockée sur la ligne à chaque enregistrement (save_assumptions). Une ligne
+  dont l'empreinte stockée ne correspond plus (ligne ancienne, nouveaux champs, version
+  du calcul) est remise à jour à la lecture, prévision comprise (ensure_current).
+- KpiSnapshot : KPI calculés pour (plan, empreinte, taux, horizon). Une lecture du
+  tableau de bord devient une recherche par index ; une nouvelle empreinte rend les
+  anciens snapshots inutiles, supprimés à l'enregistrement suivant des hypothèses
+  (les snapshots des scénarios du plan sont vidés en même temps).
+- Les ETag dérivent de l'empreinte : le client peut faire des GET conditionnels
+  (If-None-Match -> 304) sur les KPI comme sur la prévision.
+"""
+import hashlib
+import json
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select
+
+from app.services.finance.calculators import (
+    break_even_units, break_even_revenue,
+    gross_margin_pct, opex_to_revenue, dscr, npv, irr
+)
+from app.services.finance.forecast import (
+    ForecastDrivers, cashflows_for_npv, kpi_inputs, monthly_rate, project, write_forecast,
+)
+from app.services.finance.models import FinancialAssumptions, KpiSnapshot
+from app.services.finance.scenarios import invalidate_scenarios
+
+# à incrémenter quand le calcul des KPI change : invalide tous les snapshots
+KPI_VERSION = 2
+
+_HASH_EXCLUDE = {"id", "plan_id", "created_at", "assumptions_hash"}
+
+
+def assumptions_hash(assumptions: FinancialAssumptions) -> str:
+    values = assumptions.model_dump(exclude=_HASH_EXCLUDE)
+    payload = json.dumps({"v": KPI_VERSION, **values}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def refresh_hash(db: Session, assumptions: FinancialAssumptions) -> str:
+    """
+    Recalcule l'empreinte (à appeler après modification des hypothèses, sans commit)
+    et supprime les snapshots (KPI, scénarios) des versions précédentes du plan.
+    """
+    digest = assumptions_hash(assumptions)
+    if digest != assumptions.assumptions_hash:
+        assumptions.assumptions_hash = digest
+        db.add(assumptions)
+        db.exec(delete(KpiSnapshot).where(
+            KpiSnapshot.plan_id == assumptions.plan_id,
+            KpiSnapshot.assumptions_hash != digest,
+        ))
+        invalidate_scenarios(db, assumptions.plan_id, digest)
+    return digest
+
+
+def ensure_current(db: Session, assumptions: FinancialAssumptions) -> str:
+    """Empreinte à jour des hypothèses ; prévision et empreinte réécrites si elle a changé."""
+    digest = assumptions_hash(assumptions)
+    if digest != assumptions.assumptions_hash:
+        write_forecast(db, assumptions.plan_id, assumptions)
+        refresh_hash(db, assumptions)
+        db.commit()
+    return digest
+
+
+def make_etag(*parts: object) -> str:
+    return '"' + hashlib.sha1("|".join(map(str, parts)).encode("utf-8")).hexdigest()[:20] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+def _rate_key(rate: float) -> float:
+    return round(float(rate), 8)
+
+
+def kpi_etag(digest: str, rate: float, horizon: int) -> str:
+    return make_etag("kpi", digest, _rate_key(rate), horizon)
+
+
+def compute_kpis(assumptions: FinancialAssumptions, rate: float, horizon: int) -> Dict[str, Optional[float]]:
+    prix = assumptions.pricing
+    cv = assumptions.variable_costs
+    cf = assumptions.fixed_costs + assumptions.salaries + assumptions.taxes
+
+    # KPI calculés sur la série prévisionnelle (saisonnalité, croissance, échéancier du prêt)
+    drivers = ForecastDrivers.from_assumptions(assumptions)
+    series = project(drivers, horizon)
+    totals = kpi_inputs(series, horizon)
+
+    # Flux mensuels après service de la dette, actualisés au taux mensuel équivalent
+    flows = cashflows_for_npv(drivers, series, horizon)
+
+    return {
+        "break_even_units": break_even_units(prix, cv, cf),
+        "break_even_revenue": break_even_revenue(prix, cv, cf),
+        "gross_margin_pct": gross_margin_pct(totals["revenue"], totals["cogs"]),
+        "opex_to_revenue": opex_to_revenue(totals["opex"], totals["revenue"]),
+        "dscr": dscr(totals["ebitda"], totals["debt_service"]),
+        "npv": npv(monthly_rate(rate), flows),
+        "irr": irr(flows),
+    }
+
+
+def cached_kpis(
+    db: Session, assumptions: FinancialAssumptions, digest: str, rate: float, horizon: int
+) -> Tuple[Dict[str, Optional[float]], str]:
+    """KPI (snapshot existant ou calculé puis stocké) et leur ETag ; digest : ensure_current()."""
+    rate_key = _rate_key(rate)
+
+    snapshot = db.exec(select(KpiSnapshot).where(
+        KpiSnapshot.plan_id == assumptions.plan_id,
+        KpiSnapshot.assumptions_hash == digest,
+        KpiSnapshot.rate == rate_key,
+        KpiSnapshot.horizon == horizon,
+    )).first()
+    if snapshot is not None:
+        return snapshot.kpis, snapshot.etag
+
+    kpis = compute_kpis(assumptions, rate_key, horizon)
+    etag = kpi_etag(digest, rate_key, horizon)
+    db.add(KpiSnapshot(
+        plan_id=assumptions.plan_id, assumptions_hash=digest, rate=rate_key, horizon=horizon,
+        kpis=kpis, etag=etag,
+    ))
+    try:
+        db.commit()
+    except IntegrityError:
+        # requête concurrente : le snapshot vient d'être écrit, même contenu
+        db.rollback()
+    return kpis, etag
@@ -2,10 +2,21 @@ from datetime import date, datetime, timezone
 from enum import Enum
 from typing import Optional, List, Dict
 
-from sqlalchemy import Column
+from sqlalchemy import Column, Index
 from sqlmodel import SQLModel, Field, JSON
 
 
+class RepaymentType(str, Enum):
+    annuity = "annuity"                        # échéances constantes
+    constant_principal = "constant_principal"  # amortissement constant du capital
+    in_fine = "in_fine"                        # capital remboursé à la dernière échéance
+
+
+class GraceType(str, Enum):
+    partial = "partial"  # différé partiel : intérêts payés
+    total = "total"      # différé total : intérêts capitalisés
+
+
 class FinancialAssumptions(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     plan_id: int = Field(foreign_key="businessplan.id", index=True)
@@ -17,7 +28,12 @@ class FinancialAssumptions(SQLModel, table=True):
     taxes: float                            # Charges fiscales mensuelles
     capex: float                            # Investissements initiaux
     loan_rate: float                        # Taux d'intérêt annuel (ex: 0.1 pour 10%)
-    loan_duration: int                      # Durée en mois
+    loan_duration: int                      # Durée en mois (différé compris)
+    loan_amount: Optional[float] = None     # Montant emprunté (défaut : montant demandé du plan, sinon CAPEX)
+    repayment_type: RepaymentType = RepaymentType.annuity
+    grace_months: int = 0                   # Différé en mois
+    grace_type: GraceType = GraceType.partial
+    monthly_units: float = 100.0            # Volume mensuel de base (avant saisonnalité/croissance)
 
     seasonality: List[float] = Field(
         default_factory=lambda: [1.0] * 12,
@@ -31,6 +47,8 @@ class FinancialAssumptions(SQLModel, table=True):
     )
     start_date: date = Field(default_factory=date.today)
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    # empreinte des hypothèses (clé du cache de KPI, ETag), recalculée à chaque enregistrement
+    assumptions_hash: Optional[str] = Field(default=None, index=True)
 
 
 class ForecastGranularity(str, Enum):
@@ -40,8 +58,16 @@ class ForecastGranularity(str, Enum):
 
 
 class FinancialForecast(SQLModel, table=True):
+    # série d'un plan pour (horizon, granularité), dans l'ordre des périodes
+    __table_args__ = (
+        Index("ix_financialforecast_series", "plan_id", "horizon", "granularity", "period_index"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
-    plan_id: int = Field(foreign_key="businessplan.id", index=True)
+    plan_id: int = Field(foreign_key="businessplan.id")
+    horizon: int = 12  # horizon de la série en mois (12, 36, 60)
+    granularity: ForecastGranularity = ForecastGranularity.monthly
+    period_index: int = 0  # rang de la période dans la série (tri)
     period: str  # Format YYYY-MM or YYYY-Qn or YYYY
 
     revenue: float
@@ -49,25 +75,71 @@ class FinancialForecast(SQLModel, table=True):
     gross_margin: float
     opex: float
     ebitda: float
+    debt_service: float = 0.0
     cashflow: float
     cum_cashflow: float
 
 
-class Scenario(SQLModel, table=True):
+class KpiSnapshot(SQLModel, table=True):
+    """KPI calculés pour une version des hypothèses (empreinte) et un couple taux/horizon."""
+    __table_args__ = (
+        Index("ix_kpisnapshot_lookup", "plan_id", "assumptions_hash", "rate", "horizon", unique=True),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     plan_id: int = Field(foreign_key="businessplan.id", index=True)
+    assumptions_hash: str
+    rate: float
+    horizon: int
+    kpis: Dict[str, Optional[float]] = Field(
+        default_factory=dict,
+        sa_column=Column(JSON, nullable=False),
+        description="KPI calculés (schéma FinancialKPI)"
+    )
+    etag: str
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+class Scenario(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_scenario_plan_created", "plan_id", "created_at", "id"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    plan_id: int = Field(foreign_key="businessplan.id")
     name: str
     deltas_json: Dict[str, float] = Field(
         default_factory=dict,
         sa_column=Column(JSON, nullable=False),
         description="Modifications de scénario sous forme de dict"
     )
+    # snapshot des résultats, calculé à la création pour (horizon, rate) ;
+    # vidé quand les hypothèses de base changent (empreinte différente), recalculé à la lecture
+    horizon: int = 36
+    rate: float = 0.1
+    assumptions_hash: Optional[str] = Field(default=None, index=True)
+    kpis: Optional[Dict[str, Optional[float]]] = Field(
+        default=None,
+        sa_column=Column(JSON, nullable=True),
+        description="KPI du scénario (simulator.SENSITIVITY_KPIS)"
+    )
+    forecast: Optional[Dict[str, dict]] = Field(
+        default=None,
+        sa_column=Column(JSON, nullable=True),
+        description="Séries par granularité : {granularity: {periods: [...], <série>: [...]}}"
+    )
+    computed_at: Optional[datetime] = None
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 
 class MarketData(SQLModel, table=True):
+    # données d'un plan par date de collecte
+    __table_args__ = (
+        Index("ix_marketdata_plan_asof", "plan_id", "as_of", "id"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
-    plan_id: int = Field(foreign_key="businessplan.id", index=True)
+    plan_id: int = Field(foreign_key="businessplan.id")
     source: str
     region: str
     metric: str
@@ -77,8 +149,13 @@ class MarketData(SQLModel, table=True):
 
 
 class Advice(SQLModel, table=True):
+    # conseils d'un plan par priorité
+    __table_args__ = (
+        Index("ix_advice_plan_priority", "plan_id", "priority", "id"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
-    plan_id: int = Field(foreign_key="businessplan.id", index=True)
+    plan_id: int = Field(foreign_key="businessplan.id")
     category: str
     message: str
     priority: int
@@ -102,6 +179,11 @@ class FileAsset(SQLModel, table=True):
 
 
 class AuditLog(SQLModel, table=True):
+    # journal récent d'abord (parcours de l'index à rebours)
+    __table_args__ = (
+        Index("ix_auditlog_at", "at", "id"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     actor_id: int = Field(foreign_key="user.id", index=True)
     action: str
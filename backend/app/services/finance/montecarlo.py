@@ -0,0 +1,197 @@
+# app/services/finance/montecarlo.py
+"""
+Simulation Monte Carlo du risque de crédit d'un plan.
+
+Autour des FinancialAssumptions enregistrées, on tire n scénarios :
+- prix, coût variable, charges fixes : un facteur log-normal (moyenne 1) par scénario ;
+- volume : un facteur de niveau par scénario et un bruit mois par mois.
+Chaque scénario passe dans le moteur de prévision vectorisé (forecast.project) ; on en
+déduit les trajectoires mensuelles de DSCR (EBITDA / service de la dette) et de trésorerie
+(prêt - CAPEX + cumul des cashflows). Le DSCR n'est défini que les mois où une échéance
+est payée (hors différé total).
+
+- Le RNG est semé par SeedSequence : chaque bloc a son propre flux, le résultat ne dépend
+  donc ni de la taille du pool de process ni de l'ordre d'exécution des blocs.
+- L'évaluation par blocs borne la mémoire ; seuls des agrégats sont conservés :
+  indicateurs par scénario (vecteurs n), comptes par mois, et un échantillon de
+  trajectoires pour les bandes de percentiles mensuelles.
+"""
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.finance.forecast import ForecastDrivers, loan_payments, project
+from app.services.finance.models import FinancialAssumptions
+
+PERCENTILES = (5, 25, 50, 75, 95)
+# trajectoires gardées pour les percentiles mois par mois (échantillon uniforme)
+PATH_SAMPLE = 20_000
+
+
+@dataclass(frozen=True)
+class Volatility:
+    """Écarts-types relatifs des facteurs tirés (0.1 = ±10 % environ)."""
+    price: float = 0.10
+    volume: float = 0.20
+    volume_monthly: float = 0.10
+    variable_costs: float = 0.10
+    fixed_costs: float = 0.05
+
+
+def _lognormal(rng: np.random.Generator, sigma: float, size, dtype=np.float64) -> np.ndarray:
+    """Facteurs multiplicatifs de moyenne 1 (calcul en place : pas de temporaires)."""
+    if sigma <= 0:
+        return np.ones(size, dtype=dtype)
+    s = np.sqrt(np.log1p(sigma ** 2))
+    values = rng.standard_normal(size, dtype=dtype)
+    values *= s
+    values -= 0.5 * s * s
+    return np.exp(values, out=values)
+
+
+def _evaluate_chunk(
+    base: ForecastDrivers,
+    vol: Volatility,
+    horizon: int,
+    size: int,
+    seed: np.random.SeedSequence,
+    sample: int,
+) -> Dict[str, np.ndarray]:
+    """Tire et évalue `size` scénarios ; ne renvoie que des agrégats (picklable)."""
+    rng = np.random.default_rng(seed)
+    drivers = base.repeat(size).with_values(
+        pricing=base.pricing[0] * _lognormal(rng, vol.price, size),
+        variable_costs=base.variable_costs[0] * _lognormal(rng, vol.variable_costs, size),
+        fixed_costs=base.fixed_costs[0] * _lognormal(rng, vol.fixed_costs, size),
+        monthly_units=base.monthly_units[0] * _lognormal(rng, vol.volume, size),
+    )
+    # bruit mensuel en float32 : c'est le plus gros tirage (size x horizon)
+    shocks = _lognormal(rng, vol.volume_monthly, (size, horizon), dtype=np.float32)
+    series = project(drivers, horizon, volume_shocks=shocks)
+
+    # le prêt n'est pas tiré : mêmes mois d'échéance pour tous les scénarios
+    paying = _paying_months(base, horizon)
+    dscr = series["ebitda"][:, paying] / series["debt_service"][:, paying]
+    cash = series["cum_cashflow"]
+    cash += drivers.principal[:, None]
+
+    dscr_breach = dscr < 1.0
+    negative_cash = cash < 0
+    return {
+        # indicateurs par scénario
+        "dscr_min": dscr.min(axis=1, initial=np.inf),
+        "dscr_avg": dscr.mean(axis=1) if paying.size else np.full(size, np.nan),
+        "cash_min": cash.min(axis=1),
+        "cash_final": cash[:, -1],
+        "any_dscr_breach": dscr_breach.any(axis=1),
+        "any_negative_cash": negative_cash.any(axis=1),
+        # comptes par mois (exacts, sommés entre blocs)
+        "dscr_breach_by_month": dscr_breach.sum(axis=0),
+        "negative_cash_by_month": negative_cash.sum(axis=0),
+        # échantillon de trajectoires (les tirages étant i.i.d., les premières suffisent)
+        "dscr_paths": dscr[:sample].astype(np.float32),
+        "cash_paths": cash[:sample].astype(np.float32),
+    }
+
+
+def _paying_months(base: ForecastDrivers, horizon: int) -> np.ndarray:
+    """Indices des mois avec une échéance décaissée (DSCR défini)."""
+    return np.flatnonzero(loan_payments(base, horizon)[0] > 0)
+
+
+def _percentiles(values: np.ndarray, axis: Optional[int] = None) -> Dict[str, object]:
+    finite = values if axis is not None else values[np.isfinite(values)]
+    if finite.size == 0:
+        return {f"p{p}": None for p in PERCENTILES}
+    result = np.percentile(finite, PERCENTILES, axis=axis)
+    return {
+        f"p{p}": (np.round(r, 4).tolist() if axis is not None else round(float(r), 4))
+        for p, r in zip(PERCENTILES, result)
+    }
+
+
+def _chunk_sizes(draws: int, chunk_size: int) -> List[int]:
+    full, rest = divmod(draws, chunk_size)
+    return [chunk_size] * full + ([rest] if rest else [])
+
+
+def run_montecarlo(
+    assumptions: FinancialAssumptions,
+    draws: int = 10_000,
+    horizon: int = 36,
+    seed: Optional[int] = None,
+    volatility: Volatility = Volatility(),
+    chunk_size: Optional[int] = None,
+    workers: Optional[int] = None,
+) -> Dict[str, object]:
+    """
+    Lance la simulation et renvoie percentiles et probabilités de défaut.
+    workers > 1 : blocs répartis sur un pool de process (gros volumes uniquement).
+    """
+    if draws <= 0:
+        raise ValueError("Le nombre de tirages doit être strictement positif")
+    started = time.perf_counter()
+    base = ForecastDrivers.from_assumptions(assumptions)
+    chunk_size = max(1, chunk_size or settings.MONTECARLO_CHUNK_SIZE)
+    sizes = _chunk_sizes(draws, chunk_size)
+
+    seed_seq = np.random.SeedSequence(seed)
+    children = seed_seq.spawn(len(sizes))
+    # part de l'échantillon de trajectoires fournie par chaque bloc
+    samples = [int(np.ceil(PATH_SAMPLE * size / draws)) for size in sizes]
+    args = [(base, volatility, horizon, size, child, sample) for size, child, sample in zip(sizes, children, samples)]
+
+    workers = workers or settings.MONTECARLO_WORKERS
+    if workers > 1 and len(sizes) > 1 and draws >= settings.MONTECARLO_POOL_MIN_DRAWS:
+        with ProcessPoolExecutor(max_workers=min(workers, len(sizes))) as pool:
+            chunks = list(pool.map(_evaluate_chunk, *zip(*args)))
+    else:
+        workers = 1
+        chunks = [_evaluate_chunk(*a) for a in args]
+
+    def cat(name: str) -> np.ndarray:
+        return np.concatenate([c[name] for c in chunks])
+
+    def total(name: str) -> np.ndarray:
+        return np.sum([c[name] for c in chunks], axis=0)
+
+    # DSCR mensuel défini seulement les mois d'échéance (dscr_months, numérotés à partir de 1)
+    dscr_paths = np.concatenate([c["dscr_paths"] for c in chunks])
+    cash_paths = np.concatenate([c["cash_paths"] for c in chunks])
+
+    # scénario central (sans aléa) pour comparaison
+    central = _evaluate_chunk(base, Volatility(0, 0, 0, 0, 0), horizon, 1, np.random.SeedSequence(0), 1)
+
+    return {
+        "draws": draws,
+        "seed": seed_seq.entropy,
+        "horizon": horizon,
+        "chunk_size": chunk_size,
+        "workers": workers,
+        "prob_dscr_below_1": round(float(cat("any_dscr_breach").mean()), 6),
+        "prob_negative_cash": round(float(cat("any_negative_cash").mean()), 6),
+        "dscr_min": _percentiles(cat("dscr_min")),
+        "dscr_avg": _percentiles(cat("dscr_avg")),
+        "cash_min": _percentiles(cat("cash_min")),
+        "cash_final": _percentiles(cat("cash_final")),
+        "deterministic": {
+            "dscr_min": _finite_or_none(central["dscr_min"][0]),
+            "cash_min": round(float(central["cash_min"][0]), 2),
+        },
+        "monthly": {
+            "dscr_months": (_paying_months(base, horizon) + 1).tolist(),
+            "prob_dscr_below_1": np.round(total("dscr_breach_by_month") / draws, 6).tolist(),
+            "prob_negative_cash": np.round(total("negative_cash_by_month") / draws, 6).tolist(),
+            "dscr": _percentiles(dscr_paths, axis=0),
+            "cash": _percentiles(cash_paths, axis=0),
+        },
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+def _finite_or_none(value: float) -> Optional[float]:
+    return round(float(value), 4) if np.isfinite(value) else None
@@ -0,0 +1,268 @@
+# app/services/finance/portfolio.py
+"""
+Analyses de portefeuille (tous les plans) pour les analystes.
+
+- Ce que SQL sait agréger (nombre de plans, montants demandés, moyennes des hypothèses)
+  est calculé par GROUP BY, sans charger les lignes.
+- Les KPI dérivés de la prévision (marges, DSCR, NPV, IRR, point mort) sont calculés
+  en colonnes : une seule requête FinancialAssumptions x BusinessPlan, lue par blocs,
+  chaque bloc devenant un ForecastDrivers (n,) évalué en une passe (simulator.kpi_arrays).
+- Les distributions (percentiles) par secteur / ville / statut sont calculées sur ces
+  colonnes ; les lignes par plan peuvent être diffusées en CSV ou NDJSON.
+"""
+import csv
+import io
+import json
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import func
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.db.models import BusinessPlan
+from app.services.finance.amortization import GRACE_CODES, REPAYMENT_CODES
+from app.services.finance.forecast import DEFAULT_MONTHLY_UNITS, ForecastDrivers, _monthly_profile
+from app.services.finance.models import FinancialAssumptions, GraceType, RepaymentType
+from app.services.finance.simulator import kpi_arrays
+
+GROUP_BY = {
+    "sector": BusinessPlan.sector,
+    "city": BusinessPlan.city,
+    "status": BusinessPlan.status,
+}
+PORTFOLIO_KPIS = (
+    "revenue", "gross_margin_pct", "ebitda_margin_pct", "dscr", "dscr_min", "npv", "irr",
+    "breakeven_month", "break_even_units",
+)
+PERCENTILES = (10, 25, 50, 75, 90)
+PLAN_COLUMNS = ("plan_id", "title", "sector", "city", "status", "requested_amount_fcfa")
+
+_FA = FinancialAssumptions
+_LOAD_COLUMNS = (
+    BusinessPlan.id, BusinessPlan.title, BusinessPlan.sector, BusinessPlan.city, BusinessPlan.status,
+    BusinessPlan.requested_amount_fcfa,
+    _FA.pricing, _FA.variable_costs, _FA.fixed_costs, _FA.salaries, _FA.taxes, _FA.capex,
+    _FA.loan_amount, _FA.loan_rate, _FA.loan_duration, _FA.grace_months, _FA.repayment_type, _FA.grace_type,
+    _FA.monthly_units, _FA.seasonality, _FA.growth_rates,
+)
+
+
+def _filtered(query, sector: Optional[str], city: Optional[str], status: Optional[str]):
+    if sector:
+        query = query.where(BusinessPlan.sector == sector)
+    if city:
+        query = query.where(BusinessPlan.city == city)
+    if status:
+        query = query.where(BusinessPlan.status == status)
+    return query
+
+
+def sql_aggregates(
+    db: Session,
+    group_by: str,
+    sector: Optional[str] = None,
+    city: Optional[str] = None,
+    status: Optional[str] = None,
+) -> Dict[str, Dict[str, Optional[float]]]:
+    """Agrégats calculés par la base, par groupe (plans avec ou sans hypothèses)."""
+    key = GROUP_BY[group_by]
+    query = _filtered(
+        select(
+            key,
+            func.count(BusinessPlan.id),
+            func.count(_FA.id),
+            func.sum(BusinessPlan.requested_amount_fcfa),
+            func.avg(BusinessPlan.requested_amount_fcfa),
+            func.avg(_FA.capex),
+            func.avg(_FA.pricing),
+            func.avg(_FA.loan_rate),
+            func.avg(_FA.loan_duration),
+        ).select_from(BusinessPlan).outerjoin(_FA, _FA.plan_id == BusinessPlan.id),
+        sector, city, status,
+    ).group_by(key)
+
+    result = {}
+    for group, plans, with_assumptions, amount_sum, amount_avg, capex, pricing, rate, duration in db.exec(query):
+        result[group or ""] = {
+            "plans": plans,
+            "plans_with_assumptions": with_assumptions,
+            "requested_amount_total": _num(amount_sum),
+            "requested_amount_avg": _num(amount_avg),
+            "capex_avg": _num(capex),
+            "pricing_avg": _num(pricing),
+            "loan_rate_avg": _num(rate),
+            "loan_duration_avg": _num(duration),
+        }
+    return result
+
+
+def _num(value) -> Optional[float]:
+    return None if value is None else round(float(value), 4)
+
+
+def _drivers(rows: List[tuple]) -> ForecastDrivers:
+    """ForecastDrivers (n,) construit colonne par colonne à partir des lignes de la requête."""
+    columns = list(zip(*rows))
+
+    def vec(i: int) -> np.ndarray:
+        return np.array([float(v or 0.0) for v in columns[i]])
+
+    capex = vec(11)
+    loan_amount = np.array([np.nan if v is None else float(v) for v in columns[12]])
+    return ForecastDrivers(
+        pricing=vec(6),
+        variable_costs=vec(7),
+        fixed_costs=vec(8) + vec(9) + vec(10),
+        capex=capex,
+        principal=np.where(np.isnan(loan_amount), capex, loan_amount),
+        loan_rate=vec(13),
+        loan_duration=np.maximum(np.array([int(v or 0) for v in columns[14]]), 1),
+        grace_months=np.array([int(v or 0) for v in columns[15]]),
+        repayment_type=np.array([REPAYMENT_CODES[RepaymentType(v or "annuity")] for v in columns[16]]),
+        grace_type=np.array([GRACE_CODES[GraceType(v or "partial")] for v in columns[17]]),
+        monthly_units=np.array([float(v or DEFAULT_MONTHLY_UNITS) for v in columns[18]]),
+        seasonality=np.stack([_monthly_profile(v, 1.0) for v in columns[19]]),
+        growth_rates=np.stack([_monthly_profile(v, 0.0) for v in columns[20]]),
+    )
+
+
+def iter_plan_kpis(
+    db: Session,
+    horizon: int = 12,
+    rate: float = 0.1,
+    sector: Optional[str] = None,
+    city: Optional[str] = None,
+    status: Optional[str] = None,
+    chunk_size: Optional[int] = None,
+) -> Iterator[Tuple[Dict[str, list], Dict[str, np.ndarray]]]:
+    """
+    Une requête, lue par blocs : (colonnes du plan, KPI (n,)) pour chaque bloc.
+    Mémoire bornée par la taille du bloc, quel que soit le nombre de plans.
+    """
+    query = _filtered(
+        select(*_LOAD_COLUMNS).join(_FA, _FA.plan_id == BusinessPlan.id),
+        sector, city, status,
+    ).order_by(BusinessPlan.id)
+    result = db.exec(query.execution_options(yield_per=chunk_size or settings.PORTFOLIO_CHUNK_SIZE))
+    for rows in result.partitions():
+        if not rows:
+            continue
+        drivers = _drivers(rows)
+        kpis = kpi_arrays(drivers, horizon, rate)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            kpis["break_even_units"] = drivers.fixed_costs / np.maximum(drivers.pricing - drivers.variable_costs, 1e-6)
+        plans = {name: [row[i] for row in rows] for i, name in enumerate(PLAN_COLUMNS)}
+        yield plans, kpis
+
+
+def _distribution(values: np.ndarray) -> Dict[str, Optional[float]]:
+    finite = values[np.isfinite(values)]
+    if finite.size == 0:
+        return {"count": 0, "mean": None, **{f"p{p}": None for p in PERCENTILES}}
+    quantiles = np.percentile(finite, PERCENTILES)
+    return {
+        "count": int(finite.size),
+        "mean": round(float(finite.mean()), 4),
+        **{f"p{p}": round(float(q), 4) for p, q in zip(PERCENTILES, quantiles)},
+    }
+
+
+def portfolio_summary(
+    db: Session,
+    group_by: str = "sector",
+    horizon: int = 12,
+    rate: float = 0.1,
+    sector: Optional[str] = None,
+    city: Optional[str] = None,
+    status: Optional[str] = None,
+) -> List[Dict[str, object]]:
+    """Par groupe : agrégats SQL et distribution de chaque KPI (plans avec hypothèses)."""
+    aggregates = sql_aggregates(db, group_by, sector, city, status)
+
+    groups: List[str] = []
+    columns: Dict[str, List[np.ndarray]] = {name: [] for name in PORTFOLIO_KPIS}
+    for plans, kpis in iter_plan_kpis(db, horizon, rate, sector, city, status):
+        groups.extend(g or "" for g in plans[group_by])
+        for name in PORTFOLIO_KPIS:
+            columns[name].append(kpis[name])
+
+    summary = []
+    if groups:
+        labels, inverse = np.unique(np.array(groups, dtype=object).astype(str), return_inverse=True)
+        order = np.argsort(inverse, kind="stable")
+        bounds = np.searchsorted(inverse[order], np.arange(len(labels) + 1))
+        values = {name: np.concatenate(parts)[order] for name, parts in columns.items()}
+        distributions = {
+            label: {name: _distribution(values[name][bounds[i]:bounds[i + 1]]) for name in PORTFOLIO_KPIS}
+            for i, label in enumerate(labels)
+        }
+    else:
+        distributions = {}
+
+    for label in sorted(set(aggregates) | set(distributions)):
+        summary.append({
+            group_by: label,
+            **aggregates.get(label, {}),
+            "kpis": distributions.get(label, {}),
+        })
+    return summary
+
+
+def _plan_records(chunks) -> Iterator[Dict[str, object]]:
+    for plans, kpis in chunks:
+        rounded = {name: np.round(kpis[name], 4).tolist() for name in PORTFOLIO_KPIS}
+        finite = {name: np.isfinite(kpis[name]).tolist() for name in PORTFOLIO_KPIS}
+        for i in range(len(plans["plan_id"])):
+            record = {name: plans[name][i] for name in PLAN_COLUMNS}
+            for name in PORTFOLIO_KPIS:
+                record[name] = rounded[name][i] if finite[name][i] else None
+            yield record
+
+
+def ndjson_lines(records: Iterator[Dict[str, object]], batch: int = 500) -> Iterator[str]:
+    buffer: List[str] = []
+    for record in records:
+        buffer.append(json.dumps(record, ensure_ascii=False))
+        if len(buffer) >= batch:
+            yield "\n".join(buffer) + "\n"
+            buffer = []
+    if buffer:
+        yield "\n".join(buffer) + "\n"
+
+
+def csv_lines(records: Iterator[Dict[str, object]], fieldnames: List[str], batch: int = 500) -> Iterator[str]:
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=fieldnames, extrasaction="ignore")
+    writer.writeheader()
+    for i, record in enumerate(records, start=1):
+        writer.writerow(record)
+        if i % batch == 0:
+            yield out.getvalue()
+            out.seek(0)
+            out.truncate()
+    yield out.getvalue()
+
+
+def plan_records(db: Session, horizon: int = 12, rate: float = 0.1, **filters) -> Iterator[Dict[str, object]]:
+    """Une ligne par plan (colonnes du plan + KPI), produite bloc par bloc."""
+    return _plan_records(iter_plan_kpis(db, horizon, rate, **filters))
+
+
+def flatten_summary(summary: List[Dict[str, object]]) -> Iterator[Dict[str, object]]:
+    """Résumé à plat (une colonne par KPI et statistique) pour l'export CSV."""
+    for group in summary:
+        row = {k: v for k, v in group.items() if k != "kpis"}
+        for name, stats in group["kpis"].items():
+            for stat, value in stats.items():
+                row[f"{name}_{stat}"] = value
+        yield row
+
+
+def summary_fieldnames(group_by: str) -> List[str]:
+    base = [
+        group_by, "plans", "plans_with_assumptions", "requested_amount_total", "requested_amount_avg",
+        "capex_avg", "pricing_avg", "loan_rate_avg", "loan_duration_avg",
+    ]
+    stats = ["count", "mean"] + [f"p{p}" for p in PERCENTILES]
+    return base + [f"{name}_{stat}" for name in PORTFOLIO_KPIS for stat in stats]
@@ -0,0 +1,116 @@
+# app/services/finance/scenarios.py
+"""
+Snapshots des scénarios enregistrés : KPI et séries prévisionnelles calculés à la
+création (pour l'horizon et le taux du scénario) et stockés sur la ligne Scenario.
+
+- La liste et la comparaison des scénarios lisent ces snapshots, sans recalcul.
+- Un snapshot est lié à l'empreinte des hypothèses de base (kpi_cache.assumptions_hash) :
+  quand elles changent, les snapshots du plan sont vidés (invalidate_scenarios) puis
+  recalculés à la lecture suivante, tous les scénarios périmés en une passe vectorielle.
+"""
+from collections import defaultdict
+from datetime import date, datetime, timezone
+from typing import Dict, List, Sequence, Tuple
+
+from sqlalchemy import or_, update
+from sqlmodel import Session, select
+
+from app.services.finance.forecast import SERIES, project, rollup
+from app.services.finance.models import FinancialAssumptions, ForecastGranularity, Scenario
+from app.services.finance.simulator import SENSITIVITY_KPIS, _jsonable, kpi_arrays, scenario_drivers
+
+SCENARIO_KPIS = SENSITIVITY_KPIS
+
+
+def compute_snapshots(
+    assumptions: FinancialAssumptions,
+    deltas: Sequence[Dict[str, str]],
+    horizon: int = 36,
+    rate: float = 0.1,
+) -> List[Tuple[Dict[str, object], Dict[str, dict]]]:
+    """(KPI, séries par granularité) de chaque jeu de deltas, en une projection."""
+    drivers = scenario_drivers(assumptions, deltas)
+    series = project(drivers, horizon)
+    kpis = {name: _jsonable(values) for name, values in kpi_arrays(drivers, horizon, rate, series=series).items()}
+
+    start = assumptions.start_date or date.today()
+    forecasts: List[Dict[str, dict]] = [{} for _ in deltas]
+    for granularity in ForecastGranularity:
+        labels, grouped = rollup(series, start, granularity)
+        columns = {name: grouped[name].round(2).tolist() for name in SERIES}
+        for i, forecast in enumerate(forecasts):
+            forecast[granularity.value] = {"periods": labels, **{name: columns[name][i] for name in SERIES}}
+
+    return [({name: kpis[name][i] for name in SCENARIO_KPIS}, forecasts[i]) for i in range(len(deltas))]
+
+
+def store_snapshots(
+    assumptions: FinancialAssumptions, digest: str, scenarios: Sequence[Scenario]
+) -> List[Scenario]:
+    """Calcule et assigne les snapshots (un calcul par couple horizon/taux), sans commit."""
+    groups: Dict[Tuple[int, float], List[Scenario]] = defaultdict(list)
+    for scenario in scenarios:
+        groups[(scenario.horizon, scenario.rate)].append(scenario)
+
+    now = datetime.now(timezone.utc)
+    for (horizon, rate), members in groups.items():
+        snapshots = compute_snapshots(assumptions, [s.deltas_json or {} for s in members], horizon, rate)
+        for scenario, (kpis, forecast) in zip(members, snapshots):
+            scenario.kpis = kpis
+            scenario.forecast = forecast
+            scenario.assumptions_hash = digest
+            scenario.computed_at = now
+    return list(scenarios)
+
+
+def invalidate_scenarios(db: Session, plan_id: int, digest: str) -> None:
+    """Vide les snapshots calculés sur d'autres hypothèses que `digest` (sans commit)."""
+    db.exec(
+        update(Scenario)
+        .where(Scenario.plan_id == plan_id, or_(Scenario.assumptions_hash != digest, Scenario.assumptions_hash.is_(None)))
+        .values(kpis=None, forecast=None, assumptions_hash=None, computed_at=None)
+    )
+
+
+def current_scenarios(
+    db: Session, assumptions: FinancialAssumptions, digest: str, ids: Sequence[int] = ()
+) -> List[Scenario]:
+    """
+    Scénarios du plan (tous ou `ids`, dans cet ordre) avec des snapshots à jour ;
+    seuls les snapshots périmés sont recalculés (et enregistrés).
+    """
+    query = select(Scenario).where(Scenario.plan_id == assumptions.plan_id)
+    if ids:
+        query = query.where(Scenario.id.in_(ids))
+    scenarios = list(db.exec(query.order_by(Scenario.created_at, Scenario.id)))
+    if ids:
+        position = {scenario_id: i for i, scenario_id in enumerate(ids)}
+        scenarios.sort(key=lambda s: position[s.id])
+
+    # computed_at vide : snapshot invalidé, ou scénario antérieur aux snapshots
+    stale = [s for s in scenarios if s.assumptions_hash != digest or s.kpis is None or s.computed_at is None]
+    if stale:
+        for scenario in store_snapshots(assumptions, digest, stale):
+            db.add(scenario)
+        db.commit()
+    return scenarios
+
+
+def comparison(scenarios: Sequence[Scenario], granularity: ForecastGranularity) -> Dict[str, object]:
+    """Vue côte à côte : un tableau par KPI (ordre des scénarios) et les séries de chacun."""
+    return {
+        "scenario_ids": [s.id for s in scenarios],
+        "kpis": {name: [s.kpis.get(name) for s in scenarios] for name in SCENARIO_KPIS},
+        "scenarios": [
+            {
+                "id": s.id,
+                "name": s.name,
+                "deltas": s.deltas_json,
+                "horizon": s.horizon,
+                "rate": s.rate,
+                "kpis": s.kpis,
+                "forecast": (s.forecast or {}).get(granularity.value),
+            }
+            for s in scenarios
+        ],
+    }
@@ -1,7 +1,28 @@
 # app/services/finance/simulator.py
-from typing import Dict, List
+import time
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.services.finance.calculators import irr_batch, npv_batch
+from app.services.finance.forecast import ForecastDrivers, monthly_rate, project
 from app.services.finance.models import FinancialAssumptions
-import copy
+
+# drivers modifiables par un scénario ou une analyse de sensibilité
+DRIVERS = (
+    "pricing", "variable_costs", "fixed_costs", "salaries", "taxes", "capex", "loan_rate", "monthly_units",
+)
+SENSITIVITY_KPIS = (
+    "revenue", "gross_margin_pct", "ebitda_margin_pct", "dscr", "dscr_min", "npv", "irr", "breakeven_month",
+)
+DEFAULT_TORNADO_DELTAS = ("-10%", "+10%")
+
+# scénarios par défaut de prompts/sensitivity.txt
+DEFAULT_SCENARIOS: Dict[str, Dict[str, str]] = {
+    "stress": {"monthly_units": "-10%", "pricing": "-5%", "variable_costs": "+5%", "fixed_costs": "+10%"},
+    "base": {},
+    "optimistic": {"monthly_units": "+10%", "pricing": "+5%", "variable_costs": "-5%"},
+}
 
 
 def apply_delta(value: float, delta_str: str) -> float:
@@ -18,19 +39,191 @@ def simulate_financials(
     assumptions: FinancialAssumptions,
     deltas: Dict[str, str]
 ) -> FinancialAssumptions:
-    modified = copy.deepcopy(assumptions)
-
-    if "pricing" in deltas:
-        modified.pricing = apply_delta(modified.pricing, deltas["pricing"])
-    if "variable_costs" in deltas:
-        modified.variable_costs = apply_delta(modified.variable_costs, deltas["variable_costs"])
-    if "fixed_costs" in deltas:
-        modified.fixed_costs = apply_delta(modified.fixed_costs, deltas["fixed_costs"])
-    if "salaries" in deltas:
-        modified.salaries = apply_delta(modified.salaries, deltas["salaries"])
-    if "taxes" in deltas:
-        modified.taxes = apply_delta(modified.taxes, deltas["taxes"])
-    if "capex" in deltas:
-        modified.capex = apply_delta(modified.capex, deltas["capex"])
-
-    return modified
+    # copie transitoire (hors session) : pas de deepcopy de l'état SQLAlchemy
+    values = assumptions.model_dump(exclude={"id", "assumptions_hash"})
+    for name in DRIVERS:
+        if name in deltas:
+            values[name] = apply_delta(values.get(name) or 0.0, deltas[name])
+
+    return FinancialAssumptions(**values)
+
+
+def _base_values(assumptions: FinancialAssumptions) -> Dict[str, float]:
+    values = {name: float(getattr(assumptions, name, 0.0) or 0.0) for name in DRIVERS}
+    if not values["monthly_units"]:
+        values["monthly_units"] = float(ForecastDrivers.from_assumptions(assumptions).monthly_units[0])
+    return values
+
+
+def _drivers_for(assumptions: FinancialAssumptions, values: Dict[str, np.ndarray]) -> ForecastDrivers:
+    """Drivers (n,) à partir de valeurs vectorielles pour chaque driver de DRIVERS."""
+    n = len(next(iter(values.values())))
+    drivers = ForecastDrivers.from_assumptions(assumptions).repeat(n).with_values(
+        pricing=values["pricing"],
+        variable_costs=values["variable_costs"],
+        fixed_costs=values["fixed_costs"] + values["salaries"] + values["taxes"],
+        capex=values["capex"],
+        loan_rate=values["loan_rate"],
+        monthly_units=values["monthly_units"],
+    )
+    # sans montant d'emprunt explicite, le prêt finance le CAPEX (et suit ses variations)
+    if getattr(assumptions, "loan_amount", None) is None:
+        drivers = drivers.with_values(principal=values["capex"])
+    return drivers
+
+
+def kpi_arrays(
+    drivers: ForecastDrivers, horizon: int = 12, rate: float = 0.1, series: Optional[Dict[str, np.ndarray]] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    KPI (n,) de chaque jeu d'hypothèses, calculés sur la série prévisionnelle en une passe.
+    series : projection déjà calculée de `drivers` sur `horizon` mois (sinon project()).
+    """
+    if series is None:
+        series = project(drivers, horizon)
+    revenue = series["revenue"].sum(axis=1)
+    cogs = series["cogs"].sum(axis=1)
+    ebitda = series["ebitda"].sum(axis=1)
+    debt = series["debt_service"].sum(axis=1)
+
+    # DSCR mensuel minimum, sur les mois de remboursement uniquement
+    in_loan = series["debt_service"] > 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        monthly_dscr = np.where(in_loan, series["ebitda"] / np.where(in_loan, series["debt_service"], 1.0), np.inf)
+        safe_revenue = np.where(revenue != 0, revenue, 1.0)
+        kpis = {
+            "revenue": revenue,
+            "gross_margin_pct": np.where(revenue != 0, 100.0 * (revenue - cogs) / safe_revenue, 0.0),
+            "ebitda_margin_pct": np.where(revenue != 0, 100.0 * ebitda / safe_revenue, 0.0),
+            "dscr": np.where(debt != 0, ebitda / np.where(debt != 0, debt, 1.0), 0.0),
+            "dscr_min": np.where(in_loan.any(axis=1), monthly_dscr.min(axis=1), np.nan),
+        }
+
+    # NPV / IRR (mensuel) des flux [-CAPEX, cashflows], comme le calcul des KPI d'un plan
+    flows = np.column_stack([-drivers.capex, series["cashflow"]])
+    kpis["npv"] = npv_batch(monthly_rate(rate), flows)
+    kpis["irr"] = irr_batch(flows)[0]
+
+    # mois du point mort de trésorerie (1er mois où le cumul redevient positif)
+    positive = series["cum_cashflow"] >= 0
+    kpis["breakeven_month"] = np.where(positive.any(axis=1), positive.argmax(axis=1) + 1.0, np.nan)
+    return kpis
+
+
+def _jsonable(values: np.ndarray) -> List[Optional[float]]:
+    out = np.round(values, 4).tolist()
+    for i in np.flatnonzero(~np.isfinite(values)):
+        out[i] = None
+    return out
+
+
+def _parse_grid(base: Dict[str, float], grid: Dict[str, Sequence[str]]) -> Dict[str, np.ndarray]:
+    unknown = set(grid) - set(DRIVERS)
+    if unknown:
+        raise ValueError(f"Drivers inconnus: {', '.join(sorted(unknown))}")
+    return {
+        name: np.array([apply_delta(base[name], str(d)) for d in deltas], dtype=float)
+        for name, deltas in grid.items() if deltas
+    }
+
+
+def sensitivity_grid(
+    assumptions: FinancialAssumptions,
+    grid: Dict[str, Sequence[str]],
+    horizon: int = 12,
+    rate: float = 0.1,
+    tornado_kpi: str = "npv",
+    max_combinations: Optional[int] = None,
+) -> Dict[str, object]:
+    """
+    Évalue toutes les combinaisons de la grille (produit cartésien des deltas par driver)
+    en une passe vectorielle, puis classe les drivers par impact (tornado) sur `tornado_kpi`.
+    """
+    if tornado_kpi not in SENSITIVITY_KPIS:
+        raise ValueError(f"KPI inconnu: {tornado_kpi}")
+    started = time.perf_counter()
+    base = _base_values(assumptions)
+    axes = _parse_grid(base, grid)
+
+    shape = [len(v) for v in axes.values()]
+    combinations = int(np.prod(shape)) if shape else 1
+    if max_combinations is not None and combinations > max_combinations:
+        raise ValueError(f"Grille trop grande: {combinations} combinaisons (max {max_combinations})")
+
+    # produit cartésien : une colonne (combinations,) par driver, ordre C (dernier axe le plus rapide)
+    mesh = np.meshgrid(*axes.values(), indexing="ij") if axes else []
+    values = {name: np.full(combinations, base[name]) for name in DRIVERS}
+    for name, column in zip(axes, mesh):
+        values[name] = column.ravel()
+    surface = kpi_arrays(_drivers_for(assumptions, values), horizon, rate)
+
+    # tornado : un driver à la fois, les autres à leur valeur de base (une seule passe aussi)
+    tornado_axes = axes or _parse_grid(base, {name: DEFAULT_TORNADO_DELTAS for name in DRIVERS})
+    sizes = [len(v) for v in tornado_axes.values()]
+    one_at_a_time = {name: np.full(sum(sizes) + 1, base[name]) for name in DRIVERS}
+    offset = 1  # ligne 0 : scénario de base
+    for name, column in tornado_axes.items():
+        one_at_a_time[name][offset:offset + len(column)] = column
+        offset += len(column)
+    single = kpi_arrays(_drivers_for(assumptions, one_at_a_time), horizon, rate)
+    target = single[tornado_kpi]
+
+    tornado = []
+    offset = 1
+    for name, column in tornado_axes.items():
+        results = target[offset:offset + len(column)]
+        offset += len(column)
+        finite = np.where(np.isfinite(results), results, np.nan)
+        if np.isnan(finite).all():
+            swing, low, high = 0.0, None, None
+        else:
+            low_i, high_i = int(np.nanargmin(finite)), int(np.nanargmax(finite))
+            swing = float(finite[high_i] - finite[low_i])
+            low = {"value": round(float(column[low_i]), 4), "kpi": round(float(finite[low_i]), 4)}
+            high = {"value": round(float(column[high_i]), 4), "kpi": round(float(finite[high_i]), 4)}
+        tornado.append({"driver": name, "low": low, "high": high, "swing": round(swing, 4)})
+    tornado.sort(key=lambda item: item["swing"], reverse=True)
+
+    return {
+        "horizon": horizon,
+        "rate": rate,
+        "base": {name: _jsonable(column[:1])[0] for name, column in single.items()},
+        "axes": {
+            name: {"deltas": list(grid[name]), "values": np.round(column, 4).tolist()}
+            for name, column in axes.items()
+        },
+        "shape": shape,
+        "combinations": combinations,
+        "surface": {name: _jsonable(column) for name, column in surface.items()},
+        "tornado_kpi": tornado_kpi,
+        "tornado": tornado,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+def scenario_drivers(assumptions: FinancialAssumptions, deltas: Sequence[Dict[str, str]]) -> ForecastDrivers:
+    """Drivers (n,) : un jeu de deltas par ligne (les clés hors DRIVERS sont ignorées)."""
+    base = _base_values(assumptions)
+    values = {
+        driver: np.array([apply_delta(base[driver], str(d[driver])) if driver in d else base[driver] for d in deltas])
+        for driver in DRIVERS
+    }
+    return _drivers_for(assumptions, values)
+
+
+def scenario_kpis(
+    assumptions: FinancialAssumptions,
+    scenarios: Dict[str, Dict[str, str]] = DEFAULT_SCENARIOS,
+    horizon: int = 12,
+    rate: float = 0.1,
+) -> Dict[str, Dict[str, object]]:
+    """KPI exacts de quelques scénarios nommés (deltas par driver), en une passe."""
+    names = list(scenarios)
+    kpis = kpi_arrays(scenario_drivers(assumptions, [scenarios[s] for s in names]), horizon, rate)
+    return {
+        name: {
+            "assumptions_delta": scenarios[name],
+            **{kpi: _jsonable(kpis[kpi][i:i + 1])[0] for kpi in SENSITIVITY_KPIS},
+        }
+        for i, name in enumerate(names)
+    }
@@ -2,12 +2,18 @@
 import asyncio
 import json
 from datetime import datetime
-from typing import AsyncGenerator, Dict, List
+from typing import Any, AsyncGenerator, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
 
+from sqlalchemy.exc import IntegrityError
 from sqlmodel import Session, select
 
+from app.core.config import settings
 from app.db.models import BusinessPlan, PlanSection, PlanSectionType
-from app.llm.chains import get_llm_chain
+from app.llm.chains import get_llm_runnable
+from app.llm.services_llm import ainvoke_chain, astream_chain, chain_prompt
+from app.llm.telemetry import llm_scope
+from app.services.search import index_section
+from app.services.section_versions import add_version, current_sections
 
 try:
     from app.services.finance.models import FinancialAssumptions, MarketData
@@ -25,25 +31,41 @@ SECTIONS_ORDER = [
     PlanSectionType.finance,
 ]
 
+# Sections qui ne dépendent que du contexte du plan : générées en parallèle
+INDEPENDENT_SECTIONS = [
+    PlanSectionType.activity,
+    PlanSectionType.market,
+    PlanSectionType.marketing,
+    PlanSectionType.ops,
+    PlanSectionType.hr,
+    PlanSectionType.finance,
+]
+
+# Le résumé exécutif synthétise le reste du plan : il part en dernier
+SECTION_DEPENDENCIES: Dict[PlanSectionType, Tuple[PlanSectionType, ...]] = {
+    PlanSectionType.exec_summary: tuple(INDEPENDENT_SECTIONS),
+}
+
+_END = object()  # fin du flux d'événements de génération
+
+SAVE_SECTION_ATTEMPTS = 3
+
+# Rappel après l'enregistrement d'une section (ex. suivi d'avancement d'un job)
+SectionSavedHook = Callable[[PlanSectionType, PlanSection], Awaitable[None]]
+
 def _sanitize_var(var: str) -> str:
     return var.strip().strip('"').strip("'").replace("\n", "").replace("\r", "").strip()
 
 def _existing_sections(db: Session, plan_id: int) -> List[PlanSection]:
-    """Retourne les sections déjà générées pour un plan, triées par generated_at asc."""
-    rows = db.exec(select(PlanSection).where(PlanSection.plan_id == plan_id)).all() or []
-    rows.sort(key=lambda r: (r.generated_at or datetime.min))
-    return rows
-
-def _existing_sections_md(db: Session, plan_id: int) -> str:
-    """Concatène toutes les sections déjà générées en un seul Markdown (pour raw_md)."""
-    parts: List[str] = []
-    for s in _existing_sections(db, plan_id):
-        title = getattr(s.section_type, "value", str(s.section_type)).replace("_", " ").title()
-        content = s.content_md or ""
-        parts.append(f"# {title}\n\n{content}\n")
-    return "\n".join(parts).strip()
-
-def _build_context(db: Session, plan: BusinessPlan) -> Dict[str, str]:
+    """Retourne la version courante des sections déjà générées, dans l'ordre du plan."""
+    return current_sections(db, plan_id)
+
+def _section_md(section_type: PlanSectionType, content: str) -> str:
+    title = getattr(section_type, "value", str(section_type)).replace("_", " ").title()
+    return f"# {title}\n\n{content or ''}\n"
+
+def _context_from_rows(plan: BusinessPlan, fa, market_rows: List) -> Dict[str, str]:
+    """Variables de prompt dérivées du plan, de ses hypothèses et de ses données marché."""
     ctx: Dict[str, str] = {
         # communs
         "sector": plan.sector or "",
@@ -70,151 +92,374 @@ def _build_context(db: Session, plan: BusinessPlan) -> Dict[str, str]:
         "known_prices_json": json.dumps([]),
         "historical_tx_json": json.dumps([]),
         "loan_params_json": json.dumps({}),
+        "sensitivity_json": json.dumps({}),
     }
 
     # Enrichissement via FinancialAssumptions si présent
-    if FinancialAssumptions is not None:
+    if fa:
+        fixed_costs = float(getattr(fa, "fixed_costs", 0) or 0)
+        variable_costs = float(getattr(fa, "variable_costs", 0) or 0)
+        pricing = float(getattr(fa, "pricing", 0) or 0)
+        salaries = float(getattr(fa, "salaries", 0) or 0)
+        taxes = float(getattr(fa, "taxes", 0) or 0)
+        capex = float(getattr(fa, "capex", 0) or 0)
+        loan_rate = getattr(fa, "loan_rate", "")
+        loan_duration = getattr(fa, "loan_duration", "")
+
+        ctx.update({
+            "marketing_budget_fcfa": str(int(fixed_costs * 0.1)),
+            "pricing_and_volume": (
+                f"Prix unitaire: {pricing} FCFA; "
+                f"Coût variable: {variable_costs} FCFA; "
+                f"Charges fixes mensuelles: {fixed_costs} FCFA."
+            ),
+            "financial_assumptions": (
+                f"Taux d'intérêt: {loan_rate}; "
+                f"Durée du prêt: {loan_duration} mois; "
+                f"CAPEX: {capex} FCFA."
+            ),
+            "known_costs": (
+                f"Salaire: {salaries} FCFA/mois; "
+                f"Taxes: {taxes} FCFA/mois."
+            ),
+        })
+
+        # JSON pour prompts structurés
+        costs_json = []
+        if fixed_costs:
+            costs_json.append({"name": "Charges fixes mensuelles", "amount_fcfa": fixed_costs})
+        if variable_costs:
+            costs_json.append({"name": "Coûts variables (unité)", "amount_fcfa": variable_costs})
+        if salaries:
+            costs_json.append({"name": "Masse salariale mensuelle", "amount_fcfa": salaries})
+        if taxes:
+            costs_json.append({"name": "Taxes mensuelles", "amount_fcfa": taxes})
+
+        prices_json = []
+        if pricing:
+            prices_json.append({"item": "Produit/Service principal", "price_fcfa": pricing})
+
+        # Montant prêté : celui des hypothèses, sinon requested_amount si présent
         try:
-            fa = db.exec(select(FinancialAssumptions).where(FinancialAssumptions.plan_id == plan.id)).first()
+            principal = int(getattr(fa, "loan_amount", None) or getattr(plan, "requested_amount_fcfa", 0) or 0)
         except Exception:
-            fa = None
-
-        if fa:
-            fixed_costs = float(getattr(fa, "fixed_costs", 0) or 0)
-            variable_costs = float(getattr(fa, "variable_costs", 0) or 0)
-            pricing = float(getattr(fa, "pricing", 0) or 0)
-            salaries = float(getattr(fa, "salaries", 0) or 0)
-            taxes = float(getattr(fa, "taxes", 0) or 0)
-            capex = float(getattr(fa, "capex", 0) or 0)
-            loan_rate = getattr(fa, "loan_rate", "")
-            loan_duration = getattr(fa, "loan_duration", "")
-
-            ctx.update({
-                "marketing_budget_fcfa": str(int(fixed_costs * 0.1)),
-                "pricing_and_volume": (
-                    f"Prix unitaire: {pricing} FCFA; "
-                    f"Coût variable: {variable_costs} FCFA; "
-                    f"Charges fixes mensuelles: {fixed_costs} FCFA."
-                ),
-                "financial_assumptions": (
-                    f"Taux d'intérêt: {loan_rate}; "
-                    f"Durée du prêt: {loan_duration} mois; "
-                    f"CAPEX: {capex} FCFA."
-                ),
-                "known_costs": (
-                    f"Salaire: {salaries} FCFA/mois; "
-                    f"Taxes: {taxes} FCFA/mois."
-                ),
-            })
+            principal = 0
+
+        loan_params = {}
+        if principal:
+            loan_params["principal_fcfa"] = principal
+        if loan_rate:
+            loan_params["annual_rate"] = loan_rate
+        if loan_duration:
+            loan_params["duration_months"] = loan_duration
+        repayment_type = getattr(fa, "repayment_type", None) or "annuity"
+        loan_params["repayment_type"] = getattr(repayment_type, "value", repayment_type)
+        if getattr(fa, "grace_months", 0):
+            loan_params["grace_months"] = fa.grace_months
+            loan_params["grace_type"] = getattr(fa.grace_type, "value", fa.grace_type)
+
+        ctx.update({
+            "known_costs_json": json.dumps(costs_json, ensure_ascii=False),
+            "known_prices_json": json.dumps(prices_json, ensure_ascii=False),
+            "historical_tx_json": json.dumps([], ensure_ascii=False),  # si tu as de l'historique, remplace ici
+            "loan_params_json": json.dumps(loan_params, ensure_ascii=False),
+        })
+
+        # Scénarios de sensibilité calculés exactement (le LLM ne fait que commenter)
+        try:
+            from app.services.finance.simulator import scenario_kpis
+            ctx["sensitivity_json"] = json.dumps(scenario_kpis(fa), ensure_ascii=False)
+        except Exception:
+            pass
 
-            # JSON pour prompts structurés
-            costs_json = []
-            if fixed_costs:
-                costs_json.append({"name": "Charges fixes mensuelles", "amount_fcfa": fixed_costs})
-            if variable_costs:
-                costs_json.append({"name": "Coûts variables (unité)", "amount_fcfa": variable_costs})
-            if salaries:
-                costs_json.append({"name": "Masse salariale mensuelle", "amount_fcfa": salaries})
-            if taxes:
-                costs_json.append({"name": "Taxes mensuelles", "amount_fcfa": taxes})
-
-            prices_json = []
-            if pricing:
-                prices_json.append({"item": "Produit/Service principal", "price_fcfa": pricing})
-
-            # Montant prêté supposé = requested_amount si présent
+    # Enrichissement via MarketData si présent
+    if market_rows:
+        bullets = []
+        for r in market_rows:
             try:
-                principal = int(getattr(plan, "requested_amount_fcfa", 0) or 0)
+                bullets.append(
+                    f"- {r.source} ({getattr(r, 'region', 'N/A')}) — "
+                    f"{getattr(r, 'metric', 'indicateur')}: {getattr(r, 'value', '')} "
+                    f"(fiabilité {getattr(r, 'reliability_score', 'N/A')})"
+                )
             except Exception:
-                principal = 0
-
-            loan_params = {}
-            if principal:
-                loan_params["principal_fcfa"] = principal
-            if loan_rate:
-                loan_params["annual_rate"] = loan_rate
-            if loan_duration:
-                loan_params["duration_months"] = loan_duration
-
-            ctx.update({
-                "known_costs_json": json.dumps(costs_json, ensure_ascii=False),
-                "known_prices_json": json.dumps(prices_json, ensure_ascii=False),
-                "historical_tx_json": json.dumps([], ensure_ascii=False),  # si tu as de l'historique, remplace ici
-                "loan_params_json": json.dumps(loan_params, ensure_ascii=False),
-            })
-
-    # Enrichissement via MarketData si présent
-    if MarketData is not None:
-        try:
-            rows = db.exec(select(MarketData).where(MarketData.plan_id == plan.id)).all() or []
-        except Exception:
-            rows = []
-        if rows:
-            bullets = []
-            for r in rows:
-                try:
-                    bullets.append(
-                        f"- {r.source} ({getattr(r, 'region', 'N/A')}) — "
-                        f"{getattr(r, 'metric', 'indicateur')}: {getattr(r, 'value', '')} "
-                        f"(fiabilité {getattr(r, 'reliability_score', 'N/A')})"
-                    )
-                except Exception:
-                    continue
-            ctx["local_sources"] = "\n".join(bullets)
+                continue
+        ctx["local_sources"] = "\n".join(bullets)
 
     return ctx
 
-def _hydrate_inputs(chain, db: Session, plan: BusinessPlan, ctx: Dict[str, str]) -> Dict[str, str]:
-    """Hydrate uniquement ce que le prompt réclame. Génère raw_md à la volée si demandé."""
-    required = getattr(chain.prompt, "input_variables", []) or []
-    # raw_md est demandé par ex. style_refiner.txt
-    if "raw_md" in required and "raw_md" not in ctx:
-        ctx = dict(ctx)
-        ctx["raw_md"] = _existing_sections_md(db, plan.id)
-    return {raw: str(ctx.get(_sanitize_var(raw), "")) for raw in required}
+class PlanContext:
+    """
+    Instantané du contexte d'un plan pour une génération.
+    Hypothèses, données marché et sections existantes sont chargées en une seule série de
+    requêtes ; les variables (chaînes, JSON) sont calculées une fois et raw_md est mis à jour
+    au fil des sections générées au lieu de relire la table PlanSection.
+    """
+
+    def __init__(self, plan: BusinessPlan, assumptions, market_rows: List, sections: List[PlanSection]):
+        self.plan = plan
+        self.assumptions = assumptions
+        self.market_rows = market_rows
+        self._md_parts = [_section_md(s.section_type, s.content_md) for s in sections]
+        self._raw_md: Optional[str] = None
+        self._variables: Optional[Dict[str, str]] = None
+
+    @classmethod
+    def load(cls, db: Session, plan: BusinessPlan) -> "PlanContext":
+        # erreurs SQL propagées : un schéma incomplet ne doit pas produire un contexte vide
+        fa = None
+        if FinancialAssumptions is not None:
+            fa = db.exec(select(FinancialAssumptions).where(FinancialAssumptions.plan_id == plan.id)).first()
+        rows: List = []
+        if MarketData is not None:
+            rows = list(db.exec(
+                select(MarketData).where(MarketData.plan_id == plan.id).order_by(MarketData.as_of, MarketData.id)
+            ).all())
+        snapshot = cls(plan, fa, rows, _existing_sections(db, plan.id))
+        # variables calculées tout de suite : l'instantané ne touche plus ni la session ni le plan
+        snapshot.variables
+        return snapshot
+
+    @property
+    def variables(self) -> Dict[str, str]:
+        if self._variables is None:
+            self._variables = _context_from_rows(self.plan, self.assumptions, self.market_rows)
+        return self._variables
+
+    @property
+    def raw_md(self) -> str:
+        if self._raw_md is None:
+            self._raw_md = "\n".join(self._md_parts).strip()
+        return self._raw_md
+
+    def add_section(self, section_type: PlanSectionType, content: str) -> None:
+        """Ajoute une section fraîchement générée au raw_md de l'instantané."""
+        self._md_parts.append(_section_md(section_type, content))
+        self._raw_md = None
+
+    def inputs_for(self, required: List[str]) -> Dict[str, str]:
+        """Hydrate uniquement ce que le prompt réclame (raw_md calculé seulement si demandé)."""
+        ctx = self.variables
+        if "raw_md" in required and "raw_md" not in ctx:
+            ctx = dict(ctx, raw_md=self.raw_md)
+        return {raw: str(ctx.get(_sanitize_var(raw), "")) for raw in required}
+
+def save_section(db: Session, plan_id: int, section_type: PlanSectionType, content: str) -> PlanSection:
+    """
+    Enregistre une section générée comme nouvelle version courante (appelé hors de la
+    boucle d'événements par les routes async). Rejoué si une écriture concurrente de la
+    même section a pris le numéro de version.
+    """
+    for attempt in range(SAVE_SECTION_ATTEMPTS):
+        try:
+            section = add_version(db, plan_id, section_type, content, generated_at=datetime.utcnow())
+            # index plein texte mis à jour dans la même transaction
+            index_section(db, db.get(BusinessPlan, plan_id), section)
+            db.commit()
+            return section
+        except IntegrityError:
+            db.rollback()
+            if attempt == SAVE_SECTION_ATTEMPTS - 1:
+                raise
+
+def _hydrate_inputs(chain, snapshot: PlanContext) -> Dict[str, str]:
+    """Hydrate uniquement ce que le prompt réclame. raw_md (ex. style_refiner.txt) vient de l'instantané."""
+    required = getattr(chain_prompt(chain), "input_variables", []) or []
+    return snapshot.inputs_for(required)
 
 def _missing_vars(required: List[str], hydrated: Dict[str, str]) -> List[str]:
     return [k for k in required if not hydrated.get(k, "").strip()]
 
-async def generate_all_sections(db: Session, plan: BusinessPlan) -> AsyncGenerator[str, None]:
+def _section_dependencies(section_type: PlanSectionType, required: List[str]) -> List[PlanSectionType]:
+    """
+    Sections à terminer avant de lancer `section_type`.
+    Un prompt qui consomme raw_md (ex. style_refiner.txt) attend toutes les sections autonomes.
+    """
+    deps = list(SECTION_DEPENDENCIES.get(section_type, ()))
+    if "raw_md" in required:
+        deps.extend(s for s in INDEPENDENT_SECTIONS if s != section_type and s not in deps)
+    return deps
+
+async def _run_section(
+    section_type: PlanSectionType,
+    chain,
+    plan_id: int,
+    snapshot: PlanContext,
+    limiter: asyncio.Semaphore,
+    events: asyncio.Queue,
+    use_cache: bool = True,
+    stream_tokens: bool = False,
+) -> Tuple[PlanSectionType, Optional[str]]:
     """
-    Génère toutes les sections dans un ordre déterministe et les enregistre.
-    Stream des messages de progression (à utiliser avec SSE ou collecte).
+    Génère une section (sans l'enregistrer) et renvoie (section, contenu).
+    Les événements section_start / token / error sont poussés dans `events` : la file est
+    bornée, un client lent suspend donc la lecture du stream LLM au lieu de tout bufferiser.
     """
+    # raw_md est lu ici : les dépendances ont déjà été ajoutées à l'instantané
+    inputs = _hydrate_inputs(chain, snapshot)
+
+    # feedback utile si un prompt devient vide à cause d'inputs manquants
+    required = getattr(chain_prompt(chain), "input_variables", []) or []
+    missing = _missing_vars(required, inputs)
+    await events.put({"type": "section_start", "section": section_type.value, "missing": missing})
+
+    try:
+        # chaque section tourne dans sa propre tâche : le scope n'étiquette que ses appels
+        with llm_scope(plan_id=plan_id):
+            async with limiter:
+                if stream_tokens:
+                    parts: List[str] = []
+                    async for token in astream_chain(chain, inputs, use_cache=use_cache):
+                        parts.append(token)
+                        await events.put({"type": "token", "section": section_type.value, "text": token})
+                    content = "".join(parts).strip()
+                else:
+                    content = await ainvoke_chain(chain, inputs, use_cache=use_cache)
+    except Exception as e:
+        await events.put({"type": "error", "section": section_type.value, "detail": str(e)})
+        return section_type, None
+
+    if not content:
+        await events.put({"type": "error", "section": section_type.value, "detail": "génération vide"})
+        return section_type, None
+    return section_type, content
+
+async def _schedule_sections(
+    db: Session,
+    plan: BusinessPlan,
+    events: asyncio.Queue,
+    concurrency: Optional[int],
+    use_cache: bool,
+    stream_tokens: bool,
+    skip_sections: Iterable[PlanSectionType] = (),
+    on_section_saved: Optional[SectionSavedHook] = None,
+    limiter: Optional[asyncio.Semaphore] = None,
+) -> None:
+    """
+    Ordonnance les sections : les indépendantes partent en parallèle (au plus `concurrency`
+    appels LLM simultanés), exec_summary et les prompts raw_md une fois leurs dépendances terminées.
+    Chaque section réussie est enregistrée puis signalée par un événement section_done.
+    Les sections de `skip_sections` (déjà écrites, reprise d'un job) comptent comme terminées.
+    Un `limiter` fourni (génération par lots) est partagé entre plusieurs plans.
+    """
+    if limiter is None:
+        limit = concurrency or settings.GENERATION_CONCURRENCY
+        limiter = asyncio.Semaphore(max(1, int(limit)))
+
+    pending: List[PlanSectionType] = []
+    finished: Set[PlanSectionType] = set()
+    running: Set[asyncio.Task] = set()
+    chains = {}
+    deps: Dict[PlanSectionType, List[PlanSectionType]] = {}
+    skipped = set(skip_sections)
     for section_type in SECTIONS_ORDER:
-        chain = get_llm_chain(section_type)
-        base_ctx = _build_context(db, plan)
-        inputs = _hydrate_inputs(chain, db, plan, base_ctx)
-
-        # feedback utile si un prompt devient vide à cause d'inputs manquants
-        required = getattr(chain.prompt, "input_variables", []) or []
-        missing = _missing_vars(required, inputs)
-        if missing:
-            # on n'interrompt pas, mais on log dans le stream
-            yield f"⚠️ {section_type.value}: variables manquantes -> {', '.join(missing)}"
-
+        if section_type in skipped:
+            finished.add(section_type)
+            await events.put({"type": "section_done", "section": section_type.value, "skipped": True})
+            continue
         try:
-            result = chain.invoke(inputs)
+            chains[section_type] = get_llm_runnable(section_type)
         except Exception as e:
-            yield f"❌ Erreur sur {section_type.value}: {e}"
-            continue
-
-        content = result.get("text", "").strip() if isinstance(result, dict) else str(result).strip()
-        if not content:
-            yield f"❌ Erreur sur {section_type.value}: génération vide"
+            # prompt invalide : la section est en échec mais ne bloque pas les autres
+            await events.put({
+                "type": "error", "section": section_type.value, "detail": str(getattr(e, "detail", e)),
+            })
+            finished.add(section_type)
             continue
+        required = getattr(chain_prompt(chains[section_type]), "input_variables", []) or []
+        deps[section_type] = _section_dependencies(section_type, required)
+        pending.append(section_type)
+
+    plan_id = plan.id  # évite un rechargement du plan après chaque commit
+    # accès DB synchrones hors de la boucle d'événements
+    snapshot = await asyncio.to_thread(PlanContext.load, db, plan)
+
+    try:
+        while pending or running:
+            # Lance toutes les sections dont les dépendances sont terminées (succès ou échec)
+            for section_type in [s for s in pending if all(d in finished for d in deps[s])]:
+                pending.remove(section_type)
+                running.add(asyncio.create_task(_run_section(
+                    section_type, chains[section_type], plan_id, snapshot, limiter, events, use_cache, stream_tokens
+                )))
+            if not running:
+                # dépendances impossibles à satisfaire : on ne bloque pas la génération
+                deps = {s: [] for s in pending}
+                continue
+
+            done, running = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                section_type, content = task.result()
+                if content:
+                    section = await asyncio.to_thread(save_section, db, plan_id, section_type, content)
+                    snapshot.add_section(section_type, content)
+                    if on_section_saved is not None:
+                        await on_section_saved(section_type, section)
+                    await events.put({"type": "section_done", "section": section_type.value, "chars": len(content)})
+                finished.add(section_type)
+    finally:
+        # client déconnecté : on n'abandonne pas des appels LLM orphelins
+        for task in running:
+            task.cancel()
+
+async def stream_plan_events(
+    db: Session,
+    plan: BusinessPlan,
+    concurrency: Optional[int] = None,
+    use_cache: bool = True,
+    stream_tokens: bool = True,
+    skip_sections: Iterable[PlanSectionType] = (),
+    on_section_saved: Optional[SectionSavedHook] = None,
+    limiter: Optional[asyncio.Semaphore] = None,
+) -> AsyncGenerator[Dict[str, Any], None]:
+    """
+    Génère et enregistre toutes les sections en streamant des événements typés :
+    section_start, token (si stream_tokens), section_done, error — dans l'ordre où ils se produisent.
+    use_cache=False ignore les réponses LLM en cache (régénération forcée).
+    skip_sections / on_section_saved servent à la reprise des jobs de génération ;
+    limiter partage un sémaphore d'appels LLM entre plans (génération par lots).
+    """
+    events: asyncio.Queue = asyncio.Queue(maxsize=max(1, settings.SSE_QUEUE_SIZE))
 
-        section = PlanSection(
-            plan_id=plan.id,
-            section_type=section_type,
-            content_md=content,
-            generated_at=datetime.utcnow()
-        )
-
-        db.add(section)
-        db.commit()
-        yield f"✅ {section_type.value} générée"
-        await asyncio.sleep(0.05)
+    async def _produce():
+        try:
+            await _schedule_sections(
+                db, plan, events, concurrency, use_cache, stream_tokens, skip_sections, on_section_saved, limiter
+            )
+        except Exception as e:
+            await events.put({"type": "error", "section": None, "detail": str(e)})
+        await events.put(_END)
+
+    producer = asyncio.create_task(_produce())
+    try:
+        while True:
+            event = await events.get()
+            if event is _END:
+                break
+            yield event
+    finally:
+        if not producer.done():
+            producer.cancel()
+
+async def generate_all_sections(
+    db: Session,
+    plan: BusinessPlan,
+    concurrency: Optional[int] = None,
+    use_cache: bool = True,
+) -> AsyncGenerator[str, None]:
+    """
+    Génère toutes les sections et les enregistre (voir stream_plan_events).
+    Stream des messages de progression, dans l'ordre de complétion (à utiliser avec SSE ou collecte).
+    """
+    async for event in stream_plan_events(db, plan, concurrency, use_cache, stream_tokens=False):
+        section = event.get("section")
+        if event["type"] == "section_start" and event["missing"]:
+            # on n'interrompt pas, mais on log dans le stream
+            yield f"⚠️ {section}: variables manquantes -> {', '.join(event['missing'])}"
+        elif event["type"] == "error":
+            yield f"❌ Erreur sur {section}: {event['detail']}"
+        elif event["type"] == "section_done":
+            yield f"✅ {section} générée"
 
 def generate_section(plan_id: int, section_name: str, context: Dict | None = None) -> str:
     """
@@ -8,7 +8,9 @@ from langchain.chains import LLMChain
 
 from app.llm.prompt_loader import load_prompt_by_name
 from app.llm.chains import get_llm
-from .generator import _build_context, _existing_sections_md, _sanitize_var
+from app.llm.services_llm import invoke_chain
+from app.llm.telemetry import llm_scope
+from .generator import PlanContext, _sanitize_var
 
 if TYPE_CHECKING:
     # Import uniquement pour la vérification de types (évite les imports circulaires au runtime)
@@ -20,22 +22,25 @@ def generate_prompt_preview(
     plan: "BusinessPlan",
     prompt_name: str,
     extra_ctx: Optional[Dict[str, str]] = None,
+    use_cache: bool = True,
 ) -> str:
     """
     Génère le rendu d'un prompt arbitraire (par nom de fichier dans /app/llm/prompts).
     - Hydrate automatiquement les variables du prompt à partir du contexte plan + extra_ctx.
     - Si le prompt demande raw_md, on injecte la concaténation des sections déjà générées.
+    - use_cache=False force un nouvel appel LLM au lieu de servir la réponse en cache.
     """
     tmpl = load_prompt_by_name(prompt_name)
     llm = get_llm()  # même backend que tes chains (OpenAI / Ollama)
     required = getattr(tmpl, "input_variables", []) or []
 
-    # Construit le contexte de base
-    base = _build_context(db, plan)
+    # Construit le contexte de base (une seule série de requêtes)
+    snapshot = PlanContext.load(db, plan)
+    base = dict(snapshot.variables)
 
     # Si le prompt demande raw_md, construire la matière à partir des sections existantes
     if "raw_md" in required and "raw_md" not in base:
-        base["raw_md"] = _existing_sections_md(db, plan.id)
+        base["raw_md"] = snapshot.raw_md
 
     # Merge du contexte additionnel (prioritaire)
     if extra_ctx:
@@ -47,7 +52,5 @@ def generate_prompt_preview(
 
     # Utiliser LLMChain pour un comportement cohérent et un texte de sortie
     chain = LLMChain(llm=llm, prompt=tmpl)
-    result = chain.invoke(inputs)
-
-    text = result.get("text", "").strip() if isinstance(result, dict) else str(result).strip()
-    return text
+    with llm_scope(prompt=prompt_name.removesuffix(".txt"), plan_id=plan.id):
+        return invoke_chain(chain, inputs, use_cache=use_cache)
@@ -0,0 +1,414 @@
+# app/services/jobs.py
+"""
+Jobs de génération de plans en tâche de fond.
+
+- La table GenerationJob est la file : un worker réclame un job `queued` par un
+  UPDATE conditionnel, donc plusieurs workers (ou process) ne prennent jamais le même.
+- Chaque section enregistrée est notée dans job.section_ids : un job interrompu
+  (client déconnecté, redémarrage) reprend sans régénérer ces sections.
+- Les événements de génération sont diffusés aux clients SSE via JobEventBus ;
+  un client peut se ré-attacher à tout moment à un job en cours.
+- Redis (ENABLE_REDIS) est optionnel : il ne sert qu'à réveiller les workers
+  des autres process dès qu'un job est mis en file.
+"""
+import asyncio
+import logging
+import os
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Any, AsyncGenerator, Deque, Dict, List, Optional, Set
+from uuid import uuid4
+
+from sqlalchemy import update
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.db.base import engine
+from app.db.models import (
+    BusinessPlan,
+    GenerationJob,
+    GenerationJobStatus,
+    PlanSection,
+    PlanSectionType,
+)
+from app.services.generator import SECTIONS_ORDER, stream_plan_events
+
+try:
+    import redis  # optionnel : uniquement si ENABLE_REDIS
+except Exception:
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = (GenerationJobStatus.queued, GenerationJobStatus.running)
+TERMINAL_STATUSES = (GenerationJobStatus.done, GenerationJobStatus.failed)
+REDIS_QUEUE_KEY = "genjobs:queue"
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def job_progress(job: GenerationJob) -> Dict[str, Any]:
+    done = [s.value for s in SECTIONS_ORDER if s.value in (job.section_ids or {})]
+    return {
+        "sections_done": done,
+        "sections_total": len(SECTIONS_ORDER),
+        "progress": round(len(done) / len(SECTIONS_ORDER), 4),
+    }
+
+
+def job_status_event(job: GenerationJob) -> Dict[str, Any]:
+    status = getattr(job.status, "value", job.status)
+    return {"type": "job_status", "job_id": job.id, "status": status, "errors": job.errors or {}, **job_progress(job)}
+
+
+class JobEventBus:
+    """
+    Diffusion en mémoire des événements d'un job vers ses abonnés SSE.
+    Un abonné lent perd des tokens plutôt que de ralentir la génération ;
+    les événements structurants (section_*, error, job_status) sont conservés.
+    """
+
+    HISTORY_SIZE = 200
+
+    def __init__(self):
+        self._subscribers: Dict[int, Set[asyncio.Queue]] = {}
+        self._history: Dict[int, Deque[Dict[str, Any]]] = {}
+
+    def is_live(self, job_id: int) -> bool:
+        return job_id in self._history
+
+    def open(self, job_id: int) -> None:
+        self._history[job_id] = deque(maxlen=self.HISTORY_SIZE)
+
+    def close(self, job_id: int) -> None:
+        self._history.pop(job_id, None)
+        for queue in self._subscribers.pop(job_id, set()):
+            self._offer(queue, None)
+
+    def publish(self, job_id: int, event: Dict[str, Any]) -> None:
+        if event.get("type") != "token" and job_id in self._history:
+            self._history[job_id].append(event)
+        for queue in self._subscribers.get(job_id, ()):
+            self._offer(queue, event)
+
+    @staticmethod
+    def _offer(queue: asyncio.Queue, event: Optional[Dict[str, Any]]) -> None:
+        if queue.full():
+            if event is not None and event.get("type") == "token":
+                return
+            queue.get_nowait()  # on sacrifie le plus ancien
+        queue.put_nowait(event)
+
+    def subscribe(self, job_id: int) -> asyncio.Queue:
+        """File d'événements pour un abonné ; None y est déposé quand le job se termine ici."""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, settings.SSE_QUEUE_SIZE))
+        for event in self._history.get(job_id, ()):
+            self._offer(queue, event)
+        self._subscribers.setdefault(job_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, job_id: int, queue: asyncio.Queue) -> None:
+        self._subscribers.get(job_id, set()).discard(queue)
+
+
+event_bus = JobEventBus()
+
+
+@lru_cache(maxsize=1)
+def _redis_client():
+    # un client (et son pool de connexions) partagé par le process
+    if settings.ENABLE_REDIS and settings.REDIS_URL and redis is not None:
+        return redis.Redis.from_url(settings.REDIS_URL)
+    return None
+
+
+def enqueue_job(db: Session, plan: BusinessPlan, owner_id: int, use_cache: bool = True) -> GenerationJob:
+    """
+    Met en file la génération complète d'un plan.
+    Si un job est déjà en file ou en cours pour ce plan, il est renvoyé tel quel.
+    """
+    active = db.exec(
+        select(GenerationJob)
+        .where(GenerationJob.plan_id == plan.id, GenerationJob.status.in_(ACTIVE_STATUSES))
+        .order_by(GenerationJob.id.desc())
+    ).first()
+    if active:
+        return active
+
+    job = GenerationJob(plan_id=plan.id, owner_id=owner_id, use_cache=use_cache)
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    job_pool.notify(job.id)
+    return job
+
+
+def resume_job(db: Session, job: GenerationJob) -> GenerationJob:
+    """Remet en file un job échoué : les sections déjà écrites ne seront pas régénérées."""
+    if job.status in TERMINAL_STATUSES and len(job.section_ids or {}) < len(SECTIONS_ORDER):
+        job.status = GenerationJobStatus.queued
+        job.errors = {}
+        job.finished_at = None
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        job_pool.notify(job.id)
+    return job
+
+
+def requeue_stale_jobs(db: Session) -> int:
+    """Jobs `running` sans battement de cœur récent (worker arrêté) : remis en file."""
+    limit = _now() - timedelta(seconds=settings.JOB_STALE_AFTER)
+    result = db.exec(
+        update(GenerationJob)
+        .where(GenerationJob.status == GenerationJobStatus.running, GenerationJob.heartbeat_at < limit)
+        .values(status=GenerationJobStatus.queued, worker_id=None)
+    )
+    db.commit()
+    return result.rowcount or 0
+
+
+def _claim_next(worker_id: str) -> Optional[int]:
+    """Réclame le plus ancien job en file (UPDATE conditionnel : un seul worker gagne)."""
+    with Session(engine) as db:
+        candidates = db.exec(
+            select(GenerationJob.id)
+            .where(GenerationJob.status == GenerationJobStatus.queued)
+            .order_by(GenerationJob.id)
+            .limit(5)
+        ).all()
+        for job_id in candidates:
+            now = _now()
+            result = db.exec(
+                update(GenerationJob)
+                .where(GenerationJob.id == job_id, GenerationJob.status == GenerationJobStatus.queued)
+                .values(
+                    status=GenerationJobStatus.running,
+                    worker_id=worker_id,
+                    started_at=now,
+                    heartbeat_at=now,
+                    attempts=GenerationJob.attempts + 1,
+                )
+            )
+            db.commit()
+            if result.rowcount == 1:
+                return job_id
+    return None
+
+
+def _owned(job_id: int, worker_id: str):
+    # conditions d'une écriture du worker : le job ne lui a pas été repris entre-temps
+    return (
+        GenerationJob.id == job_id,
+        GenerationJob.worker_id == worker_id,
+        GenerationJob.status == GenerationJobStatus.running,
+    )
+
+
+def _heartbeat(job_id: int, worker_id: str) -> bool:
+    """Prolonge le job ; False si le worker n'en est plus propriétaire."""
+    with Session(engine) as db:
+        result = db.exec(update(GenerationJob).where(*_owned(job_id, worker_id)).values(heartbeat_at=_now()))
+        db.commit()
+        return result.rowcount == 1
+
+
+def _record_section(job_id: int, worker_id: str, section_type: PlanSectionType, section: PlanSection) -> bool:
+    with Session(engine) as db:
+        job = db.get(GenerationJob, job_id)
+        result = db.exec(
+            update(GenerationJob)
+            .where(*_owned(job_id, worker_id))
+            # colonne JSON : nouveau dict complet
+            .values(section_ids={**(job.section_ids or {}), section_type.value: section.id}, heartbeat_at=_now())
+        )
+        db.commit()
+        return result.rowcount == 1
+
+
+def _finish_job(job_id: int, worker_id: str, errors: Dict[str, str]) -> GenerationJob:
+    """Statut final, écrit seulement si le job appartient encore au worker."""
+    with Session(engine) as db:
+        job = db.get(GenerationJob, job_id)
+        if job.worker_id != worker_id or job.status != GenerationJobStatus.running:
+            return job
+        complete = all(s.value in (job.section_ids or {}) for s in SECTIONS_ORDER)
+        now = _now()
+        db.exec(
+            update(GenerationJob)
+            .where(*_owned(job_id, worker_id))
+            .values(
+                status=GenerationJobStatus.done if complete else GenerationJobStatus.failed,
+                errors=errors,
+                finished_at=now,
+                heartbeat_at=now,
+            )
+        )
+        db.commit()
+        db.refresh(job)
+        return job
+
+
+async def _keep_alive(job_id: int, worker_id: str, lost: asyncio.Event) -> None:
+    # battement périodique : une section lente (file du provider, exec_summary qui attend
+    # ses dépendances) ne fait pas passer le job pour abandonné
+    while True:
+        await asyncio.sleep(settings.JOB_HEARTBEAT_INTERVAL)
+        if not await asyncio.to_thread(_heartbeat, job_id, worker_id):
+            lost.set()
+            return
+
+
+async def run_job(job_id: int, worker_id: str) -> None:
+    """Exécute (ou reprend) un job réclamé par ce worker."""
+    event_bus.open(job_id)
+    errors: Dict[str, str] = {}
+    lost = asyncio.Event()
+    heartbeat = asyncio.create_task(_keep_alive(job_id, worker_id, lost))
+    try:
+        with Session(engine) as db:
+            job = await asyncio.to_thread(db.get, GenerationJob, job_id)
+            plan = await asyncio.to_thread(db.get, BusinessPlan, job.plan_id)
+            done = {PlanSectionType(s) for s in (job.section_ids or {})}
+            event_bus.publish(job_id, job_status_event(job))
+
+            async def _saved(section_type: PlanSectionType, section: PlanSection) -> None:
+                if not await asyncio.to_thread(_record_section, job_id, worker_id, section_type, section):
+                    lost.set()
+
+            async for event in stream_plan_events(
+                db, plan, use_cache=job.use_cache, skip_sections=done, on_section_saved=_saved
+            ):
+                if event["type"] == "error":
+                    errors[event.get("section") or "plan"] = event.get("detail", "")
+                event_bus.publish(job_id, {**event, "job_id": job_id})
+                if lost.is_set():
+                    # job remis en file et repris par un autre worker : on s'arrête
+                    logger.warning(f"Job de génération {job_id} repris par un autre worker, arrêt de {worker_id}")
+                    break
+    except Exception as e:
+        logger.error(f"Job de génération {job_id} en échec: {e}", exc_info=True)
+        errors["job"] = str(e)
+    finally:
+        heartbeat.cancel()
+        job = await asyncio.to_thread(_finish_job, job_id, worker_id, errors)
+        event_bus.publish(job_id, job_status_event(job))
+        event_bus.close(job_id)
+
+
+class JobWorkerPool:
+    """Workers asyncio du process : réclament et exécutent les jobs en file."""
+
+    def __init__(self):
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.worker_prefix = f"{os.getpid()}-{uuid4().hex[:6]}"
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def start(self, workers: int) -> None:
+        if self._tasks or workers <= 0:
+            return
+        self._wakeup = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+        self._tasks = [
+            asyncio.create_task(self._worker(f"{self.worker_prefix}-{i}")) for i in range(workers)
+        ]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self, job_id: int) -> None:
+        """
+        Signale un nouveau job : réveil local, et via Redis pour les autres process.
+        Appelé aussi depuis les routes sync (threadpool) : l'Event est levé dans la boucle.
+        """
+        if self._wakeup is not None and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+        client = _redis_client()
+        if client is not None:
+            try:
+                client.lpush(REDIS_QUEUE_KEY, job_id)
+            except Exception as e:
+                logger.warning(f"Notification Redis du job {job_id} impossible: {e}")
+
+    async def _wait_for_work(self) -> None:
+        client = _redis_client()
+        if client is not None:
+            try:
+                await asyncio.to_thread(client.blpop, REDIS_QUEUE_KEY, int(settings.JOB_POLL_INTERVAL) or 1)
+                return
+            except Exception:
+                pass
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=settings.JOB_POLL_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+    async def _worker(self, worker_id: str) -> None:
+        while True:
+            try:
+                job_id = await asyncio.to_thread(_claim_next, worker_id)
+                if job_id is None:
+                    await self._wait_for_work()
+                    with Session(engine) as db:
+                        await asyncio.to_thread(requeue_stale_jobs, db)
+                    continue
+                await run_job(job_id, worker_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Worker {worker_id}: {e}", exc_info=True)
+                await asyncio.sleep(settings.JOB_POLL_INTERVAL)
+
+
+job_pool = JobWorkerPool()
+
+
+async def job_event_stream(job_id: int) -> AsyncGenerator[Dict[str, Any], None]:
+    """
+    Flux SSE d'un job : état courant, puis événements en direct si le job tourne dans ce
+    process, sinon suivi de l'état en base jusqu'à la fin du job (ré-attachement).
+    """
+    queue = event_bus.subscribe(job_id) if event_bus.is_live(job_id) else None
+    try:
+        with Session(engine) as db:
+            job = await asyncio.to_thread(db.get, GenerationJob, job_id)
+            yield job_status_event(job)
+
+            if queue is not None:
+                while True:
+                    event = await queue.get()
+                    if event is None:
+                        return
+                    yield event
+
+            last = None
+            while job.status not in TERMINAL_STATUSES:
+                await asyncio.sleep(settings.JOB_POLL_INTERVAL)
+                await asyncio.to_thread(db.refresh, job)
+                event = job_status_event(job)
+                if event != last:
+                    last = event
+                    yield event
+                if event_bus.is_live(job_id) and queue is None:
+                    # le job vient de démarrer dans ce process : on passe en direct
+                    queue = event_bus.subscribe(job_id)
+                    while True:
+                        live = await queue.get()
+                        if live is None:
+                            return
+                        yield live
+    finally:
+        if queue is not None:
+            event_bus.unsubscribe(job_id, queue)
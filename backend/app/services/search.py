@@ -0,0 +1,289 @@
+# app/services/search.py
+"""
+Recherche plein texte sur les plans (titre, secteur, ville) et le contenu des sections.
+
+- SQLite : table virtuelle FTS5 (tokenizer unicode61, accents et casse ignorés).
+- Postgres : table `plan_search` avec colonne tsvector générée (configuration `fr_unaccent` :
+  racinisation française + unaccent) et index GIN.
+
+Un document par plan (métadonnées) et un par type de section (version courante,
+métadonnées du plan recopiées pour qu'une requête mêlant ville et contenu trouve la section).
+L'identifiant du document est dérivé du plan (plan_id * DOCS_PER_PLAN + position du type) :
+mise à jour, suppression et purge d'un plan se font par clé, sans parcours de l'index.
+L'index est tenu à jour dans la transaction de l'écriture (save_section, routes plans).
+"""
+import logging
+import re
+import unicodedata
+from typing import Dict, List, Optional
+
+from sqlalchemy import Integer, text
+from sqlalchemy.engine import Connection, Engine
+from sqlmodel import Session, select
+
+from app.db.models import BusinessPlan, PlanSection, PlanSectionType
+from app.services.section_versions import current_sections
+
+logger = logging.getLogger(__name__)
+
+DOCS_PER_PLAN = 16
+PLAN_DOC = "plan"
+_SLOTS: Dict[str, int] = {PLAN_DOC: 0, **{t.value: i + 1 for i, t in enumerate(PlanSectionType)}}
+
+SNIPPET_START, SNIPPET_END = "<mark>", "</mark>"
+
+# ligatures non décomposées par unicode61 (œuvre, main-d'œuvre saisis « oe » au clavier)
+_LIGATURES = str.maketrans({"œ": "oe", "Œ": "Oe", "æ": "ae", "Æ": "Ae"})
+
+_SQLITE_DDL = (
+    "CREATE VIRTUAL TABLE plan_search USING fts5("
+    "title, sector, city, content, plan_id UNINDEXED, section_type UNINDEXED, "
+    "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')",
+)
+
+_POSTGRES_DDL = (
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    """
+    DO $$ BEGIN
+        IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = 'fr_unaccent') THEN
+            CREATE TEXT SEARCH CONFIGURATION fr_unaccent (COPY = french);
+            ALTER TEXT SEARCH CONFIGURATION fr_unaccent
+                ALTER MAPPING FOR hword, hword_part, word WITH unaccent, french_stem;
+        END IF;
+    END $$
+    """,
+    """
+    CREATE TABLE plan_search (
+        doc_id BIGINT PRIMARY KEY,
+        plan_id INTEGER NOT NULL,
+        section_type TEXT NOT NULL,
+        title TEXT, sector TEXT, city TEXT, content TEXT,
+        document TSVECTOR GENERATED ALWAYS AS (
+            setweight(to_tsvector('fr_unaccent', coalesce(title, '')), 'A')
+            || setweight(to_tsvector('fr_unaccent', coalesce(sector, '') || ' ' || coalesce(city, '')), 'B')
+            || setweight(to_tsvector('fr_unaccent', coalesce(content, '')), 'C')
+        ) STORED
+    )
+    """,
+    "CREATE INDEX ix_plan_search_document ON plan_search USING GIN (document)",
+)
+
+# colonne clé du document selon le moteur (rowid FTS5 / clé primaire Postgres)
+_KEY = {"sqlite": "rowid", "postgresql": "doc_id"}
+
+
+def _dialect(bind) -> str:
+    return bind.dialect.name
+
+
+def _key(db: Session) -> str:
+    return _KEY[_dialect(db.get_bind())]
+
+
+def _doc_id(plan_id: int, slot: str) -> int:
+    return plan_id * DOCS_PER_PLAN + _SLOTS[slot]
+
+
+def _plan_range(plan_id: int) -> Dict[str, int]:
+    return {"lo": plan_id * DOCS_PER_PLAN, "hi": (plan_id + 1) * DOCS_PER_PLAN - 1}
+
+
+def _exists(conn: Connection) -> bool:
+    if _dialect(conn) == "sqlite":
+        sql = "SELECT 1 FROM sqlite_master WHERE name = 'plan_search'"
+    else:
+        sql = "SELECT 1 FROM information_schema.tables WHERE table_name = 'plan_search'"
+    return conn.exec_driver_sql(sql).first() is not None
+
+
+def init_search_index(engine: Engine) -> None:
+    """Crée l'index s'il manque puis l'alimente avec les plans et sections existants."""
+    dialect = _dialect(engine)
+    if dialect not in _KEY:
+        logger.warning("Recherche plein texte non disponible pour %s", dialect)
+        return
+    with engine.begin() as conn:
+        if _exists(conn):
+            return
+        for ddl in _SQLITE_DDL if dialect == "sqlite" else _POSTGRES_DDL:
+            conn.exec_driver_sql(ddl)
+    with Session(engine) as db:
+        rebuild_search_index(db)
+        db.commit()
+
+
+def _fold(value: Optional[str]) -> Optional[str]:
+    return value.translate(_LIGATURES) if value else value
+
+
+def _upsert(db: Session, plan: BusinessPlan, slot: str, content: str) -> None:
+    key = _key(db)
+    doc_id = _doc_id(plan.id, slot)
+    db.exec(text(f"DELETE FROM plan_search WHERE {key} = :doc_id").bindparams(doc_id=doc_id))
+    db.exec(text(
+        f"INSERT INTO plan_search ({key}, plan_id, section_type, title, sector, city, content) "
+        "VALUES (:doc_id, :plan_id, :slot, :title, :sector, :city, :content)"
+    ).bindparams(
+        doc_id=doc_id, plan_id=plan.id, slot=slot,
+        title=_fold(plan.title), sector=_fold(plan.sector), city=_fold(plan.city), content=_fold(content),
+    ))
+
+
+def index_plan(db: Session, plan: BusinessPlan) -> None:
+    """(Ré)indexe les métadonnées d'un plan, recopiées dans les documents de ses sections."""
+    _upsert(db, plan, PLAN_DOC, "")
+    db.exec(text(
+        f"UPDATE plan_search SET title = :title, sector = :sector, city = :city "
+        f"WHERE {_key(db)} BETWEEN :lo AND :hi"
+    ).bindparams(title=_fold(plan.title), sector=_fold(plan.sector), city=_fold(plan.city), **_plan_range(plan.id)))
+
+
+def index_section(db: Session, plan: BusinessPlan, section: PlanSection) -> None:
+    """Remplace le document du type de la section par cette version (la plus récente)."""
+    _upsert(db, plan, PlanSectionType(section.section_type).value, section.content_md)
+
+
+def remove_plan(db: Session, plan_id: int) -> None:
+    db.exec(text(f"DELETE FROM plan_search WHERE {_key(db)} BETWEEN :lo AND :hi").bindparams(**_plan_range(plan_id)))
+
+
+def rebuild_search_index(db: Session) -> int:
+    """Réindexe tous les plans (dernière section de chaque type). Renvoie le nombre de plans."""
+    db.exec(text("DELETE FROM plan_search"))
+    count = 0
+    for plan in db.exec(select(BusinessPlan).order_by(BusinessPlan.id)):
+        index_plan(db, plan)
+        for section in current_sections(db, plan.id):
+            index_section(db, plan, section)
+        count += 1
+    return count
+
+
+def _normalize(word: str) -> str:
+    # même repli que l'index : casse, ligatures et accents ignorés
+    decomposed = unicodedata.normalize("NFKD", _fold(word).lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def _terms(query: str) -> List[str]:
+    return re.findall(r"\w+", _fold(query))
+
+
+def _fts5_query(terms: List[str]) -> Optional[str]:
+    # termes entre guillemets (pas de syntaxe FTS5 injectée), dernier terme en préfixe
+    if not terms:
+        return None
+    return " ".join(f'"{t}"' for t in terms[:-1]) + f' "{terms[-1]}"*'
+
+
+def _snippet(body: str, terms: List[str], width: int = 24) -> str:
+    """Extrait de `width` mots autour de la première occurrence, termes surlignés."""
+    words = list(re.finditer(r"\w+", body))
+    if not words:
+        return ""
+    exact = {_normalize(t) for t in terms[:-1]}
+    prefix = _normalize(terms[-1])
+
+    def hit(word: str) -> bool:
+        normalized = _normalize(word)
+        return normalized in exact or normalized.startswith(prefix)
+
+    first = next((i for i, w in enumerate(words) if hit(w.group())), 0)
+    lo = max(0, min(first - width // 4, len(words) - width))
+    window = words[lo:lo + width]
+    parts, cursor = [], window[0].start()
+    for word in window:
+        parts.append(body[cursor:word.start()])
+        parts.append(f"{SNIPPET_START}{word.group()}{SNIPPET_END}" if hit(word.group()) else word.group())
+        cursor = word.end()
+    prefix_dots = "…" if lo > 0 else ""
+    suffix_dots = "…" if lo + width < len(words) else ""
+    return prefix_dots + "".join(parts) + suffix_dots
+
+
+def matching_plan_ids(db: Session, query: str):
+    """
+    Sous-requête des plan_id correspondant à `query` : None si la requête est vide (pas de
+    filtre), liste vide si elle ne contient aucun terme cherchable (ex. « !! » : aucun plan).
+    """
+    if not query.strip():
+        return None
+    if _dialect(db.get_bind()) == "sqlite":
+        match = _fts5_query(_terms(query))
+        if match is None:
+            return []
+        sql = text("SELECT plan_id FROM plan_search WHERE plan_search MATCH :q").bindparams(q=match)
+    else:
+        sql = text(
+            "SELECT plan_id FROM plan_search WHERE document @@ websearch_to_tsquery('fr_unaccent', :q)"
+        ).bindparams(q=query)
+    return sql.columns(plan_id=Integer)
+
+
+def _search_sqlite(db: Session, query: str, owner_id: Optional[int], limit: int) -> List[Dict]:
+    terms = _terms(query)
+    match = _fts5_query(terms)
+    if match is None:
+        return []
+    owner = "AND plan_id IN (SELECT id FROM businessplan WHERE owner_id = :owner_id)" if owner_id else ""
+    # bm25 (plus petit = plus pertinent ; titre > secteur/ville > contenu) via la colonne cachée
+    # rank, tri limité à limit * len(_SLOTS) documents : assez pour `limit` plans distincts
+    rows = db.exec(text(
+        "SELECT rowid AS doc_id, plan_id, section_type, rank AS score, title, sector, city, content "
+        f"FROM plan_search WHERE plan_search MATCH :q AND rank MATCH 'bm25(10.0, 4.0, 4.0, 1.0)' {owner} "
+        "ORDER BY rank LIMIT :window"
+    ).bindparams(
+        q=match, window=limit * len(_SLOTS), **({"owner_id": owner_id} if owner_id else {})
+    )).all()
+    best: Dict[int, object] = {}
+    for row in rows:
+        best.setdefault(row.plan_id, row)
+    # extraits calculés en Python pour les seuls documents retenus (snippet() d'FTS5
+    # repasserait sur toutes les correspondances)
+    return [
+        {"plan_id": row.plan_id, "section_type": row.section_type, "score": round(-row.score, 4),
+         "snippet": _snippet(row.content or " — ".join(filter(None, (row.title, row.sector, row.city))), terms)}
+        for row in list(best.values())[:limit]
+    ]
+
+
+def _search_postgres(db: Session, query: str, owner_id: Optional[int], limit: int) -> List[Dict]:
+    if not query.strip():
+        return []
+    owner = "AND plan_id IN (SELECT id FROM businessplan WHERE owner_id = :owner_id)" if owner_id else ""
+    rows = db.exec(text(
+        "SELECT top.plan_id, top.section_type, top.score, ts_headline('fr_unaccent', top.body, top.q, "
+        f"'StartSel={SNIPPET_START}, StopSel={SNIPPET_END}, MaxWords=30, MinWords=12') AS snippet "
+        "FROM ("
+        "  SELECT DISTINCT ON (plan_id) * FROM ("
+        "    SELECT plan_id, section_type, q, ts_rank_cd(document, q) AS score, "
+        "           coalesce(nullif(content, ''), concat_ws(' — ', title, sector, city)) AS body "
+        "    FROM plan_search, websearch_to_tsquery('fr_unaccent', :q) AS q "
+        f"    WHERE document @@ q {owner} "
+        "    ORDER BY score DESC LIMIT :window"
+        "  ) AS ranked ORDER BY plan_id, score DESC"
+        ") AS top ORDER BY top.score DESC LIMIT :limit"
+    ).bindparams(
+        q=query, limit=limit, window=limit * len(_SLOTS), **({"owner_id": owner_id} if owner_id else {})
+    )).all()
+    return [
+        {"plan_id": row.plan_id, "section_type": row.section_type, "score": round(row.score, 4),
+         "snippet": row.snippet}
+        for row in rows
+    ]
+
+
+def search_plans(db: Session, query: str, owner_id: Optional[int] = None, limit: int = 20) -> List[Dict]:
+    """
+    Plans les plus pertinents pour `query` (un résultat par plan : son meilleur document),
+    avec un extrait surligné. `owner_id` restreint aux plans d'un propriétaire.
+    """
+    search = _search_sqlite if _dialect(db.get_bind()) == "sqlite" else _search_postgres
+    hits = search(db, query, owner_id, limit)
+    plans = {p.id: p for p in db.exec(select(BusinessPlan).where(BusinessPlan.id.in_([h["plan_id"] for h in hits])))}
+    return [
+        {**hit, "title": plans[hit["plan_id"]].title, "sector": plans[hit["plan_id"]].sector,
+         "city": plans[hit["plan_id"]].city, "status": plans[hit["plan_id"]].status,
+         "section_type": None if hit["section_type"] == PLAN_DOC else hit["section_type"]}
+        for hit in hits if hit["plan_id"] in plans
+    ]
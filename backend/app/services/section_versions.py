@@ -0,0 +1,122 @@
+# app/services/section_versions.py
+"""
+Versions des sections d'un plan.
+
+Chaque génération ajoute une version (numérotée par section) et devient la version
+courante ; l'ancienne passe en historique. Les lectures (contexte de génération, exports,
+index de recherche) ne chargent que les versions courantes, via l'index
+ix_plansection_current : leur coût ne dépend plus du nombre de régénérations.
+L'historique reste consultable et se compacte (versions anciennes supprimées).
+"""
+from typing import List, Optional
+
+from sqlalchemy import bindparam, delete, func, inspect, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import aliased
+from sqlmodel import Session, select
+
+from app.db.models import PlanSection, PlanSectionType
+
+_ORDER = {t: i for i, t in enumerate(PlanSectionType)}  # ordre du plan (exec_summary en tête)
+
+
+def current_sections(db: Session, plan_id: int) -> List[PlanSection]:
+    """Version courante de chaque section du plan, dans l'ordre du plan."""
+    sections = db.exec(
+        select(PlanSection).where(PlanSection.plan_id == plan_id, PlanSection.is_current == True)  # noqa: E712
+    ).all()
+    return sorted(sections, key=lambda s: _ORDER[PlanSectionType(s.section_type)])
+
+
+def section_history(db: Session, plan_id: int, section_type: PlanSectionType) -> List[PlanSection]:
+    """Toutes les versions conservées d'une section, de la plus récente à la plus ancienne."""
+    return list(db.exec(
+        select(PlanSection)
+        .where(PlanSection.plan_id == plan_id, PlanSection.section_type == section_type)
+        .order_by(PlanSection.version.desc())
+    ).all())
+
+
+def add_version(db: Session, plan_id: int, section_type: PlanSectionType, content: str, **fields) -> PlanSection:
+    """
+    Ajoute une version courante (sans commit). Deux écritures concurrentes de la même
+    section prennent le même numéro de version (index unique) : l'appelant rejoue sur
+    IntegrityError.
+    """
+    current: Optional[PlanSection] = db.exec(
+        select(PlanSection).where(
+            PlanSection.plan_id == plan_id,
+            PlanSection.section_type == section_type,
+            PlanSection.is_current == True,  # noqa: E712
+        )
+    ).first()
+    if current is not None:
+        current.is_current = False
+        db.add(current)
+    section = PlanSection(
+        plan_id=plan_id,
+        section_type=section_type,
+        content_md=content,
+        version=current.version + 1 if current is not None else 1,
+        is_current=True,
+        **fields,
+    )
+    db.add(section)
+    db.flush()
+    return section
+
+
+def compact_sections(db: Session, keep: int, plan_id: Optional[int] = None) -> int:
+    """
+    Supprime les versions antérieures aux `keep` plus récentes de chaque section (courante
+    incluse), pour un plan ou pour tous. Renvoie le nombre de versions supprimées (sans commit).
+    """
+    current = aliased(PlanSection)
+    current_version = (
+        select(current.version)
+        .where(
+            current.plan_id == PlanSection.plan_id,
+            current.section_type == PlanSection.section_type,
+            current.is_current == True,  # noqa: E712
+        )
+        .scalar_subquery()
+    )
+    stmt = delete(PlanSection).where(
+        PlanSection.is_current == False,  # noqa: E712
+        PlanSection.version <= current_version - max(keep, 1),
+    )
+    if plan_id is not None:
+        stmt = stmt.where(PlanSection.plan_id == plan_id)
+    return db.exec(stmt).rowcount
+
+
+def upgrade_section_versions(conn: Connection) -> None:
+    """
+    Base créée avant le versionnage (pas de migrations) : ajoute version / is_current et
+    numérote les sections existantes par date de génération, la plus récente étant courante.
+    """
+    columns = {c["name"] for c in inspect(conn).get_columns("plansection")}
+    if "version" in columns:
+        return
+    false = "0" if conn.dialect.name == "sqlite" else "false"
+    conn.exec_driver_sql("ALTER TABLE plansection ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+    conn.exec_driver_sql(f"ALTER TABLE plansection ADD COLUMN is_current BOOLEAN NOT NULL DEFAULT {false}")
+    rows = conn.execute(
+        select(PlanSection.id, PlanSection.plan_id, PlanSection.section_type)
+        .order_by(PlanSection.plan_id, PlanSection.section_type, PlanSection.generated_at, PlanSection.id)
+    ).all()
+    versions, key, version = [], None, 0
+    for row in rows:
+        version = version + 1 if (row.plan_id, row.section_type) == key else 1
+        key = (row.plan_id, row.section_type)
+        versions.append({"row_id": row.id, "number": version})
+    if not versions:
+        return
+    table = PlanSection.__table__
+    conn.execute(update(table).where(table.c.id == bindparam("row_id")).values(version=bindparam("number")), versions)
+    latest = table.alias()
+    conn.execute(update(table).where(
+        table.c.version == select(func.max(latest.c.version)).where(
+            latest.c.plan_id == table.c.plan_id, latest.c.section_type == table.c.section_type
+        ).scalar_subquery()
+    ).values(is_current=True))
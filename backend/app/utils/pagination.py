@@ -1,6 +1,93 @@
 # app/utils/pagination.py
-from fastapi import Query
+"""
+Pagination par curseur (keyset) des listes : `WHERE (tri) > (dernière ligne) ORDER BY tri LIMIT n`.
 
-def get_pagination_params(page: int = Query(1, ge=1), limit: int = Query(10, le=100)):
-    offset = (page - 1) * limit
-    return {"offset": offset, "limit": limit}
+Coût constant quelle que soit la page (pas d'OFFSET à parcourir), ordre stable même si des
+lignes sont ajoutées entre deux pages. Le curseur est opaque (base64 des valeurs de tri de
+la dernière ligne, lié à la liste qui l'a émis) ; la page suivante est annoncée dans
+l'en-tête X-Next-Cursor, absent sur la dernière page.
+"""
+import base64
+import json
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, List, Optional, Sequence
+
+from fastapi import HTTPException, Query, Response
+from sqlalchemy import tuple_
+from sqlmodel import Session
+
+from app.core.config import settings
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+@dataclass(frozen=True)
+class PageParams:
+    cursor: Optional[str]
+    limit: int
+
+
+def get_page_params(
+    cursor: Optional[str] = Query(None, description="Curseur X-Next-Cursor de la page précédente"),
+    limit: Optional[int] = Query(None, ge=1, le=settings.PAGE_SIZE_MAX, description="Taille de page"),
+) -> PageParams:
+    return PageParams(cursor=cursor or None, limit=limit or settings.PAGE_SIZE_DEFAULT)
+
+
+def _dump(value: Any) -> Any:
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def _load(column, value: Any) -> Any:
+    if value is None:
+        return None
+    python_type = column.type.python_type
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is date:
+        return date.fromisoformat(value)
+    return python_type(value)
+
+
+def encode_cursor(key: str, values: Sequence[Any]) -> str:
+    raw = json.dumps([key, [_dump(v) for v in values]], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(key: str, cursor: str, columns: Sequence) -> List[Any]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_key, values = json.loads(raw)
+        if cursor_key != key or len(values) != len(columns):
+            raise ValueError(cursor_key)
+        return [_load(column, value) for column, value in zip(columns, values)]
+    except (ValueError, TypeError, json.JSONDecodeError):
+        raise HTTPException(status_code=400, detail="Curseur de pagination invalide")
+
+
+def paginate(
+    db: Session,
+    stmt,
+    columns: Sequence,
+    page: PageParams,
+    response: Response,
+    key: str,
+    descending: bool = False,
+) -> list:
+    """
+    Une page de `stmt` triée sur `columns` (dernière colonne unique, ex. id ; index
+    couvrant le filtre puis le tri). Positionne X-Next-Cursor s'il reste des lignes.
+    """
+    if page.cursor:
+        bound = tuple_(*decode_cursor(key, page.cursor, columns))
+        stmt = stmt.where(tuple_(*columns) < bound if descending else tuple_(*columns) > bound)
+    order = [c.desc() for c in columns] if descending else list(columns)
+    rows = db.exec(stmt.order_by(*order).limit(page.limit + 1)).all()
+    if len(rows) > page.limit:
+        rows = rows[:page.limit]
+        last = rows[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(key, [getattr(last, c.key) for c in columns])
+    return rows
@@ -1,7 +1,8 @@
 # app/utils/sse.py
 from starlette.responses import StreamingResponse
-from typing import Callable, Any
+from typing import AsyncIterator, Callable, Any, Dict
 import asyncio
+import json
 
 
 def format_sse(data: str, event: str = None) -> str:
@@ -16,3 +17,19 @@ def sse_stream(generator: Callable[..., Any]):
         async for chunk in generator():
             yield format_sse(chunk)
     return StreamingResponse(event_generator(), media_type="text/event-stream")
+
+
+def sse_events(events: AsyncIterator[Dict[str, Any]]):
+    """
+    Diffuse des événements typés ({"type": ...}) : le type devient le champ `event:` SSE.
+    Le flux n'est lu qu'au rythme du client (pas de bufferisation côté serveur).
+    """
+    async def event_generator():
+        async for event in events:
+            yield format_sse(json.dumps(event, ensure_ascii=False), event=event.get("type"))
+        yield format_sse("done", event="end")
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
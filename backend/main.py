@@ -1,3 +1,5 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -9,22 +11,40 @@ from app.api import (
     files,
     finance,
     intake,
+    jobs,
     knowledge,
     market,
     plans,
+    portfolio,
     sections,
     simulate,
     users,
 )
 from app.core.config import settings
 from app.core.logging import setup_logging, CorrelationIdMiddleware
-from app.db.base import init_db
+from app.db.base import dispose_async_engine, init_db
+from app.llm.clients import close_clients
+from app.llm.prompt_registry import prompt_registry
+from app.services.jobs import job_pool
 
 
 def on_startup():
     init_db()
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # prompts lus et compilés une fois ; rechargés ensuite sur changement de mtime
+    prompt_registry.load_all()
+    # workers de génération : reprennent aussi les jobs laissés en file avant un redémarrage
+    job_pool.start(settings.JOB_WORKERS)
+    yield
+    await job_pool.stop()
+    # libère les pools HTTP partagés des clients LLM et le pool du moteur async
+    close_clients()
+    await dispose_async_engine()
+
+
 setup_logging()
 
 app = FastAPI(
@@ -34,6 +54,7 @@ app = FastAPI(
     docs_url="/docs",
     redoc_url="/redoc",
     redirect_slashes=True,  # <- décommente si tu veux éviter les 307 automatiques
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -42,6 +63,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # lisibles par le frontend : curseur de la page suivante, validation de cache
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
 app.add_middleware(CorrelationIdMiddleware)
@@ -51,8 +74,10 @@ app.include_router(auth.router, prefix="/auth", tags=["auth"])
 app.include_router(users.router, prefix="/users", tags=["users"])
 app.include_router(plans.router, prefix="/business-plans", tags=["plans"])
 app.include_router(sections.router, prefix="/generate", tags=["generation"])
+app.include_router(jobs.router, prefix="/jobs", tags=["jobs"])
 app.include_router(finance.router, prefix="/finance", tags=["finance"])
 app.include_router(simulate.router, prefix="/simulate", tags=["simulations"])
+app.include_router(portfolio.router, prefix="/portfolio", tags=["portfolio"])
 app.include_router(market.router, prefix="/market", tags=["market"])
 app.include_router(advice.router, prefix="/advice", tags=["advice"])
 app.include_router(export.router, prefix="/export", tags=["export"])
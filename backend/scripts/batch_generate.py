@@ -0,0 +1,50 @@
+# scripts/batch_generate.py
+"""
+Génération par lots en ligne de commande, ex. après une mise à jour de prompt :
+
+    python scripts/batch_generate.py --sector commerce --city Abidjan
+    python scripts/batch_generate.py --ids 12 13 14 --no-cache --plans 4 --sections 12
+"""
+import argparse
+import asyncio
+import json
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))  # ajoute le backend au PYTHONPATH
+
+from sqlmodel import Session
+
+from app.db.base import engine
+from app.services.batch import run_batch, select_plan_ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description="(Re)génère les sections de plusieurs business plans.")
+    parser.add_argument("--ids", type=int, nargs="*", help="identifiants de plans")
+    parser.add_argument("--sector")
+    parser.add_argument("--city")
+    parser.add_argument("--status")
+    parser.add_argument("--no-cache", action="store_true", help="ignore le cache des réponses LLM")
+    parser.add_argument("--plans", type=int, help="plans générés en parallèle")
+    parser.add_argument("--sections", type=int, help="appels LLM simultanés, tous plans confondus")
+    args = parser.parse_args()
+
+    if not (args.ids or args.sector or args.city or args.status):
+        parser.error("indiquez --ids ou un filtre (--sector, --city, --status)")
+
+    with Session(engine) as db:
+        plan_ids = select_plan_ids(db, args.ids, args.sector, args.city, args.status)
+    print(f"{len(plan_ids)} plan(s) à générer")
+    if not plan_ids:
+        return
+
+    report = asyncio.run(run_batch(
+        plan_ids,
+        use_cache=not args.no_cache,
+        plan_concurrency=args.plans,
+        section_concurrency=args.sections,
+    ))
+    print(json.dumps(report.as_dict(), indent=2, ensure_ascii=False, default=str))
+
+
+if __name__ == "__main__":
+    main()
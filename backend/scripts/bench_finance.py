@@ -0,0 +1,298 @@
+# scripts/bench_finance.py
+"""
+Benchmarks du calcul financier (calculators, simulator, forecast, Monte Carlo, KPI via l'API).
+
+Chaque cas est chronométré (médiane par appel sur plusieurs séries) ; les résultats sont
+écrits en JSON dans benchmarks/results/ et comparés à une référence enregistrée :
+
+    python scripts/bench_finance.py                         # tous les cas
+    python scripts/bench_finance.py --filter irr --quick    # sous-ensemble, moins de séries
+    python scripts/bench_finance.py --save-baseline         # enregistre benchmarks/baseline.json
+    python scripts/bench_finance.py --threshold 0.3         # régression si > +30 % (code retour 1)
+
+La référence dépend de la machine : la régénérer (--save-baseline) sur la machine de mesure.
+Les cas "api" utilisent une base SQLite temporaire (la base configurée n'est pas touchée).
+"""
+import argparse
+import itertools
+import json
+import os, sys
+import platform
+import statistics
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Tuple
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND)  # ajoute le backend au PYTHONPATH
+
+# base temporaire, positionnée avant l'import de l'application (moteur créé à l'import)
+_DB_DIR = tempfile.mkdtemp(prefix="bench_finance_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DB_DIR, 'bench.db')}"
+
+import numpy as np
+
+from app.services.finance import calculators
+from app.services.finance.amortization import schedule
+from app.services.finance.calculators import break_even_revenue, break_even_units, irr, irr_batch, npv, npv_batch
+from app.services.finance.forecast import ForecastDrivers, build_forecast_rows, project
+from app.services.finance.goal_seek import GoalTarget, goal_seek
+from app.services.finance.kpi_cache import compute_kpis
+from app.services.finance.models import FinancialAssumptions
+from app.services.finance.montecarlo import run_montecarlo
+from app.services.finance.simulator import sensitivity_grid, simulate_financials
+
+BENCH_DIR = os.path.join(BACKEND, "benchmarks")
+BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+PERIODS = (12, 60, 120, 360)
+
+ASSUMPTIONS = dict(
+    pricing=1500.0, variable_costs=600.0, fixed_costs=60_000.0, salaries=150_000.0, taxes=10_000.0,
+    capex=2_000_000.0, loan_rate=0.12, loan_duration=36, monthly_units=300.0,
+    seasonality=[1, 1, 1.2, 1, 1, 0.8, 1, 1, 1, 1.1, 1.2, 1.5], growth_rates=[0.01] * 12,
+)
+
+Case = Tuple[str, str, Dict[str, object], Callable[[], object]]
+
+
+def cashflows(rows: int, periods: int, seed: int = 0) -> np.ndarray:
+    """Investissement initial puis flux mensuels positifs (flux conventionnels)."""
+    rng = np.random.default_rng(seed)
+    cfs = np.abs(rng.normal(30_000, 20_000, (rows, periods)))
+    cfs[:, 0] = -rng.uniform(2e5, 2e7, rows)
+    return cfs
+
+
+class without_npf:
+    """Désactive numpy_financial le temps d'un appel (repli pur Python des calculators)."""
+
+    def __enter__(self):
+        self.saved, calculators.npf = calculators.npf, None
+
+    def __exit__(self, *exc):
+        calculators.npf = self.saved
+
+
+def _python_only(fn: Callable[[], object]) -> Callable[[], object]:
+    def run():
+        with without_npf():
+            return fn()
+    return run
+
+
+def calculator_cases() -> List[Case]:
+    cases: List[Case] = []
+    for periods in PERIODS:
+        row = cashflows(1, periods + 1)[0].tolist()
+        params = {"periods": periods}
+        if calculators.npf is not None:
+            cases.append(("calculators", "npv_npf", params, lambda row=row: npv(0.008, row)))
+            cases.append(("calculators", "irr_npf", params, lambda row=row: irr(row)))
+        cases.append(("calculators", "npv_python", params, _python_only(lambda row=row: npv(0.008, row))))
+        cases.append(("calculators", "irr_python", params, _python_only(lambda row=row: irr(row))))
+    cases.append(("calculators", "break_even", {}, lambda: (
+        break_even_units(1500.0, 600.0, 220_000.0), break_even_revenue(1500.0, 600.0, 220_000.0)
+    )))
+    for rows, periods in ((1_000, 61), (1_000, 361), (10_000, 61)):
+        cfs = cashflows(rows, periods)
+        params = {"rows": rows, "periods": periods - 1}
+        cases.append(("calculators", "npv_batch", params, lambda cfs=cfs: npv_batch(0.008, cfs)))
+        cases.append(("calculators", "irr_batch", params, lambda cfs=cfs: irr_batch(cfs)))
+    return cases
+
+
+def finance_cases() -> List[Case]:
+    a = FinancialAssumptions(plan_id=0, **ASSUMPTIONS)
+    drivers = ForecastDrivers.from_assumptions(a)
+    grid = {d: ["-20%", "-10%", "0%", "+10%", "+20%"] for d in ("pricing", "variable_costs", "fixed_costs", "monthly_units")}
+    targets = [
+        GoalTarget("pricing", "dscr", 1.3),
+        GoalTarget("loan_duration", "dscr_min", 1.2),
+        GoalTarget("monthly_units", "breakeven_month", 18),
+    ]
+    cases: List[Case] = [
+        ("simulator", "simulate_financials", {}, lambda: simulate_financials(a, {"pricing": "+10%", "fixed_costs": "-5%"})),
+        ("simulator", "sensitivity_grid", {"combinations": 625, "horizon": 36}, lambda: sensitivity_grid(a, grid, horizon=36)),
+        ("simulator", "goal_seek", {"targets": len(targets), "horizon": 36}, lambda: goal_seek(a, targets, horizon=36)),
+        ("forecast", "build_forecast_rows", {}, lambda: build_forecast_rows(0, a)),
+    ]
+    for n, horizon in ((1, 60), (10_000, 60)):
+        batch = drivers.repeat(n)
+        cases.append(("forecast", "project", {"rows": n, "horizon": horizon}, lambda b=batch, h=horizon: project(b, h)))
+    cases.append(("forecast", "amortization_schedule", {"rows": 10_000, "horizon": 360}, lambda: schedule(
+        np.full(10_000, 2e6), np.linspace(0.05, 0.2, 10_000), 240, 360, grace_months=6,
+    )))
+    for horizon in (12, 60):
+        cases.append(("kpi", "compute_kpis", {"horizon": horizon}, lambda h=horizon: compute_kpis(a, 0.1, h)))
+    cases.append(("montecarlo", "run_montecarlo", {"draws": 10_000, "horizon": 36}, lambda: run_montecarlo(a, 10_000, 36, seed=0)))
+    return cases
+
+
+def api_cases() -> List[Case]:
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from sqlmodel import Session
+
+    from app.api import finance
+    from app.core.security import create_access_token
+    from app.db.base import engine, init_db
+    from app.db.models import BusinessPlan, User
+
+    init_db()
+    with Session(engine) as db:
+        user = User(email="bench@example.ci", hashed_password="x", full_name="Bench", phone="0")
+        db.add(user)
+        db.commit()
+        db.refresh(user)
+        plan = BusinessPlan(owner_id=user.id, title="Bench", sector="commerce", city="Abidjan", requested_amount_fcfa=2e6)
+        db.add(plan)
+        db.commit()
+        db.refresh(plan)
+        plan_id, user_id = plan.id, user.id
+
+    # seul le routeur finance est monté (comme dans main.py) : pas de dépendances LLM / audio
+    app = FastAPI()
+    app.include_router(finance.router, prefix="/finance")
+    client = TestClient(app)
+    headers = {"Authorization": "Bearer " + create_access_token({"sub": str(user_id)})}
+    body = {**ASSUMPTIONS, "start_date": "2026-01-01"}
+    client.post(f"/finance/{plan_id}/assumptions", json=body, headers=headers).raise_for_status()
+    rates = itertools.count()
+
+    def get(url: str):
+        return lambda: client.get(url, headers=headers).raise_for_status()
+
+    return [
+        ("api", "save_assumptions", {}, lambda: client.post(
+            f"/finance/{plan_id}/assumptions", json={**body, "pricing": 1500.0 + next(rates) % 2}, headers=headers,
+        ).raise_for_status()),
+        # taux différent à chaque appel : KPI calculés puis stockés (pas de snapshot)
+        ("api", "kpi_cold", {"horizon": 60}, lambda: client.get(
+            f"/finance/{plan_id}/kpi?horizon=60&rate={0.1 + next(rates) * 1e-7:.7f}", headers=headers,
+        ).raise_for_status()),
+        ("api", "kpi_cached", {"horizon": 60}, get(f"/finance/{plan_id}/kpi?horizon=60")),
+        ("api", "forecast", {"horizon": 60, "granularity": "monthly"}, get(f"/finance/{plan_id}/forecast?horizon=60")),
+    ]
+
+
+def measure(fn: Callable[[], object], rounds: int, min_time: float) -> Dict[str, float]:
+    """Médiane et minimum du temps par appel (ms) sur `rounds` séries d'au moins `min_time` s."""
+    fn()  # préchauffage (imports, caches)
+    started = time.perf_counter()
+    fn()
+    single = max(time.perf_counter() - started, 1e-7)
+    loops = max(1, int(min_time / single))
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        samples.append((time.perf_counter() - started) / loops * 1000.0)
+    return {
+        "median_ms": statistics.median(samples),
+        "min_ms": min(samples),
+        "stdev_ms": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        "rounds": rounds,
+        "loops": loops,
+    }
+
+
+def case_id(group: str, name: str, params: Dict[str, object]) -> str:
+    suffix = ",".join(f"{k}={v}" for k, v in params.items())
+    return f"{group}.{name}" + (f"[{suffix}]" if suffix else "")
+
+
+def environment() -> Dict[str, object]:
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "numpy_financial": getattr(calculators.npf, "__version__", None) if calculators.npf is not None else None,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor() or None,
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], threshold: float, min_delta_ms: float) -> List[str]:
+    """
+    Affiche l'écart à la référence ; renvoie les cas en régression : plus lents de plus
+    de `threshold` (relatif) et de `min_delta_ms` (absolu, bruit des cas de quelques µs).
+    """
+    regressions = []
+    print(f"\n{'cas':<72} {'réf. ms':>10} {'ms':>10} {'écart':>8}")
+    for key, result in results.items():
+        ref = baseline.get(key)
+        if ref is None:
+            print(f"{key:<72} {'-':>10} {result['median_ms']:10.3f} {'nouveau':>8}")
+            continue
+        ratio = result["median_ms"] / ref["median_ms"] - 1.0
+        flag = ""
+        if ratio > threshold and result["median_ms"] - ref["median_ms"] > min_delta_ms:
+            regressions.append(key)
+            flag = "  <- régression"
+        print(f"{key:<72} {ref['median_ms']:10.3f} {result['median_ms']:10.3f} {ratio:+8.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks du calcul financier, comparés à une référence.")
+    parser.add_argument("--filter", default=None, help="ne garde que les cas dont l'identifiant contient ce texte")
+    parser.add_argument("--quick", action="store_true", help="3 séries de 0,05 s (au lieu de 7 de 0,2 s)")
+    parser.add_argument("--rounds", type=int, default=None)
+    parser.add_argument("--min-time", type=float, default=None, help="durée minimale d'une série (s)")
+    parser.add_argument("--no-api", action="store_true", help="sans les cas passant par l'API")
+    parser.add_argument("--output", default=None, help="fichier JSON des résultats (défaut : benchmarks/results/)")
+    parser.add_argument("--baseline", default=BASELINE, help="référence à comparer")
+    parser.add_argument("--save-baseline", action="store_true", help="enregistre les résultats comme référence")
+    parser.add_argument("--threshold", type=float, default=0.25, help="écart relatif toléré avant régression")
+    parser.add_argument("--min-delta-ms", type=float, default=0.01, help="écart absolu minimal d'une régression (ms)")
+    args = parser.parse_args()
+
+    rounds = args.rounds or (3 if args.quick else 7)
+    min_time = args.min_time or (0.05 if args.quick else 0.2)
+
+    cases = calculator_cases() + finance_cases()
+    if not args.no_api:
+        cases += api_cases()
+
+    results: Dict[str, dict] = {}
+    for group, name, params, fn in cases:
+        key = case_id(group, name, params)
+        if args.filter and args.filter not in key:
+            continue
+        results[key] = {"group": group, "name": name, "params": params, **measure(fn, rounds, min_time)}
+        print(f"{key:<72} {results[key]['median_ms']:10.3f} ms")
+
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "environment": environment(),
+        "settings": {"rounds": rounds, "min_time": min_time},
+        "results": results,
+    }
+    if args.save_baseline:
+        output = args.baseline
+    else:
+        output = args.output or os.path.join(
+            BENCH_DIR, "results", f"bench-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+        )
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\nRésultats : {output}")
+
+    if args.save_baseline or not os.path.exists(args.baseline):
+        return
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline.get("environment", {}).get("platform") != report["environment"]["platform"]:
+        print("Attention : référence mesurée sur une autre plateforme, écarts indicatifs.")
+    regressions = compare(results, baseline["results"], args.threshold, args.min_delta_ms)
+    if regressions:
+        print(f"\n{len(regressions)} régression(s) au-delà de {args.threshold:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
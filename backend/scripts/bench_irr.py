@@ -0,0 +1,66 @@
+# scripts/bench_irr.py
+"""
+Compare le calcul NPV/IRR unitaire (calculators.npv / irr, une ligne à la fois) au
+calcul par lots (npv_batch / irr_batch) sur des flux mensuels synthétiques :
+
+    python scripts/bench_irr.py --rows 5000 --periods 61
+    python scripts/bench_irr.py --mixed
+"""
+import argparse
+import os, sys
+import time
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))  # ajoute le backend au PYTHONPATH
+
+import numpy as np
+
+from app.services.finance.calculators import irr, irr_batch, npf, npv, npv_batch
+
+
+def synthetic_cashflows(rows: int, periods: int, seed: int, mixed: bool = False) -> np.ndarray:
+    """
+    Un investissement initial suivi de flux d'exploitation positifs (flux conventionnels) ;
+    mixed : certains mois négatifs (saisonnalité), donc parfois plusieurs IRR possibles.
+    """
+    rng = np.random.default_rng(seed)
+    cfs = rng.normal(30_000, 20_000, (rows, periods))
+    if not mixed:
+        cfs = np.abs(cfs)
+    cfs[:, 0] = -rng.uniform(2e5, 2e7, rows)
+    return cfs
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark NPV/IRR : appels unitaires vs calcul par lots.")
+    parser.add_argument("--rows", type=int, default=2000, help="vecteurs de flux")
+    parser.add_argument("--periods", type=int, default=61, help="flux par vecteur (CAPEX + mois)")
+    parser.add_argument("--rate", type=float, default=0.008, help="taux d'actualisation par période")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--mixed", action="store_true", help="flux non conventionnels (mois négatifs)")
+    args = parser.parse_args()
+
+    cfs = synthetic_cashflows(args.rows, args.periods, args.seed, args.mixed)
+    rows = cfs.tolist()
+    print(f"{args.rows} vecteurs x {args.periods} flux ; numpy_financial: {'oui' if npf is not None else 'non'}")
+
+    npv_ref, t_npv = timed(lambda: np.array([npv(args.rate, row) for row in rows]))
+    npv_new, t_npv_batch = timed(lambda: npv_batch(args.rate, cfs))
+    print(f"NPV  unitaire {t_npv * 1000:9.1f} ms | lots {t_npv_batch * 1000:8.1f} ms "
+          f"| x{t_npv / t_npv_batch:7.1f} | écart max {np.max(np.abs(npv_new - npv_ref)):.2e}")
+
+    irr_ref, t_irr = timed(lambda: np.array([irr(row) for row in rows], dtype=float))
+    (irr_new, converged), t_irr_batch = timed(lambda: irr_batch(cfs))
+    both = ~np.isnan(irr_ref) & converged
+    gap = np.max(np.abs(irr_new[both] - irr_ref[both])) if both.any() else float("nan")
+    print(f"IRR  unitaire {t_irr * 1000:9.1f} ms | lots {t_irr_batch * 1000:8.1f} ms "
+          f"| x{t_irr / t_irr_batch:7.1f} | écart max {gap:.2e}")
+    print(f"IRR  convergés : unitaire {int((~np.isnan(irr_ref)).sum())} / lots {int(converged.sum())}")
+
+
+if __name__ == "__main__":
+    main()
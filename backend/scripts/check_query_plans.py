@@ -0,0 +1,251 @@
+# scripts/check_query_plans.py
+"""
+Contrôle des accès base des routes les plus sollicitées, sur une base SQLite temporaire :
+
+- nombre de requêtes SQL par appel, borné, et identique pour un petit et un gros
+  propriétaire (sinon : requêtes N+1) ;
+- plan d'exécution (EXPLAIN QUERY PLAN) de chaque SELECT : pas de parcours complet d'une
+  table (SCAN sans index), pas de tri hors index (USE TEMP B-TREE FOR ORDER BY) ; un
+  parcours d'index complet n'est accepté que pour une requête bornée (LIMIT).
+
+    python scripts/check_query_plans.py            # code retour 1 en cas de régression
+    python scripts/check_query_plans.py --verbose  # affiche requêtes et plans
+"""
+import argparse
+import os, sys
+import re
+import tempfile
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from typing import Callable, Dict, List, Tuple
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND)  # ajoute le backend au PYTHONPATH
+
+# base temporaire, positionnée avant l'import de l'application (moteur créé à l'import)
+_DB_DIR = tempfile.mkdtemp(prefix="check_query_plans_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DB_DIR, 'plans.db')}"
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlmodel import Session
+
+from app.api import admin, advice, finance, jobs, market, plans, simulate, users
+from app.core.security import create_access_token
+from app.db.base import engine, init_db
+from app.db.models import BusinessPlan, GenerationJob, PlanSectionType, Role, User
+from app.services.finance.models import Advice, AuditLog, MarketData
+from app.services.section_versions import add_version
+from app.utils.pagination import NEXT_CURSOR_HEADER
+
+SMALL, LARGE = 2, 40  # plans et lignes enfants par plan des deux propriétaires
+
+ASSUMPTIONS = dict(
+    pricing=1500.0, variable_costs=600.0, fixed_costs=60_000.0, salaries=150_000.0, taxes=10_000.0,
+    capex=2_000_000.0, loan_rate=0.12, loan_duration=36, monthly_units=300.0, start_date="2026-01-01",
+    seasonality=[1.0] * 12, growth_rates=[0.01] * 12,
+)
+
+_FULL_SCAN = re.compile(r"^SCAN (\w+)$")
+_INDEX_SCAN = re.compile(r"^SCAN (\w+) USING (?:COVERING )?INDEX")
+
+
+@dataclass
+class Owner:
+    user_id: int
+    headers: Dict[str, str]
+    plan_id: int
+
+
+@dataclass(frozen=True)
+class Case:
+    name: str
+    url: Callable[[Owner], str]
+    max_queries: int
+    admin: bool = False
+    paged: bool = False  # mesure la 2e page (curseur X-Next-Cursor, ?limit=1)
+
+
+CASES = (
+    Case("plans.list", lambda o: "/business-plans/", 2),
+    Case("plans.list_status", lambda o: "/business-plans/?status=draft", 2),
+    Case("plans.list_page", lambda o: "/business-plans/", 2, paged=True),
+    Case("plans.search", lambda o: "/business-plans/search?q=plan abidjan", 3),
+    Case("plans.get", lambda o: f"/business-plans/{o.plan_id}", 2),
+    Case("plans.sections", lambda o: f"/business-plans/{o.plan_id}/sections", 3),
+    Case("plans.section_history", lambda o: f"/business-plans/{o.plan_id}/sections/market/history", 3),
+    Case("users.list_page", lambda o: "/users/", 2, admin=True, paged=True),
+    Case("advice.list", lambda o: f"/advice/{o.plan_id}", 3),
+    Case("advice.list_page", lambda o: f"/advice/{o.plan_id}", 3, paged=True),
+    Case("market.data", lambda o: f"/market/{o.plan_id}/data", 3),
+    Case("market.data_page", lambda o: f"/market/{o.plan_id}/data", 3, paged=True),
+    Case("finance.forecast", lambda o: f"/finance/{o.plan_id}/forecast?horizon=60", 4),
+    Case("finance.kpi", lambda o: f"/finance/{o.plan_id}/kpi?horizon=36", 4),
+    Case("simulate.scenarios", lambda o: f"/simulate/{o.plan_id}/scenarios", 4),
+    Case("jobs.plan", lambda o: f"/jobs/plan/{o.plan_id}", 2),
+    Case("admin.audit", lambda o: "/admin/audit", 2, admin=True),
+    Case("admin.audit_page", lambda o: "/admin/audit", 2, admin=True, paged=True),
+)
+
+
+class QueryRecorder:
+    """Requêtes émises par le moteur pendant un appel (texte SQL et paramètres)."""
+
+    def __init__(self):
+        self.active = False
+        self.statements: List[Tuple[str, object]] = []
+        event.listen(engine, "before_cursor_execute", self._record)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        if self.active and not statement.lstrip().upper().startswith(("PRAGMA", "EXPLAIN")):
+            self.statements.append((statement, parameters))
+
+    def __enter__(self):
+        self.statements = []
+        self.active = True
+        return self
+
+    def __exit__(self, *exc):
+        self.active = False
+
+
+def build_app() -> FastAPI:
+    # routeurs concernés uniquement (mêmes préfixes que main.py), sans lifespan
+    app = FastAPI()
+    app.include_router(users.router, prefix="/users")
+    app.include_router(plans.router, prefix="/business-plans")
+    app.include_router(jobs.router, prefix="/jobs")
+    app.include_router(finance.router, prefix="/finance")
+    app.include_router(simulate.router, prefix="/simulate")
+    app.include_router(market.router, prefix="/market")
+    app.include_router(advice.router, prefix="/advice")
+    app.include_router(admin.router, prefix="/admin")
+    return app
+
+
+def _headers(user_id: int) -> Dict[str, str]:
+    return {"Authorization": "Bearer " + create_access_token({"sub": str(user_id)})}
+
+
+def seed_owner(client: TestClient, db: Session, email: str, size: int) -> Owner:
+    """Un propriétaire avec `size` plans, chacun avec `size` lignes de chaque table enfant."""
+    user = User(email=email, hashed_password="x", full_name="Check", phone="0")
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    headers = _headers(user.id)
+    now = datetime.now(timezone.utc)
+    plan_ids = []
+    for i in range(size):
+        plan = BusinessPlan(
+            owner_id=user.id, title=f"Plan {i}", sector="commerce", city="Abidjan",
+            requested_amount_fcfa=2e6, status="draft" if i % 2 else "final",
+        )
+        db.add(plan)
+        db.commit()
+        db.refresh(plan)
+        plan_ids.append(plan.id)
+        for j in range(size):
+            # régénérations successives : `size` versions réparties sur les types de section
+            add_version(
+                db, plan.id, list(PlanSectionType)[j % len(PlanSectionType)], "...",
+                score_quality=None, generated_at=now + timedelta(seconds=j),
+            )
+            db.add(MarketData(
+                plan_id=plan.id, source="check", region="Abidjan", metric=f"m{j}", value=float(j),
+                as_of=date.today() - timedelta(days=j), reliability_score=0.5,
+            ))
+            db.add(Advice(plan_id=plan.id, category="finance", message="...", priority=j % 3))
+            db.add(GenerationJob(plan_id=plan.id, owner_id=user.id))
+            db.add(AuditLog(actor_id=user.id, action="check", entity="plan", entity_id=plan.id))
+        db.commit()
+
+        client.post(f"/finance/{plan.id}/assumptions", json=ASSUMPTIONS, headers=headers).raise_for_status()
+        for j in range(size):
+            client.post(f"/simulate/{plan.id}", json={"delta": {"pricing": f"+{j}%"}}, headers=headers).raise_for_status()
+    return Owner(user.id, headers, plan_ids[-1])
+
+
+def explain(statement: str, parameters) -> List[str]:
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters or ()).all()
+    return [row[-1] for row in rows]
+
+
+def plan_violations(statement: str, details: List[str]) -> List[str]:
+    problems = []
+    bounded = re.search(r"\bLIMIT\b", statement, re.IGNORECASE) is not None
+    for detail in details:
+        if _FULL_SCAN.match(detail):
+            problems.append(f"parcours complet : {detail}")
+        elif _INDEX_SCAN.match(detail) and not bounded:
+            problems.append(f"parcours d'index complet sans LIMIT : {detail}")
+        elif "USE TEMP B-TREE FOR ORDER BY" in detail:
+            problems.append(f"tri hors index : {detail}")
+    return problems
+
+
+def run_case(client: TestClient, recorder: QueryRecorder, case: Case, owner: Owner, headers: Dict[str, str]):
+    url = case.url(owner)
+    first = client.get(url, params={"limit": 1} if case.paged else None, headers=headers)
+    first.raise_for_status()  # préchauffage (snapshots, prévision)
+    if case.paged:
+        url += f"?limit=1&cursor={first.headers[NEXT_CURSOR_HEADER]}"
+    with recorder:
+        client.get(url, headers=headers).raise_for_status()
+    return list(recorder.statements)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Contrôle du nombre de requêtes et des plans d'exécution.")
+    parser.add_argument("--verbose", action="store_true", help="affiche les requêtes et leurs plans")
+    args = parser.parse_args()
+
+    init_db()
+    client = TestClient(build_app())
+    recorder = QueryRecorder()
+    with Session(engine) as db:
+        small = seed_owner(client, db, "small@example.ci", SMALL)
+        large = seed_owner(client, db, "large@example.ci", LARGE)
+        admin_user = User(email="admin@example.ci", hashed_password="x", full_name="Admin", phone="0", role=Role.admin)
+        db.add(admin_user)
+        db.commit()
+        db.refresh(admin_user)
+        admin_headers = _headers(admin_user.id)
+
+    failures = 0
+    print(f"{'route':<22} {'requêtes':>9} {'max':>4}  résultat")
+    for case in CASES:
+        counts, problems = [], []
+        for owner in (small, large):
+            statements = run_case(client, recorder, case, owner, admin_headers if case.admin else owner.headers)
+            counts.append(len(statements))
+            for statement, parameters in statements:
+                if not statement.lstrip().upper().startswith("SELECT"):
+                    continue
+                details = explain(statement, parameters)
+                found = plan_violations(statement, details)
+                problems.extend(f"{p}\n      {' '.join(statement.split())[:160]}" for p in found)
+                if args.verbose and owner is large:
+                    print(f"    {' '.join(statement.split())[:160]}")
+                    for detail in details:
+                        print(f"      -> {detail}")
+        if counts[0] != counts[1]:
+            problems.append(f"requêtes N+1 : {counts[0]} (petit propriétaire) / {counts[1]} (gros propriétaire)")
+        if max(counts) > case.max_queries:
+            problems.append(f"{max(counts)} requêtes (max {case.max_queries})")
+        status = "ok" if not problems else "ÉCHEC"
+        print(f"{case.name:<22} {counts[1]:>9} {case.max_queries:>4}  {status}")
+        for problem in dict.fromkeys(problems):
+            print(f"    - {problem}")
+        failures += bool(problems)
+
+    if failures:
+        print(f"\n{failures} route(s) en régression")
+        sys.exit(1)
+    print("\nAucune régression")
+
+
+if __name__ == "__main__":
+    main()
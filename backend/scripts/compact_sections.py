@@ -0,0 +1,38 @@
+# scripts/compact_sections.py
+"""
+Compacte l'historique des sections : ne garde que les N versions les plus récentes de
+chaque section (version courante incluse), pour un plan ou pour tous :
+
+    python scripts/compact_sections.py                 # SECTION_HISTORY_KEEP versions
+    python scripts/compact_sections.py --keep 1        # versions courantes uniquement
+    python scripts/compact_sections.py --plan 12 --keep 3
+"""
+import argparse
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))  # ajoute le backend au PYTHONPATH
+
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.db.base import engine, init_db
+from app.services.section_versions import compact_sections
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compaction de l'historique des sections.")
+    parser.add_argument("--keep", type=int, default=settings.SECTION_HISTORY_KEEP,
+                        help="versions conservées par section (courante incluse)")
+    parser.add_argument("--plan", type=int, default=None, help="limite à un plan")
+    args = parser.parse_args()
+    if args.keep < 1:
+        parser.error("--keep doit être >= 1")
+
+    init_db()
+    with Session(engine) as db:
+        deleted = compact_sections(db, args.keep, plan_id=args.plan)
+        db.commit()
+    print(f"{deleted} version(s) supprimée(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+# scripts/rebuild_search_index.py
+"""
+Reconstruit l'index plein texte (plans et dernière version de chaque section), ex. après
+une restauration de base ou une écriture faite hors de l'application :
+
+    python scripts/rebuild_search_index.py
+"""
+import os, sys
+import time
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))  # ajoute le backend au PYTHONPATH
+
+from sqlmodel import Session
+
+from app.db.base import engine, init_db
+from app.services.search import rebuild_search_index
+
+
+def main():
+    init_db()  # crée l'index s'il manque
+    started = time.perf_counter()
+    with Session(engine) as db:
+        count = rebuild_search_index(db)
+        db.commit()
+    print(f"Index de recherche reconstruit : {count} plans en {time.perf_counter() - started:.1f} s")
+
+
+if __name__ == "__main__":
+    main()